@@ -0,0 +1,186 @@
+"""
+厨师成就引擎
+
+玩家行为以领域事件的形式上报（做成料理、学会食谱、赢得比赛、完成合作料理、创建团队），
+每个事件只更新与之相关的进度计数器，再只检查监听这些计数器的成就。
+同一计数器的成就按门槛升序排列，遇到第一个未达到的门槛即可停止。
+"""
+from typing import Dict, List, Tuple
+
+ACHIEVEMENTS = [
+    {
+        "id": "first_dish",
+        "name": "初出茅庐",
+        "description": "成功制作第一道料理",
+        "category": "cooking",
+        "requirement_type": "success_count",
+        "requirement_value": 1,
+        "reward_exp": 50,
+        "reward_reputation": 5,
+        "reward_title": "新手厨师"
+    },
+    {
+        "id": "cooking_10",
+        "name": "厨艺初成",
+        "description": "成功制作10道料理",
+        "category": "cooking",
+        "requirement_type": "success_count",
+        "requirement_value": 10,
+        "reward_exp": 100,
+        "reward_reputation": 10
+    },
+    {
+        "id": "cooking_50",
+        "name": "烹饪能手",
+        "description": "成功制作50道料理",
+        "category": "cooking",
+        "requirement_type": "success_count",
+        "requirement_value": 50,
+        "reward_money": 500,
+        "reward_exp": 200,
+        "reward_reputation": 20,
+        "reward_title": "烹饪能手"
+    },
+    {
+        "id": "cooking_100",
+        "name": "厨艺精通",
+        "description": "成功制作100道料理",
+        "category": "cooking",
+        "requirement_type": "success_count",
+        "requirement_value": 100,
+        "reward_money": 1000,
+        "reward_exp": 500,
+        "reward_reputation": 50,
+        "reward_title": "料理大师"
+    },
+    {
+        "id": "level_5",
+        "name": "厨师进阶",
+        "description": "厨师等级达到5级",
+        "category": "cooking",
+        "requirement_type": "level",
+        "requirement_value": 5,
+        "reward_money": 300,
+        "reward_exp": 150
+    },
+    {
+        "id": "level_10",
+        "name": "资深厨师",
+        "description": "厨师等级达到10级",
+        "category": "cooking",
+        "requirement_type": "level",
+        "requirement_value": 10,
+        "reward_money": 1000,
+        "reward_reputation": 30,
+        "reward_title": "资深厨师"
+    },
+    {
+        "id": "recipes_5",
+        "name": "食谱收藏家",
+        "description": "学会5种食谱",
+        "category": "collection",
+        "requirement_type": "recipes",
+        "requirement_value": 5,
+        "reward_exp": 100
+    },
+    {
+        "id": "recipes_10",
+        "name": "美食百科",
+        "description": "学会10种食谱",
+        "category": "collection",
+        "requirement_type": "recipes",
+        "requirement_value": 10,
+        "reward_money": 500,
+        "reward_reputation": 15,
+        "reward_title": "美食家"
+    },
+    {
+        "id": "reputation_100",
+        "name": "声名鹊起",
+        "description": "声望达到100",
+        "category": "social",
+        "requirement_type": "reputation",
+        "requirement_value": 100,
+        "reward_money": 500,
+        "reward_exp": 200
+    },
+    {
+        "id": "reputation_500",
+        "name": "名厨之路",
+        "description": "声望达到500",
+        "category": "social",
+        "requirement_type": "reputation",
+        "requirement_value": 500,
+        "reward_money": 2000,
+        "reward_title": "知名厨师"
+    },
+    {
+        "id": "team_leader",
+        "name": "团队领袖",
+        "description": "成功创建一个厨师团队",
+        "category": "social",
+        "requirement_type": "team_created",
+        "requirement_value": 1,
+        "reward_exp": 100,
+        "reward_reputation": 10
+    },
+    {
+        "id": "contest_winner",
+        "name": "比赛冠军",
+        "description": "在厨艺比赛中获得第一名",
+        "category": "special",
+        "requirement_type": "contest_wins",
+        "requirement_value": 1,
+        "reward_money": 300,
+        "reward_reputation": 20,
+        "reward_title": "厨艺冠军"
+    },
+    {
+        "id": "coop_master",
+        "name": "合作达人",
+        "description": "完成5次合作料理",
+        "category": "social",
+        "requirement_type": "coop_count",
+        "requirement_value": 5,
+        "reward_exp": 150,
+        "reward_reputation": 15
+    }
+]
+
+# 事件 -> 受影响的计数器。
+# 快照计数器直接取自厨师数据；累加计数器保存在成就进度中，每次事件加一
+EVENT_COUNTERS: Dict[str, Tuple[str, ...]] = {
+    'dish_cooked': ('success_count', 'level', 'reputation'),
+    'recipe_learned': ('recipes',),
+    'contest_won': ('contest_wins', 'level', 'reputation'),
+    'coop_completed': ('coop_count', 'level', 'reputation'),
+    'team_created': ('team_created',),
+}
+INCREMENT_COUNTERS = {'contest_wins': 'contest_won', 'coop_count': 'coop_completed', 'team_created': 'team_created'}
+
+# 计数器 -> 监听它的成就（按门槛升序）
+LISTENERS: Dict[str, List[Dict]] = {}
+for _ach in ACHIEVEMENTS:
+    LISTENERS.setdefault(_ach['requirement_type'], []).append(_ach)
+for _achs in LISTENERS.values():
+    _achs.sort(key=lambda a: a['requirement_value'])
+
+
+def snapshot_value(counter: str, chef_data: Dict) -> int:
+    """从厨师数据读取快照计数器的当前值"""
+    if counter == 'recipes':
+        return len(chef_data.get('recipes', []))
+    if counter == 'level':
+        return chef_data.get('level', 1)
+    return chef_data.get(counter, 0)
+
+
+def evaluate(counter: str, value: int, unlocked: set) -> List[Dict]:
+    """返回 counter 达到 value 后新满足条件的成就"""
+    reached = []
+    for ach in LISTENERS.get(counter, []):
+        if ach['requirement_value'] > value:
+            break
+        if ach['id'] not in unlocked:
+            reached.append(ach)
+    return reached
@@ -1,10 +1,14 @@
 from pathlib import Path
 import json
 import random
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
 from datetime import datetime, timedelta
 from ..common.data_manager import DataManager
 from ..common.cooldown import check_cooldown, set_cooldown
+from ..common.inventory import Inventory, ItemRegistry
+from . import achievements as ach_engine
+from .market import IngredientMarket
+from .teams import TeamRegistry
 from .models import ChefData, Recipe, Ingredient, Kitchenware, Dish, Team, Contest, MarketListing, CoopCooking, Achievement, ChefTitle
 
 
@@ -19,6 +23,8 @@ class ChefLogic:
         self.recipes = self._load_json(self.data_root / 'recipes.json', 'recipes')
         self.ingredients = self._load_json(self.data_root / 'ingredients.json', 'ingredients')
         self.kitchenware = self._load_json(self.data_root / 'kitchenware.json', 'kitchenware')
+        self._market: Optional[IngredientMarket] = None
+        self._teams: Optional[TeamRegistry] = None
         
     def _load_json(self, path: Path, key: str = None):
         """加载 JSON 文件"""
@@ -44,6 +50,18 @@ class ChefLogic:
         """保存厨师数据"""
         chef_file = self._get_chef_file(user_id)
         chef_file.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding='utf-8')
+        # 同步所在团队的等级/声望汇总，团队表由定时任务 flush 落盘
+        self.teams.update_member(user_id, data)
+    
+    def _inventory(self, user: Dict) -> Inventory:
+        """玩家的计数背包；旧 backpack 列表中的食材和厨具在这里并入，料理仍留在 backpack"""
+        inv = Inventory(user, ItemRegistry.shared(self.data_root))
+        backpack = user.get('backpack')
+        if backpack and any(b.get('type') in ('ingredient', 'kitchenware') for b in backpack):
+            inv.fold([b for b in backpack if b.get('type') == 'ingredient'], 'ingredient')
+            inv.fold([b for b in backpack if b.get('type') == 'kitchenware'], 'kitchenware')
+            user['backpack'] = [b for b in backpack if b.get('type') not in ('ingredient', 'kitchenware')]
+        return inv
     
     # ========== 基础厨师操作 ==========
     
@@ -95,12 +113,14 @@ class ChefLogic:
             raise ValueError(f"金币不足，需要{learn_cost}金币")
         
         user['money'] -= learn_cost
-        self.dm.save_user(user_id, user)
-        
         chef_data['recipes'].append(recipe_id)
+        unlocked, user_ach = self._emit(user_id, 'recipe_learned', chef_data, user)
+        
+        self.dm.save_user(user_id, user)
         self._save_chef_data(user_id, chef_data)
+        self._commit_achievements(user_id, user_ach)
         
-        return {'recipe': recipe, 'cost': learn_cost}
+        return {'recipe': recipe, 'cost': learn_cost, 'achievements': unlocked}
     
     # ========== 烹饪系统 ==========
     
@@ -122,16 +142,15 @@ class ChefLogic:
         if recipe_id not in chef_data['recipes']:
             raise ValueError("你还没有解锁这个食谱")
         
-        user = self.dm.load_user(user_id) or {'money': 0, 'backpack': []}
+        user = self.dm.load_user(user_id) or {'money': 0}
+        inv = self._inventory(user)
         
-        # 检查食材（简化版，仅检查总数）
-        required_count = sum(ing['amount'] for ing in recipe['ingredients'])
-        backpack_ingredients = [b for b in user.get('backpack', []) if b.get('type') == 'ingredient']
-        if len(backpack_ingredients) < required_count:
+        # 检查食材
+        if not all(inv.has('ingredient', ing['id'], ing['amount']) for ing in recipe['ingredients']):
             raise ValueError("食材不足")
         
         # 获取厨具加成
-        kitchenware_bonus = self._get_kitchenware_bonus(user)
+        kitchenware_bonus = self._get_kitchenware_bonus(inv)
         
         # 计算成功率
         base_success = recipe['successRate']
@@ -148,16 +167,17 @@ class ChefLogic:
             chef_data['reputation'] += 1
             
             # 检查升级
-            while chef_data['exp'] >= chef_data['level'] * 100:
-                chef_data['level'] += 1
-                chef_data['exp'] -= (chef_data['level'] - 1) * 100
+            self._level_up(chef_data)
             
             # 获得金币
             dish_price = int(recipe['basePrice'] * (1 + chef_data['reputation'] / 100))
             user['money'] = user.get('money', 0) + dish_price
         
+        unlocked, user_ach = self._emit(user_id, 'dish_cooked', chef_data, user) if is_success else ([], None)
+        
         self._save_chef_data(user_id, chef_data)
         self.dm.save_user(user_id, user)
+        self._commit_achievements(user_id, user_ach)
         
         set_cooldown(user_id, 'chef', 'cook', 30)
         
@@ -165,10 +185,11 @@ class ChefLogic:
             'success': is_success,
             'recipe': recipe,
             'chef_level': chef_data['level'],
-            'chef_exp': chef_data['exp']
+            'chef_exp': chef_data['exp'],
+            'achievements': unlocked
         }
     
-    def _get_kitchenware_bonus(self, user: Dict) -> Dict:
+    def _get_kitchenware_bonus(self, inv: Inventory) -> Dict:
         """获取厨具加成"""
         bonus = {
             'success_rate_bonus': 0,
@@ -176,10 +197,8 @@ class ChefLogic:
             'time_reduction': 0
         }
         
-        backpack_kitchenware = [b for b in user.get('backpack', []) if b.get('type') == 'kitchenware']
-        for kw in backpack_kitchenware:
-            kw_data = next((k for k in self.kitchenware if k['id'] == kw['id']), None)
-            if kw_data:
+        for kw_data in self.kitchenware:
+            if inv.has('kitchenware', kw_data['id']):
                 bonus['success_rate_bonus'] += kw_data.get('successRateBonus', 0)
                 bonus['quality_bonus'] += kw_data.get('qualityBonus', 0)
                 bonus['time_reduction'] += kw_data.get('timeReduction', 0)
@@ -198,7 +217,7 @@ class ChefLogic:
         if not ingredient:
             raise ValueError("食材不存在")
         
-        user = self.dm.load_user(user_id) or {'money': 0, 'backpack': []}
+        user = self.dm.load_user(user_id) or {'money': 0}
         total_cost = ingredient['price'] * amount
         
         if user.get('money', 0) < total_cost:
@@ -207,13 +226,7 @@ class ChefLogic:
         user['money'] -= total_cost
         
         # 添加到背包
-        backpack_item = {
-            'id': ingredient_id,
-            'name': ingredient['name'],
-            'type': 'ingredient',
-            'amount': amount
-        }
-        user['backpack'].append(backpack_item)
+        self._inventory(user).add('ingredient', ingredient_id, amount, ingredient['name'])
         
         self.dm.save_user(user_id, user)
         
@@ -238,21 +251,18 @@ class ChefLogic:
         if chef_data['level'] < kw['unlockLevel']:
             raise ValueError(f"需要达到等级{kw['unlockLevel']}才能购买")
         
-        user = self.dm.load_user(user_id) or {'money': 0, 'backpack': []}
+        user = self.dm.load_user(user_id) or {'money': 0}
         
         if user.get('money', 0) < kw['price']:
             raise ValueError(f"金币不足，需要{kw['price']}金币")
         
         # 检查是否已拥有
-        if any(b['id'] == kitchenware_id and b.get('type') == 'kitchenware' for b in user.get('backpack', [])):
+        inv = self._inventory(user)
+        if inv.has('kitchenware', kitchenware_id):
             raise ValueError("你已经拥有这个厨具了")
         
         user['money'] -= kw['price']
-        user['backpack'].append({
-            'id': kitchenware_id,
-            'name': kw['name'],
-            'type': 'kitchenware'
-        })
+        inv.add('kitchenware', kitchenware_id, 1, kw['name'])
         
         self.dm.save_user(user_id, user)
         
@@ -266,7 +276,7 @@ class ChefLogic:
         if not chef_data:
             raise ValueError("你还不是厨师")
         
-        user = self.dm.load_user(user_id) or {'money': 0, 'backpack': []}
+        user = self.dm.load_user(user_id) or {'money': 0}
         
         # 从背包找到料理（简化版）
         dish_idx = next((i for i, b in enumerate(user.get('backpack', [])) if b.get('id') == dish_id and b.get('type') == 'dish'), None)
@@ -310,17 +320,13 @@ class ChefLogic:
     def _get_team_file(self) -> Path:
         return self.data_root / 'chef_teams.json'
     
-    def _load_teams(self) -> List[Dict]:
-        """加载所有团队"""
-        p = self._get_team_file()
-        if not p.exists():
-            return []
-        return json.loads(p.read_text(encoding='utf-8'))
-    
-    def _save_teams(self, teams: List[Dict]):
-        """保存团队数据"""
-        p = self._get_team_file()
-        p.write_text(json.dumps(teams, ensure_ascii=False, indent=2), encoding='utf-8')
+    @property
+    def teams(self) -> TeamRegistry:
+        """团队表（带成员索引和汇总），随 data_root 变化重新绑定"""
+        path = self._get_team_file()
+        if self._teams is None or self._teams.path != path:
+            self._teams = TeamRegistry(path, self._load_chef_data)
+        return self._teams
     
     def create_team(self, user_id: str, team_name: str) -> Dict:
         """创建厨师团队"""
@@ -335,15 +341,13 @@ class ChefLogic:
         if chef_data['level'] < 3:
             raise ValueError("创建团队需要厨师等级达到3级！")
         
-        teams = self._load_teams()
-        
         # 检查是否已在团队中
-        for team in teams:
-            if user_id in team['members']:
-                raise ValueError(f"你已经在团队「{team['name']}」中了！")
+        current = self.teams.of_member(user_id)
+        if current:
+            raise ValueError(f"你已经在团队「{current['name']}」中了！")
         
         # 检查团队名是否重复
-        if any(t['name'] == team_name for t in teams):
+        if self.teams.name_taken(team_name):
             raise ValueError("该团队名已被使用！")
         
         # 检查资金
@@ -353,7 +357,11 @@ class ChefLogic:
             raise ValueError(f"创建团队需要{create_cost}金币！")
         
         user['money'] -= create_cost
+        unlocked, user_ach = self._emit(user_id, 'team_created', chef_data, user)
         self.dm.save_user(user_id, user)
+        if unlocked:
+            self._save_chef_data(user_id, chef_data)
+        self._commit_achievements(user_id, user_ach)
         
         # 创建团队
         team = {
@@ -367,20 +375,16 @@ class ChefLogic:
             'created_time': datetime.now().isoformat()
         }
         
-        teams.append(team)
-        self._save_teams(teams)
+        self.teams.add(team, chef_data)
+        self.teams.save()
         
         set_cooldown(user_id, 'chef', 'team', 60)
         
-        return {"success": True, "team": team, "cost": create_cost}
+        return {"success": True, "team": team, "cost": create_cost, "achievements": unlocked}
     
     def get_user_team(self, user_id: str) -> Optional[Dict]:
         """获取用户所在的团队"""
-        teams = self._load_teams()
-        for team in teams:
-            if user_id in team['members']:
-                return team
-        return None
+        return self.teams.of_member(user_id)
     
     def join_team(self, user_id: str, team_id: str) -> Dict:
         """加入团队"""
@@ -392,22 +396,20 @@ class ChefLogic:
         if not chef_data:
             raise ValueError("你还不是厨师！")
         
-        teams = self._load_teams()
-        
         # 检查是否已在团队
         if self.get_user_team(user_id):
             raise ValueError("你已经在一个团队中了！请先退出当前团队。")
         
         # 找到目标团队
-        team = next((t for t in teams if t['id'] == team_id), None)
+        team = self.teams.get(team_id)
         if not team:
             raise ValueError("团队不存在！")
         
         if len(team['members']) >= 5:
             raise ValueError("该团队已满员(最多5人)！")
         
-        team['members'].append(user_id)
-        self._save_teams(teams)
+        self.teams.add_member(team_id, user_id, chef_data)
+        self.teams.save()
         
         set_cooldown(user_id, 'chef', 'team', 30)
         
@@ -415,7 +417,6 @@ class ChefLogic:
     
     def leave_team(self, user_id: str) -> Dict:
         """退出团队"""
-        teams = self._load_teams()
         team = self.get_user_team(user_id)
         
         if not team:
@@ -425,18 +426,13 @@ class ChefLogic:
             raise ValueError("队长不能直接退出团队！请先转让队长或解散团队。")
         
         # 从团队中移除
-        for t in teams:
-            if t['id'] == team['id']:
-                t['members'].remove(user_id)
-                break
-        
-        self._save_teams(teams)
+        self.teams.remove_member(team['id'], user_id)
+        self.teams.save()
         
         return {"success": True, "left_team": team['name']}
     
     def disband_team(self, user_id: str) -> Dict:
         """解散团队"""
-        teams = self._load_teams()
         team = self.get_user_team(user_id)
         
         if not team:
@@ -449,45 +445,22 @@ class ChefLogic:
             raise ValueError("团队还有其他成员，请先让他们退出！")
         
         # 删除团队
-        teams = [t for t in teams if t['id'] != team['id']]
-        self._save_teams(teams)
+        self.teams.remove(team['id'])
+        self.teams.save()
         
         return {"success": True, "disbanded_team": team['name']}
     
     def get_team_ranking(self) -> List[Dict]:
-        """获取团队排行榜"""
-        teams = self._load_teams()
-        
-        # 计算每个团队的综合实力
-        for team in teams:
-            total_level = 0
-            total_reputation = 0
-            for member_id in team['members']:
-                member_chef = self._load_chef_data(member_id)
-                if member_chef:
-                    total_level += member_chef['level']
-                    total_reputation += member_chef['reputation']
-            
-            team['total_level'] = total_level
-            team['total_reputation'] = total_reputation
-            team['power'] = team['level'] * 100 + total_level * 10 + total_reputation
-        
-        # 按实力排序
-        teams.sort(key=lambda x: x.get('power', 0), reverse=True)
-        
-        rankings = []
-        for i, t in enumerate(teams[:20], 1):
-            rankings.append({
-                'rank': i,
-                'id': t['id'],
-                'name': t['name'],
-                'level': t['level'],
-                'member_count': len(t['members']),
-                'total_reputation': t['total_reputation'],
-                'power': t['power']
-            })
-        
-        return rankings
+        """获取团队排行榜（读取团队汇总，不读取成员存档）"""
+        return [{
+            'rank': i,
+            'id': t['id'],
+            'name': t['name'],
+            'level': t['level'],
+            'member_count': len(t['members']),
+            'total_reputation': t['total_reputation'],
+            'power': t['power']
+        } for i, t in enumerate(self.teams.ranking(20), 1)]
     
     # ========== 高级功能：比赛系统 ==========
     
@@ -660,14 +633,19 @@ class ChefLogic:
             # 发放金币
             u = self.dm.load_user(uid) or {}
             u['money'] = u.get('money', 0) + reward_money
-            self.dm.save_user(uid, u)
             
-            # 增加经验和声望
+            # 增加经验和声望，冠军计入成就
             chef = self._load_chef_data(uid)
+            user_ach = None
             if chef:
                 chef['exp'] += reward_exp
                 chef['reputation'] += reward_rep
+                self._level_up(chef)
+                if rank == 1:
+                    user_ach = self._emit(uid, 'contest_won', chef, u)[1]
                 self._save_chef_data(uid, chef)
+            self.dm.save_user(uid, u)
+            self._commit_achievements(uid, user_ach)
             
             rewards.append({
                 'rank': rank,
@@ -711,17 +689,17 @@ class ChefLogic:
     def _get_market_file(self) -> Path:
         return self.data_root / 'chef_market.json'
     
-    def _load_market(self) -> Dict:
-        """加载市场数据"""
-        p = self._get_market_file()
-        if not p.exists():
-            return {'listings': [], 'transactions': []}
-        return json.loads(p.read_text(encoding='utf-8'))
+    @property
+    def market(self) -> IngredientMarket:
+        """食材市场挂单簿（按 id / 卖家 / 食材价格索引），随 data_root 变化重新绑定"""
+        path = self._get_market_file()
+        if self._market is None or self._market.path != path:
+            self._market = IngredientMarket(path)
+        return self._market
     
-    def _save_market(self, data: Dict):
-        """保存市场数据"""
-        p = self._get_market_file()
-        p.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding='utf-8')
+    def _add_ingredient(self, user: Dict, ingredient_id: str, name: str, amount: int):
+        """把食材放进背包"""
+        self._inventory(user).add('ingredient', ingredient_id, amount, name)
     
     def list_ingredient_for_sale(self, user_id: str, ingredient_id: str, quantity: int, price: int) -> Dict:
         """上架食材出售"""
@@ -736,40 +714,42 @@ class ChefLogic:
         user = self.dm.load_user(user_id) or {}
         
         # 检查背包中是否有足够的食材
-        backpack = user.get('backpack', [])
-        ingredient_item = next((b for b in backpack if b.get('id') == ingredient_id and b.get('type') == 'ingredient'), None)
+        inv = self._inventory(user)
+        have = inv.count('ingredient', ingredient_id)
         
-        if not ingredient_item:
+        if not have:
             raise ValueError("你没有这种食材！")
         
-        if ingredient_item.get('amount', 0) < quantity:
-            raise ValueError(f"食材数量不足！你只有{ingredient_item.get('amount', 0)}个")
+        if quantity < 1:
+            raise ValueError("数量必须大于0！")
+        
+        if have < quantity:
+            raise ValueError(f"食材数量不足！你只有{have}个")
         
         if price < 1:
             raise ValueError("价格必须大于0！")
         
         # 从背包移除
-        ingredient_item['amount'] -= quantity
-        if ingredient_item['amount'] <= 0:
-            backpack.remove(ingredient_item)
+        inv.remove('ingredient', ingredient_id, quantity)
         
         self.dm.save_user(user_id, user)
         
         # 创建挂单
-        market = self._load_market()
+        now = datetime.now()
         listing = {
-            'id': f"listing_{int(datetime.now().timestamp() * 1000)}",
+            'id': f"listing_{int(now.timestamp() * 1000)}",
             'seller_id': user_id,
             'ingredient_id': ingredient_id,
-            'ingredient_name': ingredient_item['name'],
+            'ingredient_name': inv.name_of('ingredient', ingredient_id),
             'quantity': quantity,
             'price_per_unit': price,
             'total_price': price * quantity,
-            'created_time': datetime.now().isoformat()
+            'created_time': now.isoformat(),
+            'expires_time': (now + timedelta(seconds=self.market.ttl)).isoformat()
         }
         
-        market['listings'].append(listing)
-        self._save_market(market)
+        self.market.add(listing)
+        self.market.save()
         
         set_cooldown(user_id, 'chef', 'market', 10)
         
@@ -777,116 +757,149 @@ class ChefLogic:
     
     def cancel_listing(self, user_id: str, listing_id: str) -> Dict:
         """取消挂单"""
-        market = self._load_market()
-        listing_idx = next((i for i, l in enumerate(market['listings']) if l['id'] == listing_id), None)
+        listing = self.market.get(listing_id)
         
-        if listing_idx is None:
+        if listing is None:
             raise ValueError("挂单不存在！")
         
-        listing = market['listings'][listing_idx]
-        
         if listing['seller_id'] != user_id:
             raise ValueError("这不是你的挂单！")
         
         # 返还食材
-        user = self.dm.load_user(user_id) or {'backpack': []}
-        backpack = user.get('backpack', [])
-        
-        existing = next((b for b in backpack if b.get('id') == listing['ingredient_id'] and b.get('type') == 'ingredient'), None)
-        if existing:
-            existing['amount'] = existing.get('amount', 0) + listing['quantity']
-        else:
-            backpack.append({
-                'id': listing['ingredient_id'],
-                'name': listing['ingredient_name'],
-                'type': 'ingredient',
-                'amount': listing['quantity']
-            })
-        
+        user = self.dm.load_user(user_id) or {}
+        self._add_ingredient(user, listing['ingredient_id'], listing['ingredient_name'], listing['quantity'])
         self.dm.save_user(user_id, user)
         
         # 移除挂单
-        market['listings'].pop(listing_idx)
-        self._save_market(market)
+        self.market.remove(listing_id)
+        self.market.save()
         
         return {"success": True, "cancelled_listing": listing}
     
+    def _settle_purchase(self, buyer_id: str, buyer: Dict, listing: Dict, quantity: int) -> Dict:
+        """成交 quantity 个：买家扣钱得货、卖家收款、记录交易，返回成交明细（不落盘买家和市场）"""
+        cost = listing['price_per_unit'] * quantity
+        buyer['money'] -= cost
+        self._add_ingredient(buyer, listing['ingredient_id'], listing['ingredient_name'], quantity)
+        
+        seller = self.dm.load_user(listing['seller_id']) or {'money': 0}
+        seller['money'] = seller.get('money', 0) + cost
+        self.dm.save_user(listing['seller_id'], seller)
+        
+        filled = dict(listing, quantity=quantity, total_price=cost)
+        if quantity >= listing['quantity']:
+            self.market.remove(listing['id'])
+        else:
+            self.market.reduce(listing['id'], quantity)
+        self.market.record({
+            'buyer_id': buyer_id,
+            'seller_id': listing['seller_id'],
+            'listing': filled,
+            'time': datetime.now().isoformat()
+        })
+        return filled
+    
     def buy_from_market(self, user_id: str, listing_id: str) -> Dict:
         """从市场购买"""
         rem = check_cooldown(user_id, 'chef', 'buy_market')
         if rem > 0:
             raise RuntimeError(f"cooldown:{rem}")
         
-        market = self._load_market()
-        listing_idx = next((i for i, l in enumerate(market['listings']) if l['id'] == listing_id), None)
+        listing = self.market.get(listing_id)
         
-        if listing_idx is None:
+        if listing is None:
             raise ValueError("挂单不存在！")
         
-        listing = market['listings'][listing_idx]
-        
         if listing['seller_id'] == user_id:
             raise ValueError("不能购买自己的挂单！")
         
         # 检查买家资金
-        buyer = self.dm.load_user(user_id) or {'money': 0, 'backpack': []}
+        buyer = self.dm.load_user(user_id) or {'money': 0}
         total_price = listing['total_price']
         
         if buyer.get('money', 0) < total_price:
             raise ValueError(f"金币不足！需要{total_price}金币")
         
-        # 扣钱、给食材
-        buyer['money'] -= total_price
-        
-        backpack = buyer.get('backpack', [])
-        existing = next((b for b in backpack if b.get('id') == listing['ingredient_id'] and b.get('type') == 'ingredient'), None)
-        if existing:
-            existing['amount'] = existing.get('amount', 0) + listing['quantity']
-        else:
-            backpack.append({
-                'id': listing['ingredient_id'],
-                'name': listing['ingredient_name'],
-                'type': 'ingredient',
-                'amount': listing['quantity']
-            })
-        
+        purchased = self._settle_purchase(user_id, buyer, listing, listing['quantity'])
         self.dm.save_user(user_id, buyer)
+        self.market.save()
         
-        # 给卖家钱
-        seller = self.dm.load_user(listing['seller_id']) or {'money': 0}
-        seller['money'] = seller.get('money', 0) + total_price
-        self.dm.save_user(listing['seller_id'], seller)
+        set_cooldown(user_id, 'chef', 'buy_market', 5)
         
-        # 记录交易
-        transaction = {
-            'buyer_id': user_id,
-            'seller_id': listing['seller_id'],
-            'listing': listing,
-            'time': datetime.now().isoformat()
-        }
-        market['transactions'].append(transaction)
+        return {"success": True, "purchased": purchased, "cost": total_price}
+    
+    def buy_cheapest(self, user_id: str, ingredient_id: str, quantity: int) -> Dict:
+        """按单价从低到高撮合购买指定数量的食材，挂单可部分成交"""
+        rem = check_cooldown(user_id, 'chef', 'buy_market')
+        if rem > 0:
+            raise RuntimeError(f"cooldown:{rem}")
+        
+        if quantity < 1:
+            raise ValueError("购买数量必须大于0！")
+        
+        offers = [l for l in self.market.cheapest(ingredient_id) if l['seller_id'] != user_id]
+        if not offers:
+            raise ValueError("市场上没有这种食材的挂单！")
+        
+        # 先按价格簿算出总价，钱不够就不成交
+        plan, need, cost = [], quantity, 0
+        for listing in offers:
+            take = min(need, listing['quantity'])
+            plan.append((listing, take))
+            cost += take * listing['price_per_unit']
+            need -= take
+            if need == 0:
+                break
+        if need:
+            raise ValueError(f"市场上只有{quantity - need}个该食材！")
         
-        # 只保留最近100条交易
-        if len(market['transactions']) > 100:
-            market['transactions'] = market['transactions'][-100:]
+        buyer = self.dm.load_user(user_id) or {'money': 0}
+        if buyer.get('money', 0) < cost:
+            raise ValueError(f"金币不足！需要{cost}金币")
         
-        # 移除挂单
-        market['listings'].pop(listing_idx)
-        self._save_market(market)
+        fills = [self._settle_purchase(user_id, buyer, listing, take) for listing, take in plan]
+        self.dm.save_user(user_id, buyer)
+        self.market.save()
         
         set_cooldown(user_id, 'chef', 'buy_market', 5)
         
-        return {"success": True, "purchased": listing, "cost": total_price}
+        return {
+            "success": True,
+            "ingredient_name": fills[0]['ingredient_name'],
+            "quantity": quantity,
+            "cost": cost,
+            "fills": fills
+        }
+    
+    def expire_listings(self) -> Dict:
+        """后台任务：过期挂单下架并把食材退回卖家，每个卖家只读写一次存档"""
+        expired = self.market.pop_expired(datetime.now().timestamp())
+        if not expired:
+            return {'expired': 0, 'sellers': 0}
+        by_seller: Dict[str, List[Dict]] = {}
+        for listing in expired:
+            by_seller.setdefault(listing['seller_id'], []).append(listing)
+        for seller_id, listings in by_seller.items():
+            seller = self.dm.load_user(seller_id) or {}
+            for listing in listings:
+                self._add_ingredient(seller, listing['ingredient_id'], listing['ingredient_name'], listing['quantity'])
+            self.dm.save_user(seller_id, seller)
+        self.market.save()
+        return {'expired': len(expired), 'sellers': len(by_seller)}
     
     def get_market_listings(self) -> List[Dict]:
-        """获取市场挂单列表"""
-        market = self._load_market()
-        return market.get('listings', [])
+        """获取所有市场挂单（按食材分组、单价从低到高）"""
+        market = self.market
+        return market.page(1, max(1, len(market)))['items']
+    
+    def browse_market(self, page: int = 1, ingredient_id: Optional[str] = None,
+                      per_page: int = 10) -> Dict:
+        """分页浏览市场挂单，可只看某种食材"""
+        return self.market.page(page, per_page, ingredient_id)
     
     def get_my_listings(self, user_id: str) -> List[Dict]:
         """获取我的挂单"""
-        market = self._load_market()
-        return [l for l in market.get('listings', []) if l['seller_id'] == user_id]
+        return self.market.by_seller(user_id)
 
     # ========== 高级功能：合作料理系统 ==========
     
@@ -1010,26 +1023,26 @@ class ChefLogic:
             raise ValueError("该合作料理已经开始或结束！")
         
         # 检查用户背包
-        user = self.dm.load_user(user_id) or {'backpack': []}
-        backpack = user.get('backpack', [])
-        
-        ing_item = next((b for b in backpack if b.get('id') == ingredient_id and b.get('type') == 'ingredient'), None)
-        if not ing_item:
+        user = self.dm.load_user(user_id) or {}
+        inv = self._inventory(user)
+        have = inv.count('ingredient', ingredient_id)
+        if not have:
             raise ValueError("你没有这种食材！")
         
-        if ing_item.get('amount', 0) < amount:
-            raise ValueError(f"食材数量不足！只有{ing_item.get('amount', 0)}个")
+        if amount < 1:
+            raise ValueError("数量必须大于0！")
+        
+        if have < amount:
+            raise ValueError(f"食材数量不足！只有{have}个")
         
         # 扣除食材
-        ing_item['amount'] -= amount
-        if ing_item['amount'] <= 0:
-            backpack.remove(ing_item)
+        inv.remove('ingredient', ingredient_id, amount)
         self.dm.save_user(user_id, user)
         
         # 添加贡献
         coop['participants'][user_id]['ingredients'].append({
             'id': ingredient_id,
-            'name': ing_item['name'],
+            'name': inv.name_of('ingredient', ingredient_id),
             'amount': amount
         })
         coop['participants'][user_id]['contributed'] = True
@@ -1114,8 +1127,8 @@ class ChefLogic:
         dish_id = f"coop_dish_{int(datetime.now().timestamp() * 1000)}"
         
         # 给发起者背包添加料理
-        initiator = self.dm.load_user(user_id) or {'backpack': []}
-        initiator['backpack'].append({
+        initiator = self.dm.load_user(user_id) or {}
+        initiator.setdefault('backpack', []).append({
             'id': dish_id,
             'name': coop['recipe_name'],
             'type': 'dish',
@@ -1138,14 +1151,14 @@ class ChefLogic:
                     p_chef['reputation'] += rep_gain
                     
                     # 检查升级
-                    while p_chef['exp'] >= p_chef['level'] * 100:
-                        p_chef['level'] += 1
-                        p_chef['exp'] -= (p_chef['level'] - 1) * 100
+                    self._level_up(p_chef)
                     
+                    # 计入成就后一起保存，成就记录最后写
+                    p_user = self.dm.load_user(pid) or {}
+                    user_ach = self._emit(pid, 'coop_completed', p_chef, p_user)[1]
                     self._save_chef_data(pid, p_chef)
-                    
-                    # 检查成就
-                    self._check_achievements(pid, p_chef)
+                    self.dm.save_user(pid, p_user)
+                    self._commit_achievements(pid, user_ach)
                     
                     rewards.append({
                         'user_id': pid,
@@ -1192,147 +1205,7 @@ class ChefLogic:
     
     def _load_achievements_config(self) -> List[Dict]:
         """加载成就配置"""
-        # 默认成就配置
-        default_achievements = [
-            {
-                "id": "first_dish",
-                "name": "初出茅庐",
-                "description": "成功制作第一道料理",
-                "category": "cooking",
-                "requirement_type": "success_count",
-                "requirement_value": 1,
-                "reward_exp": 50,
-                "reward_reputation": 5,
-                "reward_title": "新手厨师"
-            },
-            {
-                "id": "cooking_10",
-                "name": "厨艺初成",
-                "description": "成功制作10道料理",
-                "category": "cooking",
-                "requirement_type": "success_count",
-                "requirement_value": 10,
-                "reward_exp": 100,
-                "reward_reputation": 10
-            },
-            {
-                "id": "cooking_50",
-                "name": "烹饪能手",
-                "description": "成功制作50道料理",
-                "category": "cooking",
-                "requirement_type": "success_count",
-                "requirement_value": 50,
-                "reward_money": 500,
-                "reward_exp": 200,
-                "reward_reputation": 20,
-                "reward_title": "烹饪能手"
-            },
-            {
-                "id": "cooking_100",
-                "name": "厨艺精通",
-                "description": "成功制作100道料理",
-                "category": "cooking",
-                "requirement_type": "success_count",
-                "requirement_value": 100,
-                "reward_money": 1000,
-                "reward_exp": 500,
-                "reward_reputation": 50,
-                "reward_title": "料理大师"
-            },
-            {
-                "id": "level_5",
-                "name": "厨师进阶",
-                "description": "厨师等级达到5级",
-                "category": "cooking",
-                "requirement_type": "level",
-                "requirement_value": 5,
-                "reward_money": 300,
-                "reward_exp": 150
-            },
-            {
-                "id": "level_10",
-                "name": "资深厨师",
-                "description": "厨师等级达到10级",
-                "category": "cooking",
-                "requirement_type": "level",
-                "requirement_value": 10,
-                "reward_money": 1000,
-                "reward_reputation": 30,
-                "reward_title": "资深厨师"
-            },
-            {
-                "id": "recipes_5",
-                "name": "食谱收藏家",
-                "description": "学会5种食谱",
-                "category": "collection",
-                "requirement_type": "recipes",
-                "requirement_value": 5,
-                "reward_exp": 100
-            },
-            {
-                "id": "recipes_10",
-                "name": "美食百科",
-                "description": "学会10种食谱",
-                "category": "collection",
-                "requirement_type": "recipes",
-                "requirement_value": 10,
-                "reward_money": 500,
-                "reward_reputation": 15,
-                "reward_title": "美食家"
-            },
-            {
-                "id": "reputation_100",
-                "name": "声名鹊起",
-                "description": "声望达到100",
-                "category": "social",
-                "requirement_type": "reputation",
-                "requirement_value": 100,
-                "reward_money": 500,
-                "reward_exp": 200
-            },
-            {
-                "id": "reputation_500",
-                "name": "名厨之路",
-                "description": "声望达到500",
-                "category": "social",
-                "requirement_type": "reputation",
-                "requirement_value": 500,
-                "reward_money": 2000,
-                "reward_title": "知名厨师"
-            },
-            {
-                "id": "team_leader",
-                "name": "团队领袖",
-                "description": "成功创建一个厨师团队",
-                "category": "social",
-                "requirement_type": "team_created",
-                "requirement_value": 1,
-                "reward_exp": 100,
-                "reward_reputation": 10
-            },
-            {
-                "id": "contest_winner",
-                "name": "比赛冠军",
-                "description": "在厨艺比赛中获得第一名",
-                "category": "special",
-                "requirement_type": "contest_wins",
-                "requirement_value": 1,
-                "reward_money": 300,
-                "reward_reputation": 20,
-                "reward_title": "厨艺冠军"
-            },
-            {
-                "id": "coop_master",
-                "name": "合作达人",
-                "description": "完成5次合作料理",
-                "category": "social",
-                "requirement_type": "coop_count",
-                "requirement_value": 5,
-                "reward_exp": 150,
-                "reward_reputation": 15
-            }
-        ]
-        return default_achievements
+        return ach_engine.ACHIEVEMENTS
     
     def _get_user_achievements_file(self, user_id: str) -> Path:
         return self.chef_data_dir / f"{user_id}_achievements.json"
@@ -1354,76 +1227,93 @@ class ChefLogic:
         p = self._get_user_achievements_file(user_id)
         p.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding='utf-8')
     
-    def _check_achievements(self, user_id: str, chef_data: Dict) -> List[Dict]:
-        """检查并解锁成就"""
-        achievements = self._load_achievements_config()
-        user_ach = self._load_user_achievements(user_id)
-        
+    @staticmethod
+    def _level_up(chef_data: Dict) -> bool:
+        """经验足够时连续升级，返回是否升过级"""
+        leveled = False
+        while chef_data['exp'] >= chef_data['level'] * 100:
+            chef_data['level'] += 1
+            chef_data['exp'] -= (chef_data['level'] - 1) * 100
+            leveled = True
+        return leveled
+    
+    def _unlock(self, user_id: str, user_ach: Dict, chef_data: Dict, counters: Dict[str, int],
+                user: Dict) -> Tuple[List[Dict], bool]:
+        """
+        用给定的计数器值更新进度并解锁成就，奖励累计后一次性发放。
+        经验和声望加到 chef_data 上，金币加到 user 上，都由调用方保存；
+        返回新解锁的成就和成就记录是否有变化。成就记录要在厨师和玩家存档
+        写完之后再保存，否则奖励没落盘时成就已标记解锁，再也拿不到奖励。
+        """
+        unlocked = set(user_ach['unlocked'])
         newly_unlocked = []
-        
-        for ach in achievements:
-            if ach['id'] in user_ach['unlocked']:
-                continue  # 已解锁
-            
-            # 检查是否满足条件
-            req_type = ach['requirement_type']
-            req_value = ach['requirement_value']
-            current_value = 0
-            
-            if req_type == 'success_count':
-                current_value = chef_data.get('success_count', 0)
-            elif req_type == 'level':
-                current_value = chef_data.get('level', 1)
-            elif req_type == 'recipes':
-                current_value = len(chef_data.get('recipes', []))
-            elif req_type == 'reputation':
-                current_value = chef_data.get('reputation', 0)
-            elif req_type == 'team_created':
-                # 检查是否创建过团队
-                teams = self._load_teams()
-                current_value = 1 if any(t['leader_id'] == user_id for t in teams) else 0
-            elif req_type == 'contest_wins':
-                current_value = user_ach.get('progress', {}).get('contest_wins', 0)
-            elif req_type == 'coop_count':
-                current_value = user_ach.get('progress', {}).get('coop_count', 0)
-            
-            # 更新进度
-            user_ach['progress'][req_type] = current_value
-            
-            # 检查是否解锁
-            if current_value >= req_value:
+        changed = False
+        pending = dict(counters)
+        while pending:
+            counter, value = pending.popitem()
+            if user_ach['progress'].get(counter) != value:
+                user_ach['progress'][counter] = value
+                changed = True
+            for ach in ach_engine.evaluate(counter, value, unlocked):
+                unlocked.add(ach['id'])
                 user_ach['unlocked'].append(ach['id'])
-                
-                # 发放奖励
-                if ach.get('reward_money'):
-                    user = self.dm.load_user(user_id) or {}
-                    user['money'] = user.get('money', 0) + ach['reward_money']
-                    self.dm.save_user(user_id, user)
-                
-                if ach.get('reward_exp'):
-                    chef_data['exp'] += ach['reward_exp']
-                
+                newly_unlocked.append(ach)
+                chef_data['exp'] += ach.get('reward_exp', 0)
+                if self._level_up(chef_data):
+                    # 经验奖励可能连带升级，再检查等级成就
+                    pending['level'] = chef_data['level']
                 if ach.get('reward_reputation'):
                     chef_data['reputation'] += ach['reward_reputation']
-                
-                if ach.get('reward_title'):
-                    if ach['reward_title'] not in user_ach['titles']:
-                        user_ach['titles'].append(ach['reward_title'])
-                
-                newly_unlocked.append(ach)
-        
-        if newly_unlocked:
+                    # 声望奖励可能连带解锁声望成就
+                    pending['reputation'] = chef_data['reputation']
+                if ach.get('reward_title') and ach['reward_title'] not in user_ach['titles']:
+                    user_ach['titles'].append(ach['reward_title'])
+        
+        money = sum(ach.get('reward_money', 0) for ach in newly_unlocked)
+        if money:
+            user['money'] = user.get('money', 0) + money
+        return newly_unlocked, changed or bool(newly_unlocked)
+    
+    def _commit_achievements(self, user_id: str, user_ach: Optional[Dict]):
+        """厨师和玩家存档保存之后写成就记录；没有变化（None）时不写"""
+        if user_ach is not None:
             self._save_user_achievements(user_id, user_ach)
-            self._save_chef_data(user_id, chef_data)
-        
-        return newly_unlocked
+    
+    def _emit(self, user_id: str, event: str, chef_data: Dict, user: Dict) -> Tuple[List[Dict], Optional[Dict]]:
+        """
+        上报成就事件，只检查该事件影响的计数器。
+        返回新解锁的成就和待保存的成就记录（没有变化时为 None），
+        调用方保存厨师和玩家存档后用 _commit_achievements 写入。
+        """
+        user_ach = self._load_user_achievements(user_id)
+        counters = {}
+        for counter in ach_engine.EVENT_COUNTERS[event]:
+            if ach_engine.INCREMENT_COUNTERS.get(counter) == event:
+                counters[counter] = user_ach['progress'].get(counter, 0) + 1
+            else:
+                counters[counter] = ach_engine.snapshot_value(counter, chef_data)
+        newly_unlocked, changed = self._unlock(user_id, user_ach, chef_data, counters, user)
+        return newly_unlocked, user_ach if changed else None
     
     def check_and_unlock_achievements(self, user_id: str) -> List[Dict]:
-        """主动检查成就"""
+        """主动检查成就：按当前数据重新核对所有计数器（用于补发老存档的成就）"""
         chef_data = self._load_chef_data(user_id)
         if not chef_data:
             raise ValueError("你还不是厨师！")
-        return self._check_achievements(user_id, chef_data)
+        user_ach = self._load_user_achievements(user_id)
+        counters = {c: ach_engine.snapshot_value(c, chef_data)
+                    for c in ('success_count', 'level', 'recipes', 'reputation')}
+        for counter in ach_engine.INCREMENT_COUNTERS:
+            counters[counter] = user_ach['progress'].get(counter, 0)
+        if not counters['team_created'] and any(t['leader_id'] == user_id for t in self.teams):
+            counters['team_created'] = 1
+        user = self.dm.load_user(user_id) or {}
+        newly_unlocked, changed = self._unlock(user_id, user_ach, chef_data, counters, user)
+        if newly_unlocked:
+            self._save_chef_data(user_id, chef_data)
+            self.dm.save_user(user_id, user)
+        self._commit_achievements(user_id, user_ach if changed else None)
+        return newly_unlocked
     
     def get_all_achievements(self) -> List[Dict]:
         """获取所有成就列表"""
@@ -1474,14 +1364,22 @@ class ChefLogic:
         
         return {"success": True, "title": title}
     
-    def record_contest_win(self, user_id: str):
+    def record_contest_win(self, user_id: str) -> List[Dict]:
         """记录比赛获胜（内部调用）"""
-        user_ach = self._load_user_achievements(user_id)
-        user_ach['progress']['contest_wins'] = user_ach.get('progress', {}).get('contest_wins', 0) + 1
-        self._save_user_achievements(user_id, user_ach)
+        return self._record_event(user_id, 'contest_won')
     
-    def record_coop_complete(self, user_id: str):
+    def record_coop_complete(self, user_id: str) -> List[Dict]:
         """记录合作料理完成（内部调用）"""
-        user_ach = self._load_user_achievements(user_id)
-        user_ach['progress']['coop_count'] = user_ach.get('progress', {}).get('coop_count', 0) + 1
-        self._save_user_achievements(user_id, user_ach)
+        return self._record_event(user_id, 'coop_completed')
+    
+    def _record_event(self, user_id: str, event: str) -> List[Dict]:
+        chef_data = self._load_chef_data(user_id)
+        if not chef_data:
+            return []
+        user = self.dm.load_user(user_id) or {}
+        newly_unlocked, user_ach = self._emit(user_id, event, chef_data, user)
+        if newly_unlocked:
+            self._save_chef_data(user_id, chef_data)
+            self.dm.save_user(user_id, user)
+        self._commit_achievements(user_id, user_ach)
+        return newly_unlocked
@@ -0,0 +1,160 @@
+import bisect
+import heapq
+import json
+from collections import deque
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# 只保留最近的交易记录条数
+TRANSACTION_HISTORY = 100
+# 挂单默认有效期（秒），到期后食材退回卖家
+LISTING_TTL = 3 * 24 * 3600
+
+
+class IngredientMarket:
+    """
+    食材市场挂单簿
+
+    挂单常驻内存，维护三个索引：
+    - id -> 挂单
+    - 卖家 -> 挂单 id（按上架顺序）
+    - 食材 -> 按 (单价, 上架时间) 排序的价格簿，最便宜的在最前
+    另有按过期时间排序的最小堆，到期清理只弹出过期的挂单。
+    所有变更在内存中完成，由调用方 save() 一次性写回 chef_market.json。
+    """
+
+    def __init__(self, path: Path, ttl: float = LISTING_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._listings: Optional[Dict[str, Dict]] = None
+        self._by_seller: Dict[str, Dict[str, None]] = {}
+        self._books: Dict[str, List[Tuple[int, float, str]]] = {}
+        self._expiry: list = []   # (expires_ts, id)
+        self.transactions: deque = deque(maxlen=TRANSACTION_HISTORY)
+
+    # ========== 加载与索引 ==========
+
+    def _ensure_loaded(self) -> Dict[str, Dict]:
+        if self._listings is not None:
+            return self._listings
+        self._listings = {}
+        raw = {}
+        if self.path.exists():
+            try:
+                raw = json.loads(self.path.read_text(encoding='utf-8'))
+            except Exception:
+                raw = {}
+        for listing in raw.get('listings', []):
+            self._index(listing)
+        self.transactions.extend(raw.get('transactions', []))
+        return self._listings
+
+    @staticmethod
+    def _book_key(listing: Dict) -> Tuple[int, float, str]:
+        created = datetime.fromisoformat(listing['created_time']).timestamp()
+        return listing['price_per_unit'], created, listing['id']
+
+    def _index(self, listing: Dict):
+        lid = listing['id']
+        self._listings[lid] = listing
+        self._by_seller.setdefault(listing['seller_id'], {})[lid] = None
+        bisect.insort(self._books.setdefault(listing['ingredient_id'], []), self._book_key(listing))
+        if not listing.get('expires_time'):
+            # 旧挂单没有有效期，从上架时间起算
+            created = datetime.fromisoformat(listing['created_time'])
+            listing['expires_time'] = (created + timedelta(seconds=self.ttl)).isoformat()
+        heapq.heappush(self._expiry, (datetime.fromisoformat(listing['expires_time']).timestamp(), lid))
+
+    def save(self):
+        data = {'listings': list(self._ensure_loaded().values()), 'transactions': list(self.transactions)}
+        self.path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding='utf-8')
+
+    # ========== 查询 ==========
+
+    def __len__(self) -> int:
+        return len(self._ensure_loaded())
+
+    def get(self, listing_id: str) -> Optional[Dict]:
+        return self._ensure_loaded().get(listing_id)
+
+    def by_seller(self, seller_id: str) -> List[Dict]:
+        self._ensure_loaded()
+        return [self._listings[lid] for lid in self._by_seller.get(seller_id, {})]
+
+    def cheapest(self, ingredient_id: str) -> List[Dict]:
+        """某种食材的挂单，按单价从低到高"""
+        self._ensure_loaded()
+        return [self._listings[lid] for _, _, lid in self._books.get(ingredient_id, [])]
+
+    def page(self, page: int = 1, per_page: int = 10, ingredient_id: Optional[str] = None) -> Dict:
+        """
+        分页浏览：指定食材时按单价排序，否则按食材分组、组内按单价排序。
+        跳过整页时只看各价格簿的长度，不展开挂单。
+        """
+        self._ensure_loaded()
+        if ingredient_id is not None:
+            books = [(ingredient_id, self._books.get(ingredient_id, []))]
+        else:
+            books = sorted(self._books.items())
+        total = sum(len(book) for _, book in books)
+        pages = max(1, (total + per_page - 1) // per_page)
+        page = min(max(1, page), pages)
+        skip, items = (page - 1) * per_page, []
+        for _, book in books:
+            if skip >= len(book):
+                skip -= len(book)
+                continue
+            for _, _, lid in book[skip:skip + per_page - len(items)]:
+                items.append(self._listings[lid])
+            skip = 0
+            if len(items) >= per_page:
+                break
+        return {'items': items, 'page': page, 'pages': pages, 'total': total}
+
+    # ========== 变更 ==========
+
+    def add(self, listing: Dict):
+        self._ensure_loaded()
+        self._index(listing)
+
+    def remove(self, listing_id: str) -> Optional[Dict]:
+        """移除挂单；过期堆中的旧条目在 pop_expired 时跳过"""
+        listing = self._ensure_loaded().pop(listing_id, None)
+        if listing is None:
+            return None
+        seller = self._by_seller.get(listing['seller_id'], {})
+        seller.pop(listing_id, None)
+        if not seller:
+            self._by_seller.pop(listing['seller_id'], None)
+        book = self._books[listing['ingredient_id']]
+        i = bisect.bisect_left(book, self._book_key(listing))
+        if i < len(book) and book[i][2] == listing_id:
+            del book[i]
+        if not book:
+            del self._books[listing['ingredient_id']]
+        return listing
+
+    def reduce(self, listing_id: str, quantity: int) -> Dict:
+        """部分成交：减少挂单数量（单价不变，价格簿位置不变）"""
+        listing = self._ensure_loaded()[listing_id]
+        listing['quantity'] -= quantity
+        listing['total_price'] = listing['price_per_unit'] * listing['quantity']
+        return listing
+
+    def record(self, transaction: Dict):
+        self._ensure_loaded()
+        self.transactions.append(transaction)
+
+    def pop_expired(self, now: float) -> List[Dict]:
+        """移除并返回已过期的挂单"""
+        listings = self._ensure_loaded()
+        expired = []
+        while self._expiry and self._expiry[0][0] <= now:
+            expires_ts, lid = heapq.heappop(self._expiry)
+            listing = listings.get(lid)
+            # 已下架、或以新的有效期重新上架的挂单，会留下旧的堆条目
+            if listing is None or datetime.fromisoformat(listing['expires_time']).timestamp() != expires_ts:
+                continue
+            expired.append(self.remove(lid))
+        return expired
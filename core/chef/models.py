@@ -74,6 +74,10 @@ class Team(BaseModel):
     level: int = 1
     funds: int = 0  # 团队资金
     created_time: str
+    member_stats: Dict[str, Dict[str, int]] = {}  # 成员等级/声望快照
+    total_level: int = 0
+    total_reputation: int = 0
+    power: int = 0
 
 
 class Contest(BaseModel):
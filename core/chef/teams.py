@@ -0,0 +1,153 @@
+import json
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+
+def member_stats(chef_data: Dict) -> Dict[str, int]:
+    """团队汇总需要的成员字段"""
+    return {'level': chef_data.get('level', 1), 'reputation': chef_data.get('reputation', 0)}
+
+
+def team_power(team: Dict) -> int:
+    """团队综合实力"""
+    return team.get('level', 1) * 100 + team.get('total_level', 0) * 10 + team.get('total_reputation', 0)
+
+
+class TeamRegistry:
+    """
+    厨师团队表（chef_teams.json）
+
+    每个团队冗余保存成员的等级/声望快照（member_stats）以及汇总值
+    total_level、total_reputation、power；成员厨师数据变化时由 update_member
+    增量修正汇总，排行榜不再逐个读取成员存档。内存中另有 成员 -> 团队 索引。
+    老存档缺少汇总字段时，加载时用 load_member 读取一次成员数据补齐。
+    成员数据变化只标记脏数据，由 flush() 统一落盘；建队、入队等结构变化由调用方立即 save()。
+    """
+
+    def __init__(self, path: Path, load_member: Callable[[str], Optional[Dict]]):
+        self.path = path
+        self._load_member = load_member
+        self.dirty = False
+        self._teams: Optional[Dict[str, Dict]] = None
+        self._by_member: Dict[str, str] = {}
+
+    def _ensure_loaded(self) -> Dict[str, Dict]:
+        if self._teams is not None:
+            return self._teams
+        self._teams = {}
+        raw = json.loads(self.path.read_text(encoding='utf-8')) if self.path.exists() else []
+        migrated = False
+        for team in raw:
+            if 'member_stats' not in team:
+                team['member_stats'] = {}
+                for mid in team['members']:
+                    chef = self._load_member(mid)
+                    if chef:
+                        team['member_stats'][mid] = member_stats(chef)
+                self._recompute(team)
+                migrated = True
+            self._index(team)
+        if migrated:
+            self.save()
+        return self._teams
+
+    def _index(self, team: Dict):
+        self._teams[team['id']] = team
+        for mid in team['members']:
+            self._by_member[mid] = team['id']
+
+    @staticmethod
+    def _recompute(team: Dict):
+        stats = team['member_stats'].values()
+        team['total_level'] = sum(s['level'] for s in stats)
+        team['total_reputation'] = sum(s['reputation'] for s in stats)
+        team['power'] = team_power(team)
+
+    def save(self):
+        teams = list(self._ensure_loaded().values())
+        self.path.write_text(json.dumps(teams, ensure_ascii=False, indent=2), encoding='utf-8')
+        self.dirty = False
+
+    def flush(self):
+        if self.dirty:
+            self.save()
+
+    # ========== 查询 ==========
+
+    def __iter__(self):
+        return iter(list(self._ensure_loaded().values()))
+
+    def __len__(self) -> int:
+        return len(self._ensure_loaded())
+
+    def get(self, team_id: str) -> Optional[Dict]:
+        return self._ensure_loaded().get(team_id)
+
+    def of_member(self, user_id: str) -> Optional[Dict]:
+        self._ensure_loaded()
+        team_id = self._by_member.get(user_id)
+        return self._teams.get(team_id) if team_id else None
+
+    def name_taken(self, name: str) -> bool:
+        return any(t['name'] == name for t in self._ensure_loaded().values())
+
+    def ranking(self, limit: int = 20) -> List[Dict]:
+        """按实力排序，只读汇总字段"""
+        teams = sorted(self._ensure_loaded().values(), key=lambda t: t.get('power', 0), reverse=True)
+        return teams[:limit]
+
+    # ========== 变更 ==========
+
+    def add(self, team: Dict, leader: Dict):
+        self._ensure_loaded()
+        team['member_stats'] = {team['leader_id']: member_stats(leader)}
+        self._recompute(team)
+        self._index(team)
+        self.dirty = True
+
+    def remove(self, team_id: str) -> Optional[Dict]:
+        team = self._ensure_loaded().pop(team_id, None)
+        if team is not None:
+            for mid in team['members']:
+                if self._by_member.get(mid) == team_id:
+                    del self._by_member[mid]
+            self.dirty = True
+        return team
+
+    def add_member(self, team_id: str, user_id: str, chef_data: Dict):
+        team = self._ensure_loaded()[team_id]
+        team['members'].append(user_id)
+        stats = member_stats(chef_data)
+        team['member_stats'][user_id] = stats
+        team['total_level'] = team.get('total_level', 0) + stats['level']
+        team['total_reputation'] = team.get('total_reputation', 0) + stats['reputation']
+        team['power'] = team_power(team)
+        self._by_member[user_id] = team_id
+        self.dirty = True
+
+    def remove_member(self, team_id: str, user_id: str):
+        team = self._ensure_loaded()[team_id]
+        team['members'].remove(user_id)
+        stats = team['member_stats'].pop(user_id, None)
+        if stats:
+            team['total_level'] -= stats['level']
+            team['total_reputation'] -= stats['reputation']
+            team['power'] = team_power(team)
+        self._by_member.pop(user_id, None)
+        self.dirty = True
+
+    def update_member(self, user_id: str, chef_data: Dict) -> bool:
+        """成员厨师数据变化时按差值修正团队汇总；返回团队是否有变化"""
+        team = self.of_member(user_id)
+        if team is None:
+            return False
+        new = member_stats(chef_data)
+        old = team['member_stats'].get(user_id, {'level': 0, 'reputation': 0})
+        if old == new:
+            return False
+        team['member_stats'][user_id] = new
+        team['total_level'] = team.get('total_level', 0) + new['level'] - old['level']
+        team['total_reputation'] = team.get('total_reputation', 0) + new['reputation'] - old['reputation']
+        team['power'] = team_power(team)
+        self.dirty = True
+        return True
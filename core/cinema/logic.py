@@ -1,7 +1,9 @@
 from pathlib import Path
 import uuid
 import json
+import math
 import random
+import time
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 
@@ -12,6 +14,11 @@ from .models import (
     CinemaRankingEntry,
     THEATER_TYPES, FACILITY_TYPES, STAFF_TYPES, MOVIE_GENRES, AVAILABLE_MOVIES
 )
+from . import revenue
+from .schedule import TheaterSchedule, parse_time, format_time, DAY_MINUTES
+
+# 自动排片时场次之间的清场时间（分钟）
+SCHEDULE_GAP_MINUTES = 15
 
 
 class CinemaLogic:
@@ -19,6 +26,8 @@ class CinemaLogic:
         self.dm = data_manager or DataManager()
         self.data_path = Path(self.dm.root) / 'data' / 'cinema'
         self.data_path.mkdir(parents=True, exist_ok=True)
+        # 影厅排片索引缓存：(电影院id, 影厅id) -> (建索引时的排片版本, 索引)
+        self._schedules: Dict[tuple, tuple] = {}
 
     # ========== 文件操作 ==========
     def _cinemas_file(self) -> Path:
@@ -48,52 +57,97 @@ class CinemaLogic:
         """获取用户的电影院"""
         cinemas = self._load_cinemas()
         if user_id in cinemas:
-            return CinemaInfo(**cinemas[user_id])
+            return self._normalise(CinemaInfo(**cinemas[user_id]))
         return None
 
+    def _normalise(self, cinema: CinemaInfo) -> CinemaInfo:
+        """加载时为每个影厅建立（或复用）排片索引，顺带清理旧存档中重叠的排片"""
+        for theater in cinema.theaters:
+            self._schedule_index(cinema, theater)
+        return cinema
+
+    def _schedule_index(self, cinema: CinemaInfo, theater: Theater) -> TheaterSchedule:
+        """
+        影厅排片索引，按影厅缓存；排片版本与缓存不一致（排片被改过、新加载的旧存档等）时重建。
+        旧版冲突检查允许场次重叠，重建时按开场时间保留先排的场次，丢弃与之重叠的场次。
+        """
+        key = (cinema.id, theater.id)
+        cached = self._schedules.get(key)
+        if cached is not None and cached[0] == theater.schedule_version:
+            return cached[1]
+        index = TheaterSchedule()
+        kept = []
+        for item in sorted(theater.schedule, key=lambda x: x['time']):
+            start, duration = parse_time(item['time']), item.get('duration', 120)
+            if index.conflicts(start, duration):
+                continue
+            index.add(start, duration)
+            kept.append(item)
+        if len(kept) != len(theater.schedule):
+            theater.schedule[:] = kept
+            theater.schedule_version += 1
+        self._schedules[key] = (theater.schedule_version, index)
+        return index
+
+    def _add_showing(self, cinema: CinemaInfo, theater: Theater, movie: Movie, start: int):
+        """排入一场并同步更新缓存的索引；其他修改排片的地方也要递增 schedule_version"""
+        index = self._schedule_index(cinema, theater)
+        index.add(start, movie.duration)
+        theater.schedule.append(self._schedule_item(movie, format_time(start)))
+        theater.schedule_version += 1
+        self._schedules[(cinema.id, theater.id)] = (theater.schedule_version, index)
+
     def _save_user_cinema(self, user_id: str, cinema: CinemaInfo):
         """保存用户的电影院"""
         cinemas = self._load_cinemas()
         cinemas[user_id] = cinema.dict()
         self._save_cinemas(cinemas)
 
-    def _update_cinema_revenue(self, cinema: CinemaInfo) -> CinemaInfo:
-        """更新电影院收入"""
+    def _update_cinema_revenue(self, cinema: CinemaInfo, now: Optional[datetime] = None) -> CinemaInfo:
+        """按排片结算上次更新以来开场的所有场次，并扣除期间的维护费和工资"""
         last_update = datetime.fromisoformat(cinema.last_update)
-        now = datetime.now()
-        hours_passed = (now - last_update).total_seconds() / 3600
-        
-        if hours_passed < 1:
+        now = now or datetime.now()
+        if now <= last_update:
             return cinema
         
-        hours = int(hours_passed)
-        
-        # 计算每小时收入
-        hourly_revenue = 0
-        for theater in cinema.theaters:
-            base_revenue = THEATER_TYPES[theater.type]['capacity'] * 0.5 * 30  # 50%上座率 * 30元均价
-            reputation_mult = cinema.reputation / 100
-            hourly_revenue += int(base_revenue * reputation_mult)
-        
-        # 设施加成
-        facility_mult = 1.0
-        for f in cinema.facilities:
-            facility_mult += (f.revenue_multiplier - 1)
-        
-        hourly_revenue = int(hourly_revenue * facility_mult)
-        
-        # 计算总收入
-        revenue = hourly_revenue * hours
-        cinema.daily_revenue = hourly_revenue
-        cinema.total_revenue += revenue
-        
-        # 扣除成本
-        cost = (cinema.maintenance_cost + cinema.staff_cost) * hours / 720  # 月成本/720小时
+        result = revenue.settle(cinema, last_update.timestamp(), now.timestamp())
+        
+        # 不足1元的部分留到下次结算；累计收入不低于0，亏损不会把总收入扣成负数
+        net = result['revenue'] - result['cost'] + cinema.revenue_remainder
+        whole = math.floor(net)
+        cinema.total_revenue = max(0, cinema.total_revenue + whole)
+        cinema.revenue_remainder = net - whole
+        cinema.daily_revenue = int(result['daily_revenue'])
+        
+        for movie in cinema.movies:
+            stats = result['per_movie'].get(movie.id)
+            if stats:
+                revenue_total = stats[0] + movie.revenue_remainder
+                viewers_total = stats[1] + movie.viewers_remainder
+                movie.revenue += math.floor(revenue_total)
+                movie.viewers += math.floor(viewers_total)
+                movie.revenue_remainder = revenue_total - math.floor(revenue_total)
+                movie.viewers_remainder = viewers_total - math.floor(viewers_total)
         
         cinema.last_update = now.isoformat()
-        
         return cinema
 
+    def accrue_all(self, now: Optional[datetime] = None) -> dict:
+        """后台批量结算所有电影院的收入，cinemas.json 只读写一次"""
+        started = time.perf_counter()
+        now = now or datetime.now()
+        cinemas = self._load_cinemas()
+        total = 0
+        for uid, data in cinemas.items():
+            cinema = self._normalise(CinemaInfo(**data))
+            before = cinema.total_revenue
+            self._update_cinema_revenue(cinema, now)
+            total += cinema.total_revenue - before
+            cinemas[uid] = cinema.dict()
+        if cinemas:
+            self._save_cinemas(cinemas)
+        return {'cinemas': len(cinemas), 'revenue': total, 'elapsed': time.perf_counter() - started}
+
     # ========== 核心功能 ==========
     def buy_cinema(self, user_id: str, name: str = None) -> CinemaInfo:
         """购买电影院"""
@@ -371,32 +425,91 @@ class CinemaLogic:
         if not re.match(r'^([01]?[0-9]|2[0-3]):[0-5][0-9]$', time):
             raise ValueError("请输入正确的时间格式（24小时制，如：14:30）")
         
-        # 检查时间冲突
-        for s in theater.schedule:
-            if abs(int(s['time'].replace(':', '')) - int(time.replace(':', ''))) < movie.duration // 60 * 100:
-                raise ValueError("该时间段已有其他电影排片！")
+        # 检查时间冲突（按实际放映区间，含跨整点、跨午夜的场次）
+        start = parse_time(time)
+        time = format_time(start)
+        index = self._schedule_index(cinema, theater)
+        if index.conflicts(start, movie.duration):
+            free = index.next_free(start, movie.duration, until=DAY_MINUTES - 1)
+            hint = f"最近可排时间：{format_time(free)}" if free is not None else "今天之后已无空档"
+            raise ValueError(f"该时间段已有其他电影排片！{hint}")
         
         # 添加排片
-        schedule_item = {
+        self._add_showing(cinema, theater, movie, start)
+        theater.schedule.sort(key=lambda x: x['time'])
+        
+        self._save_user_cinema(user_id, cinema)
+        
+        set_cooldown(user_id, 'cinema', 'schedule', 15)
+        
+        return {
+            "theater_name": theater.name,
+            "movie_title": movie.title,
+            "time": time,
+            "duration": movie.duration,
+            "price": movie.base_price
+        }
+
+    @staticmethod
+    def _schedule_item(movie: Movie, time: str) -> dict:
+        return {
             "movie_id": movie.id,
             "movie_title": movie.title,
             "time": time,
             "duration": movie.duration,
             "price": movie.base_price
         }
-        theater.schedule.append(schedule_item)
-        theater.schedule.sort(key=lambda x: x['time'])
+
+    def auto_schedule(self, user_id: str, movie_title: str, open_time: str = "09:00",
+                      close_time: str = "23:59", gap: int = SCHEDULE_GAP_MINUTES) -> dict:
+        """自动排片：在营业时间内把所有影厅的空档排满该电影，场次间留出清场时间"""
+        rem = check_cooldown(user_id, 'cinema', 'schedule')
+        if rem > 0:
+            raise RuntimeError(f"cooldown:{rem}")
         
-        self._save_user_cinema(user_id, cinema)
+        cinema = self._get_user_cinema(user_id)
+        if not cinema:
+            raise ValueError("你还没有电影院！")
+        if not cinema.theaters:
+            raise ValueError("你还没有影厅！")
+        
+        movie = next((m for m in cinema.movies if m.title == movie_title), None)
+        if not movie:
+            raise ValueError("未找到该电影！请先购买电影版权。")
+        
+        import re
+        pattern = r'^([01]?[0-9]|2[0-3]):[0-5][0-9]$'
+        if not re.match(pattern, open_time) or not re.match(pattern, close_time):
+            raise ValueError("请输入正确的时间格式（24小时制，如：14:30）")
+        opening, closing = parse_time(open_time), parse_time(close_time)
+        if closing <= opening:
+            raise ValueError("结束时间必须晚于开始时间！")
         
+        added = {}
+        for theater in cinema.theaters:
+            index = self._schedule_index(cinema, theater)
+            times = []
+            start = index.next_free(opening, movie.duration, gap, until=closing)
+            while start is not None:
+                self._add_showing(cinema, theater, movie, start)
+                times.append(format_time(start))
+                start = index.next_free(start + movie.duration + gap, movie.duration, gap, until=closing)
+            if times:
+                theater.schedule.sort(key=lambda x: x['time'])
+                added[theater.name] = times
+        
+        if not added:
+            raise ValueError("营业时间内所有影厅都没有空档了！")
+        
+        self._save_user_cinema(user_id, cinema)
         set_cooldown(user_id, 'cinema', 'schedule', 15)
         
         return {
-            "theater_name": theater.name,
             "movie_title": movie.title,
-            "time": time,
             "duration": movie.duration,
-            "price": movie.base_price
+            "price": movie.base_price,
+            "theaters": added,
+            "total": sum(len(v) for v in added.values())
         }
 
     def buy_facility(self, user_id: str, facility_type: str) -> dict:
@@ -590,13 +703,13 @@ class CinemaLogic:
     def get_cinema_ranking(self, sort_by: str = "revenue") -> List[CinemaRankingEntry]:
         """获取电影院排行榜"""
         cinemas = self._load_cinemas()
+        names = self.dm.display_names(cinemas)
         
         entries = []
         for uid, data in cinemas.items():
-            user = self.dm.load_user(uid) or {}
             entries.append(CinemaRankingEntry(
                 owner_id=uid,
-                owner_name=user.get('name', f'用户{uid[:6]}'),
+                owner_name=names[uid],
                 cinema_name=data.get('name', '电影院'),
                 total_revenue=data.get('total_revenue', 0),
                 reputation=data.get('reputation', 50),
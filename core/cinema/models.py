@@ -13,6 +13,8 @@ class Theater(BaseModel):
     maintenance_cost: int = 1000
     current_movie: Optional[str] = None
     schedule: List[dict] = Field(default_factory=list)
+    # 排片每次变动都加一，排片索引缓存据此判断是否失效
+    schedule_version: int = 0
 
 
 # ========== 电影 ==========
@@ -28,6 +30,8 @@ class Movie(BaseModel):
     cost: int = 50000  # 购买版权费用
     revenue: int = 0  # 累计收入
     viewers: int = 0  # 累计观众
+    revenue_remainder: float = 0.0  # 结算时不足1元的票房，留到下次
+    viewers_remainder: float = 0.0  # 结算时不足1人的观众，留到下次
     purchase_date: str = Field(default_factory=lambda: datetime.now().isoformat())
 
 
@@ -79,6 +83,7 @@ class CinemaInfo(BaseModel):
     reputation: int = 50
     maintenance_cost: int = 0
     staff_cost: int = 0
+    revenue_remainder: float = 0.0  # 结算时不足1元的收入，留到下次
     last_update: str = Field(default_factory=lambda: datetime.now().isoformat())
 
 
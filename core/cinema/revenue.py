@@ -0,0 +1,100 @@
+"""
+电影院按场次结算
+
+每个影厅的排片每天重复一次。结算时先把排片编译成当天的场次数组
+（开场分钟、单场票房、单场观众），再对 (上次结算, 现在] 区间逐场计算
+“这一场在区间内放映了几次”——只与场次数量有关，离线一个月也不用逐小时循环。
+
+单场上座率 = 电影热度 × 口碑 × 员工效率，封顶 95%；
+设施（零食店、饮品店等）按原有的 revenue_multiplier 叠加在票房上；
+影厅维护费、设施维护费和员工工资按月 720 小时折算扣除。
+"""
+import math
+from datetime import datetime
+from typing import Dict, List, NamedTuple
+
+DAY_SECONDS = 24 * 3600
+HOURS_PER_MONTH = 720
+MAX_OCCUPANCY = 0.95
+
+
+class Showing(NamedTuple):
+    minute: int          # 当天开场分钟
+    movie_id: str
+    revenue: float       # 单场收入（含设施加成）
+    viewers: float       # 单场观众
+
+
+def _staff_multiplier(cinema) -> float:
+    """每名员工按 效率 × 等级 提供 5% 的上座加成，最多 +50%"""
+    bonus = sum(s.efficiency * s.level for s in cinema.staff) * 0.05
+    return 1 + min(0.5, bonus)
+
+
+def _facility_multiplier(cinema) -> float:
+    return 1 + sum(f.revenue_multiplier - 1 for f in cinema.facilities)
+
+
+def occupancy(movie, cinema) -> float:
+    rate = movie.popularity / 100 * (0.5 + cinema.reputation / 100) * 0.6 * _staff_multiplier(cinema)
+    return max(0.0, min(MAX_OCCUPANCY, rate))
+
+
+def compile_day(cinema) -> List[Showing]:
+    """把所有影厅的排片编译为一天的场次数组，按开场时间排序"""
+    movies = {m.id: m for m in cinema.movies}
+    facility_mult = _facility_multiplier(cinema)
+    showings = []
+    for theater in cinema.theaters:
+        for item in theater.schedule:
+            movie = movies.get(item.get('movie_id'))
+            if movie is None:
+                continue
+            hour, minute = item['time'].split(':')
+            viewers = theater.capacity * occupancy(movie, cinema)
+            price = item.get('price', movie.base_price)
+            showings.append(Showing(int(hour) * 60 + int(minute), movie.id,
+                                    viewers * price * facility_mult, viewers))
+    showings.sort(key=lambda s: s.minute)
+    return showings
+
+
+def _occurrences(minute: int, day_start: float, start_ts: float, end_ts: float) -> int:
+    """每天 minute 开场的场次在 (start_ts, end_ts] 内放映的次数"""
+    base = day_start + minute * 60
+    return math.floor((end_ts - base) / DAY_SECONDS) - math.floor((start_ts - base) / DAY_SECONDS)
+
+
+def monthly_cost(cinema) -> int:
+    return cinema.maintenance_cost + cinema.staff_cost
+
+
+def settle(cinema, start_ts: float, end_ts: float) -> Dict[str, float]:
+    """
+    结算 (start_ts, end_ts] 内开场的所有场次，返回收入、成本、观众、场次数，
+    以及按电影拆分的 {movie_id: (收入, 观众)}。
+    """
+    showings = compile_day(cinema)
+    day_start = datetime.fromtimestamp(start_ts).replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+    revenue = viewers = 0.0
+    shows = 0
+    per_movie: Dict[str, List[float]] = {}
+    for s in showings:
+        n = _occurrences(s.minute, day_start, start_ts, end_ts)
+        if n <= 0:
+            continue
+        shows += n
+        revenue += s.revenue * n
+        viewers += s.viewers * n
+        stats = per_movie.setdefault(s.movie_id, [0.0, 0.0])
+        stats[0] += s.revenue * n
+        stats[1] += s.viewers * n
+    hours = max(0.0, end_ts - start_ts) / 3600
+    return {
+        'revenue': revenue,
+        'cost': monthly_cost(cinema) / HOURS_PER_MONTH * hours,
+        'viewers': viewers,
+        'shows': shows,
+        'daily_revenue': sum(s.revenue for s in showings),
+        'per_movie': per_movie,
+    }
@@ -0,0 +1,82 @@
+"""
+影厅排片索引
+
+每个影厅的排片按当天分钟数 [开始, 结束) 存成有序、互不重叠的区间，
+跨过午夜的场次拆成两段（当天剩余部分 + 次日凌晨部分），因此 23:30 开场的
+长片也能和次日凌晨的场次正确判断冲突。冲突检查与“下一个空闲时段”查找
+都是二分定位后只看相邻区间。
+"""
+import bisect
+from typing import List, Optional, Tuple
+
+DAY_MINUTES = 24 * 60
+
+
+def parse_time(value: str) -> int:
+    """'14:30' -> 870"""
+    hour, minute = value.split(':')
+    return int(hour) * 60 + int(minute)
+
+
+def format_time(minutes: int) -> str:
+    minutes %= DAY_MINUTES
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def _segments(start: int, duration: int) -> List[Tuple[int, int]]:
+    """把 [start, start+duration) 按午夜拆段"""
+    end = start + duration
+    if end <= DAY_MINUTES:
+        return [(start, end)]
+    return [(start, DAY_MINUTES), (0, min(start, end - DAY_MINUTES))]
+
+
+class TheaterSchedule:
+    def __init__(self, items: Optional[List[dict]] = None):
+        self._starts: List[int] = []
+        self._ends: List[int] = []
+        for item in items or []:
+            self.add(parse_time(item['time']), item.get('duration', 120))
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def _overlaps(self, start: int, end: int) -> bool:
+        i = bisect.bisect_right(self._starts, start)
+        # 前一段结束得晚于本段开始，或后一段开始得早于本段结束
+        if i > 0 and self._ends[i - 1] > start:
+            return True
+        return i < len(self._starts) and self._starts[i] < end
+
+    def conflicts(self, start: int, duration: int) -> bool:
+        if duration >= DAY_MINUTES:
+            return True
+        return any(self._overlaps(s, e) for s, e in _segments(start, duration))
+
+    def add(self, start: int, duration: int):
+        for s, e in _segments(start, duration):
+            i = bisect.bisect_right(self._starts, s)
+            self._starts.insert(i, s)
+            self._ends.insert(i, e)
+
+    def next_free(self, after: int, duration: int, gap: int = 0, until: int = DAY_MINUTES) -> Optional[int]:
+        """
+        不早于 after、不晚于 until 开场的最早空闲时间（分钟），与前后场次至少间隔 gap 分钟
+        （清场时间）。找不到时返回 None。
+        """
+        start = after
+        while start <= until:
+            i = bisect.bisect_right(self._starts, start)
+            # 与前一段太近：推到前一段结束 + gap
+            if i > 0 and self._ends[i - 1] + gap > start:
+                start = self._ends[i - 1] + gap
+                continue
+            # 与后一段太近：推到后一段结束 + gap
+            if i < len(self._starts) and self._starts[i] < start + duration + gap:
+                start = self._ends[i] + gap
+                continue
+            # 跨午夜的部分与凌晨场次冲突时，越往后越冲突，直接放弃
+            if start + duration > DAY_MINUTES and self.conflicts(start, duration):
+                return None
+            return start
+        return None
@@ -2,3 +2,6 @@
 from .data_manager import DataManager
 from .cooldown import check_cooldown, set_cooldown
 from .config_manager import ConfigManager, get_config
+from .timed_stat import TimedStat
+from .session_store import SessionStore
+from .inventory import ItemRegistry, Inventory
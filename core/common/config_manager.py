@@ -20,7 +20,9 @@ class ConfigManager:
         "farm_enabled": True,
         "farm_create_cost": 500,
         "police_enabled": True,
+        "police_case_pool_size": 50,
         "doctor_enabled": True,
+        "doctor_patient_queue_size": 50,
         "firefighter_enabled": True,
         "fishing_enabled": True,
         "netbar_enabled": True,
@@ -28,6 +30,11 @@ class ConfigManager:
         "chef_enabled": True,
         "tavern_enabled": True,
         "stock_enabled": True,
+        "stock_match_interval": 5,
+        "stock_flush_interval": 60,
+        "stock_price_interval": 3600,
+        "weather_update_interval": 14400,
+        "farm_update_interval": 600,
         "anti_cheat_enabled": True,
         "max_daily_transactions": 100,
     }
@@ -61,6 +61,8 @@ class DataManager:
         self.root.mkdir(parents=True, exist_ok=True)
         self.users_dir = self.root / "users"
         self.users_dir.mkdir(parents=True, exist_ok=True)
+        # 用户显示名缓存（排行榜等只需名字的场景不必逐个读取用户文件）
+        self._names: Optional[Dict[str, str]] = None
 
     # ========== 同步方法（简单场景使用） ==========
     def load_user(self, user_id: str) -> Optional[Dict[str, Any]]:
@@ -77,6 +79,7 @@ class DataManager:
         """同步保存用户数据"""
         p = self.users_dir / f"{user_id}.json"
         p.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+        self._remember_name(user_id, data)
 
     # ========== 异步方法（推荐使用，防止框架卡死） ==========
     async def async_load_user(self, user_id: str) -> Optional[Dict[str, Any]]:
@@ -117,6 +120,7 @@ class DataManager:
                 )
         except Exception as e:
             raise RuntimeError(f"保存用户数据失败: {e}")
+        self._remember_name(user_id, data)
 
     async def async_load_json(self, filename: str) -> Dict[str, Any]:
         """异步加载任意 JSON 文件"""
@@ -166,6 +170,52 @@ class DataManager:
         bans = self._read_json(self.root / "bans.json")
         return bans.get(user_id)
 
+    # ========== 批量操作 ==========
+    def load_users(self, user_ids) -> Dict[str, Dict[str, Any]]:
+        """批量加载指定用户，不存在的用户返回空字典"""
+        return {uid: self.load_user(uid) or {} for uid in dict.fromkeys(user_ids)}
+
+    def save_users(self, users: Dict[str, Dict[str, Any]]):
+        """批量保存用户数据，每个用户只写一次文件"""
+        for uid, data in users.items():
+            self.save_user(uid, data)
+
+    # ========== 显示名缓存 ==========
+    def _names_cache(self) -> Dict[str, str]:
+        if self._names is None:
+            self._names = dict(self._read_json(self.root / "names.json"))
+        return self._names
+
+    def _save_names(self):
+        (self.root / "names.json").write_text(json.dumps(self._names, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    def _cache_name(self, user_id: str, data: Optional[Dict[str, Any]]) -> bool:
+        """更新内存中的显示名缓存，返回是否有变化；没有名字的用户缓存为空串，避免反复读文件"""
+        name = (data or {}).get('name') or ""
+        names = self._names_cache()
+        if user_id in names and names[user_id] == name:
+            return False
+        names[user_id] = name
+        return True
+
+    def _remember_name(self, user_id: str, data: Optional[Dict[str, Any]]):
+        """用户名变化时更新缓存并落盘，名字不变时不产生写入"""
+        if self._cache_name(user_id, data):
+            self._save_names()
+
+    def display_names(self, user_ids) -> Dict[str, str]:
+        """批量获取显示名；缓存未命中的用户只读取一次用户文件，缓存最多写一次"""
+        names = self._names_cache()
+        result = {}
+        changed = False
+        for uid in user_ids:
+            if uid not in names:
+                changed = self._cache_name(uid, self.load_user(uid)) or changed
+            result[uid] = names.get(uid) or f'用户{uid[:6]}'
+        if changed:
+            self._save_names()
+        return result
+
     def list_users(self) -> list:
         """列出所有用户ID"""
         return [p.stem for p in self.users_dir.glob("*.json")]
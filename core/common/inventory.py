@@ -0,0 +1,166 @@
+"""
+通用物品登记表与计数背包
+
+各系统原来各有一套背包格式（厨师的 backpack 列表、农场的 seeds/crops 列表……），
+查找都要线性扫描。这里统一为：
+
+- ItemRegistry：(类型, 系统内 id) -> 稳定的数字物品 id，并记录显示名称，
+  保存在 data/items.json，同一数据目录共用一份
+- Inventory：玩家存档中的 inventory 字段，结构为 {类型: {数字id: 数量}}，
+  增减和持有判断都是 O(1)
+
+带独立属性的物品（料理的品质、农具耐久、鱼的重量和新鲜度）不能合并计数，仍由各系统自己保存。
+"""
+import json
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+
+class ItemRegistry:
+    _shared: Dict[Path, 'ItemRegistry'] = {}
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._by_key: Optional[Dict[str, int]] = None
+        self._by_id: Dict[int, Dict] = {}
+        self._next_id = 1
+
+    @classmethod
+    def shared(cls, data_root: Path) -> 'ItemRegistry':
+        """同一数据目录下所有系统共用的登记表"""
+        path = Path(data_root) / 'items.json'
+        registry = cls._shared.get(path)
+        if registry is None:
+            registry = cls._shared[path] = cls(path)
+        return registry
+
+    @staticmethod
+    def _key(item_type: str, key: str) -> str:
+        return f"{item_type}:{key}"
+
+    def _ensure_loaded(self) -> Dict[str, int]:
+        if self._by_key is not None:
+            return self._by_key
+        self._by_key = {}
+        raw = {}
+        if self.path.exists():
+            try:
+                raw = json.loads(self.path.read_text(encoding='utf-8'))
+            except Exception:
+                raw = {}
+        for entry in raw.get('items', []):
+            self._by_key[self._key(entry['type'], entry['key'])] = entry['id']
+            self._by_id[entry['id']] = entry
+        self._next_id = max(raw.get('next_id', 1), max(self._by_id, default=0) + 1)
+        return self._by_key
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {'next_id': self._next_id, 'items': list(self._by_id.values())}
+        self.path.write_text(json.dumps(data, ensure_ascii=False), encoding='utf-8')
+
+    def find(self, item_type: str, key: str) -> Optional[int]:
+        """查询物品 id，未登记返回 None"""
+        return self._ensure_loaded().get(self._key(item_type, str(key)))
+
+    def id_of(self, item_type: str, key: str, name: Optional[str] = None) -> int:
+        """物品的数字 id，首次出现时登记（只在新登记或补全名称时写盘）"""
+        item_id = self.find(item_type, key)
+        if item_id is not None:
+            entry = self._by_id[item_id]
+            if name and entry.get('name') != name and entry.get('name') == entry['key']:
+                # 之前只知道 id 不知道名称
+                entry['name'] = name
+                self._save()
+            return item_id
+        item_id = self._next_id
+        self._next_id += 1
+        entry = {'id': item_id, 'type': item_type, 'key': str(key), 'name': name or str(key)}
+        self._by_key[self._key(item_type, str(key))] = item_id
+        self._by_id[item_id] = entry
+        self._save()
+        return item_id
+
+    def lookup(self, item_id: int) -> Optional[Dict]:
+        self._ensure_loaded()
+        return self._by_id.get(int(item_id))
+
+
+class Inventory:
+    """
+    玩家存档 record[field] 上的计数背包视图，修改直接作用于 record，
+    由调用方照常保存存档。
+    """
+
+    def __init__(self, record: Dict, registry: ItemRegistry, field: str = 'inventory'):
+        self.registry = registry
+        slots = record.get(field)
+        if not isinstance(slots, dict):
+            slots = {}
+        # 旧版扁平格式 {名称: 数量 或 {'count': n}}，归入杂项
+        legacy = {k: v for k, v in slots.items() if not self._is_bucket(v)}
+        self._slots = record[field] = {k: v for k, v in slots.items() if k not in legacy}
+        for name, value in legacy.items():
+            self.add('misc', name, int(value.get('count', 1) if isinstance(value, dict) else value), name)
+
+    @staticmethod
+    def _is_bucket(value) -> bool:
+        return isinstance(value, dict) and 'count' not in value and all(isinstance(v, int) for v in value.values())
+
+    def count(self, item_type: str, key: str) -> int:
+        item_id = self.registry.find(item_type, key)
+        if item_id is None:
+            return 0
+        return self._slots.get(item_type, {}).get(str(item_id), 0)
+
+    @staticmethod
+    def _check_amount(amount: int):
+        if amount <= 0:
+            raise ValueError("数量必须大于0")
+
+    def has(self, item_type: str, key: str, amount: int = 1) -> bool:
+        self._check_amount(amount)
+        return self.count(item_type, key) >= amount
+
+    def add(self, item_type: str, key: str, amount: int = 1, name: Optional[str] = None):
+        if amount <= 0:
+            return
+        item_id = str(self.registry.id_of(item_type, key, name))
+        bucket = self._slots.setdefault(item_type, {})
+        bucket[item_id] = bucket.get(item_id, 0) + amount
+
+    def remove(self, item_type: str, key: str, amount: int = 1):
+        """扣除物品，数量不是正数或数量不足时抛出 ValueError 且不做修改"""
+        self._check_amount(amount)
+        have = self.count(item_type, key)
+        if have < amount:
+            raise ValueError(f"数量不足！你只有{have}个")
+        bucket = self._slots[item_type]
+        item_id = str(self.registry.find(item_type, key))
+        if have == amount:
+            del bucket[item_id]
+            if not bucket:
+                del self._slots[item_type]
+        else:
+            bucket[item_id] = have - amount
+
+    def name_of(self, item_type: str, key: str) -> str:
+        item_id = self.registry.find(item_type, key)
+        entry = self.registry.lookup(item_id) if item_id is not None else None
+        return entry['name'] if entry else str(key)
+
+    def entries(self, item_type: Optional[str] = None) -> List[Dict]:
+        """展开为 [{'type', 'id', 'name', 'amount'}]，id 为系统内 id"""
+        types = [item_type] if item_type else list(self._slots)
+        result = []
+        for t in types:
+            for item_id, amount in self._slots.get(t, {}).items():
+                entry = self.registry.lookup(int(item_id)) or {'key': item_id, 'name': item_id}
+                result.append({'type': t, 'id': entry['key'], 'name': entry['name'], 'amount': amount})
+        return result
+
+    def fold(self, items: Iterable[Dict], item_type: str, key: str = 'id',
+             count: str = 'amount', name: str = 'name'):
+        """迁移：把旧格式的物品列表并入背包"""
+        for item in items:
+            self.add(item_type, item[key], item.get(count, 1), item.get(name))
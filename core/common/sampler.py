@@ -0,0 +1,71 @@
+"""
+加权随机抽样（Walker/Vose 别名法）
+
+AliasTable 预先把一组权重编译成别名表，之后每次抽样 O(1)，支持批量抽样。
+SamplerCache 按 (目录, 分桶) 缓存别名表，例如“鱼类-按等级”“酒馆事件-按等级”，
+目录重新加载（版本号变化，通常取配置文件的 mtime）时自动重建。
+
+rng 参数可传入 random.Random(seed) 以获得可复现的结果；不传时使用 random 模块，
+因此 random.seed() 同样生效。
+"""
+import random
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+
+class AliasTable:
+    def __init__(self, items: Sequence[Any], weights: Sequence[float]):
+        if len(items) != len(weights):
+            raise ValueError('items 与 weights 长度不一致')
+        pairs = [(item, w) for item, w in zip(items, weights) if w > 0]
+        if not pairs:
+            raise ValueError('没有权重大于0的选项')
+        self.items: List[Any] = [item for item, _ in pairs]
+        n = len(pairs)
+        total = sum(w for _, w in pairs)
+        scaled = [w * n / total for _, w in pairs]
+        self._prob = [1.0] * n
+        self._alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self._prob[s] = scaled[s]
+            self._alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        # 剩余项的概率因浮点误差可能略偏离1，统一视为1
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def draw(self, rng=None) -> Any:
+        rng = rng or random
+        i = rng.randrange(len(self.items))
+        return self.items[i] if rng.random() < self._prob[i] else self.items[self._alias[i]]
+
+    def draw_many(self, k: int, rng=None) -> List[Any]:
+        return [self.draw(rng) for _ in range(k)]
+
+
+class SamplerCache:
+    """按 key 缓存别名表；version 变化（目录重新加载）时重建"""
+
+    def __init__(self):
+        self._tables: Dict[Hashable, Tuple[Any, Optional[AliasTable]]] = {}
+
+    def get(self, key: Hashable, build: Callable[[], Tuple[Sequence[Any], Sequence[float]]],
+            version: Any = None) -> Optional[AliasTable]:
+        """
+        取出 key 对应的别名表，不存在或版本变化时调用 build() 返回 (items, weights) 重建。
+        没有可抽的选项时返回 None（同样会被缓存）。
+        """
+        cached = self._tables.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        items, weights = build()
+        table = AliasTable(items, weights) if any(w > 0 for w in weights) else None
+        self._tables[key] = (version, table)
+        return table
+
+    def invalidate(self):
+        self._tables.clear()
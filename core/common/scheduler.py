@@ -0,0 +1,259 @@
+"""
+世界级周期任务调度器
+
+插件持有一个 JobScheduler，所有世界刷新（天气、农场、股价、委托撮合、分红、房租等）
+都注册为任务，在事件循环中后台运行，不占用命令处理路径。任务和命令处理共用同一批
+用户文件和内存状态，所以同步任务也直接在事件循环上执行，不放进线程池，避免读改写竞争。
+
+- 触发器：IntervalTrigger（固定间隔）和 CronTrigger（类 cron 的 分/时/星期 匹配）
+- 持久化：每个任务的上次运行时间和统计写入 scheduler.json，重启后接着调度
+- 补跑：停机期间错过的触发按 catch_up 次数补跑（0 表示跳过，1 表示合并为一次）
+- 抖动：每次触发时间加上 0~jitter 秒的随机偏移，避免任务扎堆
+- 统计：运行次数、失败次数、补跑次数、耗时和最近错误
+"""
+import asyncio
+import inspect
+import json
+import random
+import time
+from dataclasses import dataclass, field, asdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from astrbot.api import logger
+except ImportError:
+    import logging
+    logger = logging.getLogger(__name__)
+
+
+class IntervalTrigger:
+    """每隔 seconds 秒触发一次"""
+
+    def __init__(self, seconds: float):
+        if seconds <= 0:
+            raise ValueError('间隔必须大于0')
+        self.seconds = seconds
+
+    def next_after(self, ts: float) -> float:
+        return ts + self.seconds
+
+    def __repr__(self):
+        return f"every {self.seconds:g}s"
+
+
+class CronTrigger:
+    """
+    类 cron 触发器，按本地时间匹配 分/时/星期（None 表示任意）
+
+    例如 CronTrigger(minute=0) 每小时整点，CronTrigger(minute=0, hour=0, weekday=0) 每周一零点。
+    """
+
+    def __init__(self, minute: Optional[int] = 0, hour: Optional[int] = None, weekday: Optional[int] = None):
+        self.minute = minute
+        self.hour = hour
+        self.weekday = weekday
+
+    def _matches(self, dt: datetime) -> bool:
+        return ((self.minute is None or dt.minute == self.minute) and
+                (self.hour is None or dt.hour == self.hour) and
+                (self.weekday is None or dt.weekday() == self.weekday))
+
+    def next_after(self, ts: float) -> float:
+        dt = datetime.fromtimestamp(ts).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # 最多向后查找一周（按分钟）
+        for _ in range(7 * 24 * 60):
+            if self._matches(dt):
+                return dt.timestamp()
+            dt += timedelta(minutes=1)
+        raise ValueError(f'无法匹配的 cron 规则: {self!r}')
+
+    def __repr__(self):
+        fmt = lambda v: '*' if v is None else str(v)
+        return f"cron {fmt(self.minute)} {fmt(self.hour)} * * {fmt(self.weekday)}"
+
+
+@dataclass
+class JobMetrics:
+    runs: int = 0
+    failures: int = 0
+    missed: int = 0              # 停机期间错过的触发次数
+    last_run: float = 0.0        # 上次运行时间戳（持久化，用于重启后调度）
+    last_duration: float = 0.0
+    total_duration: float = 0.0
+    last_error: str = ""
+
+    @property
+    def avg_duration(self) -> float:
+        return self.total_duration / self.runs if self.runs else 0.0
+
+
+@dataclass
+class Job:
+    name: str
+    func: Callable[[], Any]
+    trigger: Any
+    jitter: float = 0.0
+    catch_up: int = 1
+    metrics: JobMetrics = field(default_factory=JobMetrics)
+    next_run: float = 0.0
+    pending: int = 1             # 下次到期时需要连续运行的次数（补跑时大于1）
+
+
+class JobScheduler:
+    def __init__(self, state_path: Path, save_interval: float = 30):
+        self.state_path = state_path
+        # 高频任务不必每次都落盘，状态文件最多每 save_interval 秒写一次，停止时强制写入
+        self.save_interval = save_interval
+        self._last_save = 0.0
+        self.jobs: Dict[str, Job] = {}
+        self._state = self._load_state()
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    # ========== 持久化 ==========
+
+    def _load_state(self) -> Dict[str, dict]:
+        if not self.state_path.exists():
+            return {}
+        try:
+            return json.loads(self.state_path.read_text(encoding='utf-8'))
+        except Exception:
+            return {}
+
+    def save_state(self):
+        self._last_save = time.time()
+        data = {name: asdict(job.metrics) for name, job in self.jobs.items()}
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        self.state_path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding='utf-8')
+
+    # ========== 注册 ==========
+
+    def _jittered(self, job: Job, ts: float) -> float:
+        return ts + (random.uniform(0, job.jitter) if job.jitter else 0)
+
+    def add_job(self, name: str, func: Callable[[], Any], trigger, jitter: float = 0.0,
+                catch_up: int = 1, now: Optional[float] = None) -> Job:
+        """
+        注册任务。func 可以是普通函数或协程函数，返回值会被忽略。
+        有持久化的上次运行时间时，从那里推算下次触发；已错过的触发按 catch_up 补跑。
+        """
+        now = time.time() if now is None else now
+        job = Job(name, func, trigger, jitter, catch_up)
+        saved = self._state.get(name)
+        if saved:
+            job.metrics = JobMetrics(**{k: v for k, v in saved.items() if k in JobMetrics.__dataclass_fields__})
+        if job.metrics.last_run:
+            due = trigger.next_after(job.metrics.last_run)
+            missed = 0
+            while due <= now and missed < 10000:
+                missed += 1
+                due = trigger.next_after(due)
+            if missed:
+                job.metrics.missed += missed
+                if catch_up > 0:
+                    job.pending = min(missed, catch_up)
+                    job.next_run = now
+                else:
+                    job.next_run = self._jittered(job, due)
+            else:
+                job.next_run = self._jittered(job, due)
+        else:
+            job.next_run = self._jittered(job, trigger.next_after(now))
+        self.jobs[name] = job
+        if self._wakeup:
+            self._wakeup.set()
+        return job
+
+    # ========== 运行 ==========
+
+    async def _run_job(self, job: Job):
+        started = time.perf_counter()
+        try:
+            result = job.func()
+            if inspect.isawaitable(result):
+                await result
+            job.metrics.last_error = ""
+        except Exception as e:
+            job.metrics.failures += 1
+            job.metrics.last_error = str(e)
+            logger.error(f"定时任务 {job.name} 失败: {e}")
+        elapsed = time.perf_counter() - started
+        job.metrics.runs += 1
+        job.metrics.last_duration = elapsed
+        job.metrics.total_duration += elapsed
+
+    async def run_pending(self, now: Optional[float] = None) -> List[str]:
+        """运行所有到期任务，返回运行过的任务名"""
+        now = time.time() if now is None else now
+        ran = []
+        for job in list(self.jobs.values()):
+            if job.next_run > now:
+                continue
+            for _ in range(job.pending):
+                await self._run_job(job)
+            job.pending = 1
+            job.metrics.last_run = now
+            job.next_run = self._jittered(job, job.trigger.next_after(now))
+            ran.append(job.name)
+        if ran and time.time() - self._last_save >= self.save_interval:
+            self.save_state()
+        return ran
+
+    def next_wakeup(self) -> Optional[float]:
+        return min((job.next_run for job in self.jobs.values()), default=None)
+
+    async def _loop(self):
+        while True:
+            due = self.next_wakeup()
+            timeout = 60 if due is None else max(0.0, due - time.time())
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+                continue
+            except asyncio.TimeoutError:
+                pass
+            await self.run_pending()
+
+    def start(self) -> bool:
+        """在运行中的事件循环里启动调度，没有事件循环时返回 False"""
+        if self._task:
+            return True
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+        self._wakeup = asyncio.Event()
+        self._task = loop.create_task(self._loop())
+        return True
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.jobs:
+            self.save_state()
+
+    # ========== 统计 ==========
+
+    def metrics(self) -> List[dict]:
+        return [
+            {
+                'name': job.name,
+                'trigger': repr(job.trigger),
+                'runs': job.metrics.runs,
+                'failures': job.metrics.failures,
+                'missed': job.metrics.missed,
+                'avg_duration': job.metrics.avg_duration,
+                'last_duration': job.metrics.last_duration,
+                'last_run': job.metrics.last_run,
+                'next_run': job.next_run,
+                'last_error': job.metrics.last_error,
+            }
+            for job in self.jobs.values()
+        ]
@@ -0,0 +1,120 @@
+"""
+短期会话状态存储
+
+进行中的钓鱼、待处理的酒馆事件、警察手上的案件、消防员的灭火任务这类状态
+寿命短、改动频繁，不适合每次都整文件重写玩家存档。SessionStore 把它们放在内存里：
+
+- 每个键带过期时间（TTL），过期的键在读取或 purge() 时清除
+- 读写都只访问内存，不产生文件创建/删除
+- 可选快照：指定 snapshot_path 后，flush() 在有变更时把未过期的会话写入一个文件，
+  重启时从快照恢复，用于崩溃恢复；flush 由后台任务定期调用
+- 可选 on_expire(key, value)：会话因过期被清除时回调（主动 pop 不算），
+  用于释放会话占用的其他资源
+"""
+import heapq
+import json
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+
+class SessionStore:
+    def __init__(self, snapshot_path: Optional[Path] = None, default_ttl: float = 3600,
+                 on_expire: Optional[Callable[[str, Any], None]] = None):
+        self.snapshot_path = snapshot_path
+        self.default_ttl = default_ttl
+        self.on_expire = on_expire
+        self.dirty = False
+        self._data: Optional[Dict[str, Tuple[Any, float]]] = None   # key -> (value, expires_at)
+        self._heap: list = []   # (expires_at, key)
+
+    def _ensure_loaded(self) -> Dict[str, Tuple[Any, float]]:
+        if self._data is not None:
+            return self._data
+        self._data = {}
+        if self.snapshot_path and self.snapshot_path.exists():
+            try:
+                raw = json.loads(self.snapshot_path.read_text(encoding='utf-8'))
+            except Exception:
+                raw = {}
+            now = time.time()
+            for key, entry in raw.items():
+                if not isinstance(entry, dict):
+                    continue
+                if entry.get('expires_at', 0) > now:
+                    self._data[key] = (entry.get('value'), entry['expires_at'])
+                    heapq.heappush(self._heap, (entry['expires_at'], key))
+                else:
+                    # 停机期间过期的会话
+                    self._expired(key, entry.get('value'))
+        return self._data
+
+    def _expired(self, key: str, value: Any):
+        self.dirty = True
+        if self.on_expire:
+            self.on_expire(key, value)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        entry = self._ensure_loaded().get(key)
+        if entry is None:
+            return default
+        if entry[1] <= time.time():
+            del self._data[key]
+            self._expired(key, entry[0])
+            return default
+        return entry[0]
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """保存会话；value 需可 JSON 序列化（用于快照）"""
+        expires_at = time.time() + (ttl if ttl is not None else self.default_ttl)
+        self._ensure_loaded()[key] = (value, expires_at)
+        heapq.heappush(self._heap, (expires_at, key))
+        self.dirty = True
+
+    def touch(self):
+        """原地修改了会话值后调用，使下次 flush 写入快照"""
+        self.dirty = True
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        entry = self._ensure_loaded().pop(key, None)
+        if entry is None:
+            return default
+        self.dirty = True
+        return entry[0]
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        now = time.time()
+        for key, (value, expires_at) in list(self._ensure_loaded().items()):
+            if expires_at > now:
+                yield key, value
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.items())
+
+    def purge(self, now: Optional[float] = None) -> int:
+        """清除过期会话，只弹出已到期的堆条目，返回清除数量"""
+        data = self._ensure_loaded()
+        now = time.time() if now is None else now
+        removed = 0
+        while self._heap and self._heap[0][0] <= now:
+            expires_at, key = heapq.heappop(self._heap)
+            entry = data.get(key)
+            # 被重新设置过的键会留下旧的堆条目
+            if entry is not None and entry[1] == expires_at:
+                del data[key]
+                self._expired(key, entry[0])
+                removed += 1
+        return removed
+
+    def flush(self):
+        """把未过期的会话写入快照（没有变更或没有快照路径时什么也不做）"""
+        if not self.dirty or self.snapshot_path is None or self._data is None:
+            return
+        self.purge()
+        raw = {key: {'value': value, 'expires_at': expires_at} for key, (value, expires_at) in self._data.items()}
+        self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        self.snapshot_path.write_text(json.dumps(raw, ensure_ascii=False), encoding='utf-8')
+        self.dirty = False
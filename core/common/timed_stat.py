@@ -0,0 +1,78 @@
+"""
+随时间变化的属性（体力恢复、饥饿度下降、清洁度衰减等）
+
+每个属性只保存一条记录：
+    {'value': 基准值, 'ts': 基准时间戳, 'rate': 每小时变化量, 'lo': 下限, 'hi': 上限}
+当前值在读取时按 value + rate * 经过小时数 推算并截断到上下限，O(1) 且不需要写入；
+只有数值被命令改变（或速率改变）时才重设基准。因此不需要任何定时任务去逐条刷新数据。
+
+记录统一放在实体的 clock 字典中（按属性名索引），原有的普通字段保留为
+最近一次读取/写入时的快照，供渲染和旧代码使用。
+"""
+import time
+from typing import Dict, Optional
+
+
+class TimedStat:
+    """绑定到 clock 字典中一条记录的惰性属性"""
+
+    __slots__ = ('record',)
+
+    def __init__(self, record: dict):
+        self.record = record
+
+    @classmethod
+    def bind(cls, clock: Dict[str, dict], name: str, value: float, rate: float,
+             lo: float = 0, hi: float = 100, now: Optional[float] = None) -> 'TimedStat':
+        """
+        取出 clock 中的属性记录，不存在时以 value（通常是旧字段的值）为基准创建。
+        已有记录保留自身的速率和上下限，需要修改时调用 set_rate。
+        """
+        record = clock.get(name)
+        if record is None:
+            record = clock[name] = {
+                'value': max(lo, min(hi, value)),
+                'ts': time.time() if now is None else now,
+                'rate': rate,
+                'lo': lo,
+                'hi': hi,
+            }
+        return cls(record)
+
+    def _clamp(self, value: float) -> float:
+        return max(self.record['lo'], min(self.record['hi'], value))
+
+    def get(self, now: Optional[float] = None) -> float:
+        """当前值"""
+        r = self.record
+        hours = max(0.0, (time.time() if now is None else now) - r['ts']) / 3600
+        return self._clamp(r['value'] + r['rate'] * hours)
+
+    def set(self, value: float, now: Optional[float] = None) -> float:
+        """以新数值重设基准"""
+        self.record['value'] = self._clamp(value)
+        self.record['ts'] = time.time() if now is None else now
+        return self.record['value']
+
+    def add(self, delta: float, now: Optional[float] = None) -> float:
+        """在当前值基础上增减，返回新值"""
+        now = time.time() if now is None else now
+        return self.set(self.get(now) + delta, now)
+
+    def set_rate(self, rate: float, now: Optional[float] = None):
+        """修改变化速率；先按旧速率结算到当前时刻，避免新速率作用于过去的时间"""
+        if self.record['rate'] == rate:
+            return
+        now = time.time() if now is None else now
+        self.set(self.get(now), now)
+        self.record['rate'] = rate
+
+    def hours_until(self, target: float, now: Optional[float] = None) -> Optional[float]:
+        """到达 target 还需多少小时，永远到达不了时返回 None"""
+        current = self.get(now)
+        rate = self.record['rate']
+        if current == target:
+            return 0.0
+        if rate == 0 or (target - current) * rate < 0:
+            return None
+        return (target - current) / rate
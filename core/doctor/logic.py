@@ -1,17 +1,27 @@
 from pathlib import Path
 import uuid
 import random
+import heapq
+import time
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from ..common.data_manager import DataManager
 from ..common.cooldown import check_cooldown, set_cooldown
 from .models import DoctorInfo, Patient, DoctorSkills, DoctorStats, HospitalInfo, DOCTOR_RANKS
+from .patient_queue import PatientQueue
 
 class DoctorLogic:
-    def __init__(self, data_manager: Optional[DataManager] = None):
+    def __init__(self, data_manager: Optional[DataManager] = None, patient_ttl: int = 7200,
+                 max_patients: int = 50):
         self.dm = data_manager or DataManager()
         self.data_path = Path(self.dm.root) / 'data' / 'doctor'
         self.data_path.mkdir(parents=True, exist_ok=True)
+        # 候诊队列：按病情排序，上限 max_patients，超过 patient_ttl 秒未接诊的患者自动离院归档
+        self.patients = PatientQueue(self._patients_file(), self.data_path / 'patients_archive.jsonl',
+                                     patient_ttl, max_patients)
+        # 研究完成时间堆 (finish_at, user_id)，首次使用时从存档重建
+        self._research_due: list = []
+        self._research_loaded = False
 
     def _doctors_file(self):
         return self.data_path / 'doctors.json'
@@ -82,7 +92,12 @@ class DoctorLogic:
         return doctors.get(user_id, {})
 
     def list_patients(self):
-        return list(self._load(self._patients_file()).values())
+        """候诊患者，病情最重的在前"""
+        return self.patients.all()
+
+    def next_patient(self) -> dict:
+        """取病情最重的候诊患者，队列为空时接收一位新患者"""
+        return self.patients.peek() or self.create_patient()
 
     def create_patient(self, name: str = None, disease: str = None, severity: int = None):
         """创建患者（可自动生成）"""
@@ -122,9 +137,7 @@ class DoctorLogic:
             admitted_at=datetime.utcnow().isoformat()
         )
         
-        patients = self._load(self._patients_file())
-        patients[pid] = p.dict()
-        self._save(self._patients_file(), patients)
+        self.patients.admit(p.dict())
         return p.dict()
 
     def treat_patient(self, user_id: str, patient_id: str) -> dict:
@@ -133,8 +146,7 @@ class DoctorLogic:
         if rem > 0:
             raise RuntimeError(f"cooldown:{rem}")
         
-        patients = self._load(self._patients_file())
-        p = patients.get(patient_id)
+        p = self.patients.get(patient_id)
         if not p:
             raise ValueError('患者不存在')
         
@@ -165,9 +177,8 @@ class DoctorLogic:
         doctors[user_id] = d
         self._save(self._doctors_file(), doctors)
         
-        # 移除患者
-        patients.pop(patient_id, None)
-        self._save(self._patients_file(), patients)
+        # 患者出院
+        self.patients.discharge(patient_id, 'cured')
         
         set_cooldown(user_id, 'doctor', 'treat', 5)
         return {'reward': reward, 'exp_gain': exp_gain, 'patient': p, 'doctor': d}
@@ -197,8 +208,7 @@ class DoctorLogic:
         if rem > 0:
             raise RuntimeError(f"cooldown:{rem}")
         
-        patients = self._load(self._patients_file())
-        p = patients.get(patient_id)
+        p = self.patients.get(patient_id)
         if not p:
             raise ValueError('患者不存在')
         
@@ -230,8 +240,7 @@ class DoctorLogic:
         # 更新患者诊断状态
         p['diagnosed'] = True
         p['treatment'] = recommended_treatment
-        patients[patient_id] = p
-        self._save(self._patients_file(), patients)
+        self.patients.update(p)
         
         # 增加经验
         exp_gain = 20 + p.get('severity', 1) * 5
@@ -257,8 +266,7 @@ class DoctorLogic:
         if rem > 0:
             raise RuntimeError(f"cooldown:{rem}")
         
-        patients = self._load(self._patients_file())
-        p = patients.get(patient_id)
+        p = self.patients.get(patient_id)
         if not p:
             raise ValueError('患者不存在')
         
@@ -303,15 +311,14 @@ class DoctorLogic:
         if success:
             reward = p.get('severity', 1) * 30 + 50
             exp_gain = 30
-            # 移除患者
-            patients.pop(patient_id, None)
+            # 患者出院
+            self.patients.discharge(patient_id, 'cured')
         
         # 更新医生数据
         d['experience'] = d.get('experience', 0) + exp_gain
         self._check_level_up(d)
         doctors[user_id] = d
         self._save(self._doctors_file(), doctors)
-        self._save(self._patients_file(), patients)
         
         if reward > 0:
             user = self.dm.load_user(user_id) or {}
@@ -337,8 +344,7 @@ class DoctorLogic:
         if rem > 0:
             raise RuntimeError(f"cooldown:{rem}")
         
-        patients = self._load(self._patients_file())
-        p = patients.get(patient_id)
+        p = self.patients.get(patient_id)
         if not p:
             raise ValueError('患者不存在')
         
@@ -392,8 +398,8 @@ class DoctorLogic:
             d['stats']['surgeries_performed'] = d['stats'].get('surgeries_performed', 0) + 1
             d['stats']['lives_saved'] = d['stats'].get('lives_saved', 0) + 1
             
-            # 移除患者
-            patients.pop(patient_id, None)
+            # 患者出院
+            self.patients.discharge(patient_id, 'surgery')
         else:
             reward = reward // 4
             exp_gain = exp_gain // 2
@@ -413,7 +419,6 @@ class DoctorLogic:
         
         doctors[user_id] = d
         self._save(self._doctors_file(), doctors)
-        self._save(self._patients_file(), patients)
         
         # 发放奖励
         user = self.dm.load_user(user_id) or {}
@@ -504,12 +509,62 @@ class DoctorLogic:
 
     # ========== 医学研究 ==========
 
-    def start_research(self, user_id: str, project_name: str) -> dict:
-        """开始医学研究"""
+    RESEARCH_PROJECTS = {
+        '新药研发': {'skill_req': 30, 'exp': 500, 'money': 5000, 'desc': '研发新型药物'},
+        '手术技术': {'skill_req': 40, 'exp': 600, 'money': 6000, 'desc': '改进手术技术'},
+        '疾病预防': {'skill_req': 25, 'exp': 400, 'money': 4000, 'desc': '疾病预防研究'},
+        '基因治疗': {'skill_req': 60, 'exp': 1000, 'money': 10000, 'desc': '基因治疗研究'}
+    }
+
+    @staticmethod
+    def research_rate(research_skill: int) -> float:
+        """研究速度（每分钟进度百分比），研究能力越高越快"""
+        return (10 + research_skill // 10) / 10
+
+    @staticmethod
+    def research_progress(project: dict, now: Optional[float] = None) -> int:
+        """由开始时间和速度推算当前进度，不需要任何写入"""
+        now = time.time() if now is None else now
+        elapsed = max(0.0, now - project.get('started_ts', now))
+        return min(100, int(project.get('base_progress', 0) + elapsed / 60 * project.get('rate', 1.0)))
+
+    def _schedule_research(self, user_id: str, project: dict, research_skill: int, now: float):
+        """补全计时字段并登记完成时间；旧存档按已有进度继续计时"""
+        if 'finish_at' not in project:
+            project['base_progress'] = project.pop('progress', 0)
+            project['started_ts'] = now
+            project['rate'] = self.research_rate(research_skill)
+            project['finish_at'] = now + (100 - project['base_progress']) / project['rate'] * 60
+        heapq.heappush(self._research_due, (project['finish_at'], user_id))
+
+    def _ensure_research_timers(self):
+        """首次使用时从存档重建完成时间堆"""
+        if self._research_loaded:
+            return
+        self._research_loaded = True
+        doctors = self._load(self._doctors_file())
+        now = time.time()
+        migrated = False
+        for uid, d in doctors.items():
+            project = d.get('research_project')
+            if project:
+                migrated = migrated or 'finish_at' not in project
+                self._schedule_research(uid, project, d.get('skills', {}).get('research', 20), now)
+        if migrated:
+            self._save(self._doctors_file(), doctors)
+
+    def next_research_due(self) -> Optional[float]:
+        """最早完成的研究项目的完成时间"""
+        self._ensure_research_timers()
+        return self._research_due[0][0] if self._research_due else None
+
+    def start_research(self, user_id: str, project_name: str, origin: Optional[str] = None) -> dict:
+        """开始医学研究，之后按时间自动推进；origin 为完成提醒推送的会话来源"""
         rem = check_cooldown(user_id, 'doctor', 'research')
         if rem > 0:
             raise RuntimeError(f"cooldown:{rem}")
         
+        self._ensure_research_timers()
         doctors = self._load(self._doctors_file())
         d = doctors.get(user_id)
         if not d:
@@ -518,17 +573,9 @@ class DoctorLogic:
         if d.get('research_project'):
             raise ValueError('你已有进行中的研究项目')
         
-        # 研究项目配置
-        projects = {
-            '新药研发': {'skill_req': 30, 'exp': 500, 'money': 5000, 'desc': '研发新型药物'},
-            '手术技术': {'skill_req': 40, 'exp': 600, 'money': 6000, 'desc': '改进手术技术'},
-            '疾病预防': {'skill_req': 25, 'exp': 400, 'money': 4000, 'desc': '疾病预防研究'},
-            '基因治疗': {'skill_req': 60, 'exp': 1000, 'money': 10000, 'desc': '基因治疗研究'}
-        }
-        
-        project = projects.get(project_name)
+        project = self.RESEARCH_PROJECTS.get(project_name)
         if not project:
-            raise ValueError(f"无效的研究项目，可选: {', '.join(projects.keys())}")
+            raise ValueError(f"无效的研究项目，可选: {', '.join(self.RESEARCH_PROJECTS.keys())}")
         
         skills = d.get('skills', {})
         if skills.get('research', 20) < project['skill_req']:
@@ -536,25 +583,22 @@ class DoctorLogic:
         
         d['research_project'] = {
             'name': project_name,
-            'progress': 0,
             'exp_reward': project['exp'],
             'money_reward': project['money'],
-            'started_at': datetime.utcnow().isoformat()
+            'started_at': datetime.utcnow().isoformat(),
+            'origin': origin
         }
+        self._schedule_research(user_id, d['research_project'], skills.get('research', 20), time.time())
         
         doctors[user_id] = d
         self._save(self._doctors_file(), doctors)
         
         set_cooldown(user_id, 'doctor', 'research', 60)
         
-        return {'project': d['research_project']}
+        return {'project': dict(d['research_project'], progress=0)}
 
     def advance_research(self, user_id: str) -> dict:
-        """推进研究进度"""
-        rem = check_cooldown(user_id, 'doctor', 'advance')
-        if rem > 0:
-            raise RuntimeError(f"cooldown:{rem}")
-        
+        """查看研究进度；只读推算，已到完成时间则立即结算"""
         doctors = self._load(self._doctors_file())
         d = doctors.get(user_id)
         if not d:
@@ -564,49 +608,84 @@ class DoctorLogic:
         if not project:
             raise ValueError('没有进行中的研究项目')
         
-        skills = d.get('skills', {})
-        research_skill = skills.get('research', 20)
-        
-        # 进度增加
-        progress_gain = 10 + research_skill // 10 + random.randint(0, 10)
-        project['progress'] = min(100, project['progress'] + progress_gain)
+        now = time.time()
+        if 'finish_at' not in project:
+            # 旧存档：按已有进度补全计时字段
+            self._ensure_research_timers()
+            self._schedule_research(user_id, project, d.get('skills', {}).get('research', 20), now)
+            doctors[user_id] = d
+            self._save(self._doctors_file(), doctors)
+        
+        if now < project['finish_at']:
+            return {
+                'project_name': project['name'],
+                'progress': self.research_progress(project, now),
+                'remaining': int(project['finish_at'] - now),
+                'completed': False
+            }
         
-        completed = project['progress'] >= 100
-        result = {
+        settled = self.settle_research(now, only=[user_id])
+        rewards = settled[0] if settled else {'exp_gain': 0, 'money_gain': 0}
+        return {
             'project_name': project['name'],
-            'progress': project['progress'],
-            'progress_gain': progress_gain,
-            'completed': completed
+            'progress': 100,
+            'remaining': 0,
+            'completed': True,
+            'exp_gain': rewards['exp_gain'],
+            'money_gain': rewards['money_gain']
         }
+
+    def settle_research(self, now: Optional[float] = None, only: Optional[List[str]] = None) -> List[dict]:
+        """
+        批量结算已到完成时间的研究项目
+
+        从完成时间堆中弹出到期项目，医生档案与用户金币各只读写一次。
+        only 指定时只结算这些医生（查看进度时顺带结算自己的项目）。
+        金币奖励和本次项目的结算标记写在同一次用户保存里：若之后写医生档案失败，
+        下次结算看到标记就不再重复发金币，只补上经验并清除项目。
+        """
+        self._ensure_research_timers()
+        now = time.time() if now is None else now
+        due = set(only) if only else set()
+        if not only:
+            while self._research_due and self._research_due[0][0] <= now:
+                due.add(heapq.heappop(self._research_due)[1])
+        if not due:
+            return []
         
-        if completed:
-            # 完成研究
+        doctors = self._load(self._doctors_file())
+        settled = []
+        keys = {}
+        for uid in due:
+            d = doctors.get(uid)
+            project = (d or {}).get('research_project')
+            # 堆中可能残留已结算的旧条目
+            if not project or project.get('finish_at', now + 1) > now:
+                continue
             exp_gain = project.get('exp_reward', 500)
             money_gain = project.get('money_reward', 5000)
-            
             d['experience'] = d.get('experience', 0) + exp_gain
             if 'stats' not in d:
                 d['stats'] = {}
             d['stats']['research_completed'] = d['stats'].get('research_completed', 0) + 1
-            
-            user = self.dm.load_user(user_id) or {}
-            user['money'] = user.get('money', 0) + money_gain
-            self.dm.save_user(user_id, user)
-            
             d['research_project'] = None
             self._check_level_up(d)
-            
-            result['exp_gain'] = exp_gain
-            result['money_gain'] = money_gain
-        else:
-            d['research_project'] = project
+            settled.append({'user_id': uid, 'project_name': project['name'], 'origin': project.get('origin'),
+                            'exp_gain': exp_gain, 'money_gain': money_gain})
+            keys[uid] = f"{project['name']}@{project.get('started_at', '')}"
+        if not settled:
+            return []
         
-        doctors[user_id] = d
+        users = self.dm.load_users([r['user_id'] for r in settled])
+        for r in settled:
+            user = users.setdefault(r['user_id'], {})
+            if user.get('research_settled') == keys[r['user_id']]:
+                continue
+            user['money'] = user.get('money', 0) + r['money_gain']
+            user['research_settled'] = keys[r['user_id']]
+        self.dm.save_users(users)
         self._save(self._doctors_file(), doctors)
-        
-        set_cooldown(user_id, 'doctor', 'advance', 30)
-        
-        return result
+        return settled
 
     # ========== 医生排行榜 ==========
 
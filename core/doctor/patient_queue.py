@@ -0,0 +1,131 @@
+import heapq
+import json
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+class PatientQueue:
+    """
+    候诊队列
+
+    按病情严重程度排序的优先队列（堆 + 惰性删除），以患者ID建索引。
+    超过 ttl 秒未接诊的患者视为离院，与出院患者一起追加写入归档文件，
+    patients.json 只保留候诊中的少量患者（至多 max_size 人）。
+    离院患者留在堆里的旧条目超过在院人数时重建堆，堆大小始终与候诊人数同阶。
+    """
+
+    def __init__(self, path: Path, archive_path: Path, ttl: int = 7200, max_size: int = 50):
+        self.path = path
+        self.archive_path = archive_path
+        self.ttl = ttl
+        self.max_size = max_size
+        self._patients: Optional[Dict[str, dict]] = None
+        self._admitted: Dict[str, float] = {}   # 按入院顺序，用于过期
+        self._heap: list = []                   # (-severity, 入院时间, patient_id)
+
+    # ========== 加载与索引 ==========
+
+    def _ensure_loaded(self):
+        if self._patients is not None:
+            return
+        self._patients = {}
+        if self.path.exists():
+            try:
+                raw = json.loads(self.path.read_text(encoding='utf-8'))
+            except Exception:
+                raw = {}
+            for p in sorted(raw.values(), key=lambda p: p.get('admitted_at') or ''):
+                self._index(p)
+
+    def _index(self, patient: dict):
+        pid = patient['id']
+        try:
+            # admitted_at 为 UTC 时间（utcnow），按 UTC 换算时间戳
+            ts = datetime.fromisoformat(patient['admitted_at']).replace(tzinfo=timezone.utc).timestamp()
+        except Exception:
+            ts = time.time()
+        self._patients[pid] = patient
+        self._admitted[pid] = ts
+        heapq.heappush(self._heap, (-patient.get('severity', 1), ts, pid))
+
+    def _expire(self, now: Optional[float] = None) -> int:
+        """移除超时未接诊的患者，只检查队首，开销与过期人数成正比"""
+        cutoff = (time.time() if now is None else now) - self.ttl
+        expired = 0
+        while self._admitted:
+            pid, ts = next(iter(self._admitted.items()))
+            if ts > cutoff and len(self._patients) <= self.max_size:
+                break
+            self._remove(pid, 'left')
+            expired += 1
+        return expired
+
+    def _remove(self, patient_id: str, outcome: str) -> Optional[dict]:
+        patient = self._patients.pop(patient_id, None)
+        if patient is None:
+            return None
+        self._admitted.pop(patient_id, None)
+        if len(self._heap) > 2 * len(self._patients):
+            self._heap = [e for e in self._heap if e[2] in self._patients]
+            heapq.heapify(self._heap)
+        record = dict(patient, outcome=outcome, discharged_at=datetime.utcnow().isoformat())
+        with self.archive_path.open('a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        return patient
+
+    def _save(self):
+        self.path.write_text(json.dumps(self._patients, ensure_ascii=False, indent=2), encoding='utf-8')
+
+    # ========== 队列操作 ==========
+
+    def expire(self, now: Optional[float] = None) -> int:
+        self._ensure_loaded()
+        expired = self._expire(now)
+        if expired:
+            self._save()
+        return expired
+
+    def admit(self, patient: dict):
+        self._ensure_loaded()
+        self._index(patient)
+        self._expire()
+        self._save()
+
+    def get(self, patient_id: str) -> Optional[dict]:
+        self._ensure_loaded()
+        return self._patients.get(patient_id)
+
+    def peek(self) -> Optional[dict]:
+        """病情最重的候诊患者"""
+        self.expire()
+        while self._heap:
+            pid = self._heap[0][2]
+            if pid in self._patients:
+                return self._patients[pid]
+            heapq.heappop(self._heap)
+        return None
+
+    def all(self) -> List[dict]:
+        """按病情从重到轻排列的候诊患者"""
+        self.expire()
+        return [self._patients[e[2]] for e in sorted(e for e in self._heap if e[2] in self._patients)]
+
+    def update(self, patient: dict):
+        """保存患者状态变化（诊断结果等）"""
+        self._ensure_loaded()
+        self._patients[patient['id']] = patient
+        self._save()
+
+    def discharge(self, patient_id: str, outcome: str = 'cured') -> Optional[dict]:
+        """出院并归档"""
+        self._ensure_loaded()
+        patient = self._remove(patient_id, outcome)
+        if patient is not None:
+            self._save()
+        return patient
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self._patients)
@@ -5,6 +5,8 @@ import random
 
 from ..common.data_manager import DataManager
 from ..common.cooldown import check_cooldown, set_cooldown
+from ..common.sampler import SamplerCache
+from ..common.inventory import ItemRegistry, Inventory as PlayerInventory
 from .models import FarmData, Land, Inventory, Statistics, Plot, ActiveFarmEvent
 
 class FarmLogic:
@@ -12,6 +14,7 @@ class FarmLogic:
         self.dm = data_manager or DataManager()
         self.data_path = Path(self.dm.root) / 'data' / 'farm'
         self.data_path.mkdir(parents=True, exist_ok=True)
+        self._samplers = SamplerCache()
 
     def _farm_file(self):
         return self.data_path / 'farm_data.json'
@@ -40,6 +43,18 @@ class FarmLogic:
         data[user_id] = farm
         self._save_all(data)
 
+    def _inventory(self, user: dict, farm: dict) -> PlayerInventory:
+        """
+        种子和农产品放在玩家的通用背包里（类型 seed / crop，按作物名登记）；
+        旧农场存档 inventory 里的 seeds/crops 列表在这里并入。农具带耐久，仍留在农场存档。
+        """
+        inv = PlayerInventory(user, ItemRegistry.shared(Path(self.dm.root) / 'data'))
+        farm_inv = farm.setdefault('inventory', {})
+        for field, item_type in (('seeds', 'seed'), ('crops', 'crop')):
+            if field in farm_inv:
+                inv.fold(farm_inv.pop(field), item_type, key='name', count='count')
+        return inv
+
     def create_farm(self, user_id: str, user_data: dict) -> dict:
         # Check cooldown
         rem = check_cooldown(user_id, 'farm', 'create')
@@ -165,9 +180,9 @@ class FarmLogic:
         if plot.get('crop'):
             raise ValueError('地块已被占用')
         # check inventory for seed
-        inv_seeds = farm.get('inventory', {}).get('seeds', [])
-        seed_item = next((s for s in inv_seeds if s.get('name') == seed_name), None)
-        if not seed_item or seed_item.get('count', 0) <= 0:
+        user = self.dm.load_user(user_id) or {}
+        inv = self._inventory(user, farm)
+        if not inv.has('seed', seed_name):
             raise ValueError('没有该种子')
         # plant
         plot['crop'] = seed_name
@@ -177,10 +192,9 @@ class FarmLogic:
         plot['health'] = 100
         plot['growthStage'] = 0
         plot['harvestReady'] = False
-        seed_item['count'] -= 1
-        if seed_item['count'] <= 0:
-            farm['inventory']['seeds'] = [s for s in inv_seeds if s.get('count',0) > 0]
+        inv.remove('seed', seed_name)
         farm['log'].append({'date': datetime.utcnow().isoformat(), 'action': '种植', 'description': f"种植了{seed_name}在地块{plot_index+1}"})
+        self.dm.save_user(user_id, user)
         self.save_farm(user_id, farm)
         set_cooldown(user_id, 'farm', 'plant', 5)
         return farm
@@ -270,12 +284,8 @@ class FarmLogic:
         if random.random() < 0.1: # 10% chance
             yield_count += 1
             
-        crops = farm['inventory'].get('crops', [])
-        existing = next((c for c in crops if c.get('name')==crop_name), None)
-        if existing:
-            existing['count'] = existing.get('count',0) + yield_count
-        else:
-            crops.append({'name': crop_name, 'count': yield_count})
+        self._inventory(user_data, farm).add('crop', crop_name, yield_count)
+        self.dm.save_user(user_id, user_data)
         farm['statistics']['totalHarvested'] = farm['statistics'].get('totalHarvested',0) + yield_count
         farm['log'].append({'date': datetime.utcnow().isoformat(), 'action': '收获', 'description': f"收获了{yield_count}个{crop_name}来自地块{plot_index+1}"})
         # reset plot
@@ -314,13 +324,8 @@ class FarmLogic:
         if user.get('money',0) < price:
             raise ValueError('金币不足')
         user['money'] = user.get('money',0) - price
+        self._inventory(user, farm).add('seed', seed_name, count)
         self.dm.save_user(user_id, user)
-        inv = farm['inventory'].setdefault('seeds', [])
-        exist = next((s for s in inv if s.get('name')==seed_name), None)
-        if exist:
-            exist['count'] = exist.get('count',0) + count
-        else:
-            inv.append({'name': seed_name, 'count': count})
         farm['log'].append({'date': datetime.utcnow().isoformat(), 'action': '买种子', 'description': f"购买了{count}个{seed_name}"})
         self.save_farm(user_id, farm)
         return farm
@@ -396,27 +401,35 @@ class FarmLogic:
         import json
         return json.loads(path.read_text(encoding='utf-8'))
 
+    def _event_sampler(self):
+        """
+        事件别名表：每个事件的 probability 为百分比，累计超过100的部分无效，
+        剩余概率对应“无事件”(None)。事件文件修改后自动重建。
+        """
+        path = Path(self.dm.root) / 'data' / 'farm' / 'events.json'
+        version = path.stat().st_mtime_ns if path.exists() else None
+        def build():
+            items, weights, cumulative = [], [], 0
+            for event in self._events_data().get('events', []):
+                p = max(0, min(100, cumulative + event.get('probability', 0)) - cumulative)
+                cumulative += p
+                items.append(event)
+                weights.append(p)
+            if items:
+                items.append(None)
+                weights.append(100 - cumulative)
+            return items, weights
+        return self._samplers.get('events', build, version)
+
     def trigger_random_event(self, user_id: str) -> Optional[dict]:
         """触发随机事件"""
         farm = self.load_farm(user_id)
         if not farm:
             return None
         
-        events_config = self._events_data().get('events', [])
-        if not events_config:
-            return None
-        
         # 根据概率随机选择事件
-        roll = random.randint(1, 100)
-        cumulative = 0
-        selected_event = None
-        
-        for event in events_config:
-            cumulative += event.get('probability', 0)
-            if roll <= cumulative:
-                selected_event = event
-                break
-        
+        sampler = self._event_sampler()
+        selected_event = sampler.draw() if sampler else None
         if not selected_event:
             return None
         
@@ -625,14 +638,16 @@ class FarmLogic:
         if rem > 0:
             raise RuntimeError(f"cooldown:{rem}")
         
+        if quantity < 1:
+            raise ValueError('出售数量必须大于0')
+        
         farm = self.load_farm(user_id)
         if not farm:
             raise ValueError('没有农场')
         
-        crops = farm.get('inventory', {}).get('crops', [])
-        crop_item = next((c for c in crops if c.get('name') == crop_name), None)
-        
-        if not crop_item or crop_item.get('count', 0) < quantity:
+        user = self.dm.load_user(user_id) or {}
+        inv = self._inventory(user, farm)
+        if not inv.has('crop', crop_name, quantity):
             raise ValueError('农产品数量不足')
         
         # 获取作物售价
@@ -651,12 +666,9 @@ class FarmLogic:
         total_price = int(base_price * quantity * season_bonus)
         
         # 扣除农产品
-        crop_item['count'] -= quantity
-        if crop_item['count'] <= 0:
-            farm['inventory']['crops'] = [c for c in crops if c.get('count', 0) > 0]
+        inv.remove('crop', crop_name, quantity)
         
         # 增加金币
-        user = self.dm.load_user(user_id) or {}
         user['money'] = user.get('money', 0) + total_price
         self.dm.save_user(user_id, user)
         
@@ -799,6 +811,8 @@ class FarmLogic:
         
         seeds = self._seeds_data().get('seeds', [])
         harvested = []
+        user = self.dm.load_user(user_id) or {}
+        inv = self._inventory(user, farm)
         
         for i, plot in enumerate(farm['land']['plots']):
             if not plot.get('crop'):
@@ -830,12 +844,7 @@ class FarmLogic:
             final_yield = max(1, int(yield_count * health_bonus))
             
             # 添加到库存
-            crops = farm['inventory'].setdefault('crops', [])
-            existing = next((c for c in crops if c.get('name') == crop_name), None)
-            if existing:
-                existing['count'] = existing.get('count', 0) + final_yield
-            else:
-                crops.append({'name': crop_name, 'count': final_yield})
+            inv.add('crop', crop_name, final_yield)
             
             harvested.append({'name': crop_name, 'yield': final_yield, 'plot': i + 1})
             
@@ -862,6 +871,7 @@ class FarmLogic:
         farm['experience'] = farm.get('experience', 0) + total_harvested * 5
         self._check_level_up(farm)
         
+        self.dm.save_user(user_id, user)
         self.save_farm(user_id, farm)
         set_cooldown(user_id, 'farm', 'harvest_all', 10)
         
@@ -896,6 +906,15 @@ class FarmLogic:
 
     # ========== 农场状态查看 ==========
 
+    def _inventory_view(self, user_id: str, farm: dict) -> dict:
+        """农场库存展示：种子、农产品来自玩家背包，农具来自农场存档（只读，不写回）"""
+        inv = self._inventory(self.dm.load_user(user_id) or {}, dict(farm, inventory=dict(farm.get('inventory', {}))))
+        return {
+            'seeds': [{'name': e['name'], 'count': e['amount']} for e in inv.entries('seed')],
+            'crops': [{'name': e['name'], 'count': e['amount']} for e in inv.entries('crop')],
+            'tools': farm.get('inventory', {}).get('tools', []),
+        }
+
     def view_farm_status(self, user_id: str) -> dict:
         """查看农场详细状态"""
         farm = self.load_farm(user_id)
@@ -945,7 +964,7 @@ class FarmLogic:
                 'size': farm['land'].get('size')
             },
             'plots': plots_status,
-            'inventory': farm.get('inventory', {}),
+            'inventory': self._inventory_view(user_id, farm),
             'statistics': farm.get('statistics', {}),
             'current_season': season,
             'active_events': active_events
@@ -20,8 +20,7 @@ class Land(BaseModel):
     fertilityBonus: int = 1
 
 class Inventory(BaseModel):
-    seeds: List[dict] = Field(default_factory=list)
-    crops: List[dict] = Field(default_factory=list)
+    # 种子和农产品在玩家的通用背包中（core.common.inventory），这里只放带耐久的农具
     tools: List[dict] = Field(default_factory=list)
 
 class Statistics(BaseModel):
@@ -7,6 +7,8 @@ from typing import List, Dict, Optional, Any
 
 from ..common.data_manager import DataManager
 from ..common.cooldown import check_cooldown, set_cooldown
+from ..common.timed_stat import TimedStat
+from ..common.session_store import SessionStore
 from .models import (
     FirefighterInfo, FireStation, CurrentMission, FirefighterStats,
     FireType, FirefighterEquipment, FirefighterSkill, RescueType,
@@ -14,6 +16,11 @@ from .models import (
     FIREFIGHTER_RANKS, RANK_ORDER, Mission
 )
 
+# 生命值每小时自然恢复量
+LIFE_REGEN_PER_HOUR = 5
+# 灭火任务会话在时限之外额外保留的时间（秒），便于超时后结算失败
+MISSION_GRACE_SECONDS = 24 * 3600
+
 
 class FirefighterLogic:
     def __init__(self, data_manager: DataManager = None):
@@ -29,6 +36,9 @@ class FirefighterLogic:
         
         # 加载配置
         self._load_configs()
+        
+        # 进行中的灭火任务（内存会话，定期快照），不写入 firefighters.json
+        self.missions = SessionStore(self.data_path / 'missions_active.json')
 
     # ========== 配置加载 ==========
     def _load_configs(self):
@@ -394,19 +404,40 @@ class FirefighterLogic:
         p.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding='utf-8')
 
     def _get_user_firefighter(self, user_id: str) -> Optional[FirefighterInfo]:
-        """获取用户消防员信息"""
+        """获取用户消防员信息，进行中的任务从会话中取回"""
         firefighters = self._load_firefighters()
         if user_id in firefighters:
-            return FirefighterInfo(**firefighters[user_id])
+            info = FirefighterInfo(**firefighters[user_id])
+            mission = self.missions.get(user_id)
+            if mission:
+                info.current_mission = CurrentMission(**mission)
+            return info
         return None
 
     def _save_user_firefighter(self, user_id: str, info: FirefighterInfo):
-        """保存用户消防员信息"""
+        """保存用户消防员信息；进行中的任务只存会话，档案没有变化时不重写文件"""
+        mission = info.current_mission
+        if mission and mission.status == "进行中":
+            self.missions.set(user_id, mission.dict(), mission.time_limit + MISSION_GRACE_SECONDS)
+        else:
+            self.missions.pop(user_id)
+        data = info.dict()
+        data['current_mission'] = None
         firefighters = self._load_firefighters()
-        firefighters[user_id] = info.dict()
+        if firefighters.get(user_id) == data:
+            return
+        firefighters[user_id] = data
         self._save_firefighters(firefighters)
 
     # ========== 辅助方法 ==========
+    @staticmethod
+    def _life(user: dict) -> TimedStat:
+        """生命值随时间自然恢复，读取时推算；user['life'] 同步为当前值"""
+        stat = TimedStat.bind(user.setdefault('clock', {}), 'life',
+                              user.get('life', 100), LIFE_REGEN_PER_HOUR)
+        user['life'] = int(stat.get())
+        return stat
+
     def _get_rank_index(self, rank: str) -> int:
         """获取职级索引"""
         try:
@@ -457,7 +488,7 @@ class FirefighterLogic:
         # 检查用户基础数据
         user = self.dm.load_user(user_id) or {}
         stamina = user.get('stamina', 100)
-        life = user.get('life', 100)
+        life = self._life(user).get()
         
         if stamina < 60:
             raise ValueError("体力不足，无法加入消防队！消防工作需要良好的体力支持。")
@@ -569,7 +600,7 @@ class FirefighterLogic:
             exp_gain = 5 + random.randint(0, 5)
             info.experience += exp_gain
             health_lost = random.randint(1, 5)
-            user['life'] = user.get('life', 100) - health_lost
+            user['life'] = int(self._life(user).add(-health_lost))
         
         # 检查晋升
         new_rank = self._check_rank_up(info)
@@ -605,7 +636,7 @@ class FirefighterLogic:
         user = self.dm.load_user(user_id) or {}
         if user.get('stamina', 100) < 50:
             raise ValueError("体力不足，无法执行灭火任务！")
-        if user.get('life', 100) < 60:
+        if self._life(user).get() < 60:
             raise ValueError("健康状况不佳，无法执行灭火任务！")
         
         # 检查是否有进行中的任务
@@ -693,7 +724,7 @@ class FirefighterLogic:
             info.current_mission = None
             
             user = self.dm.load_user(user_id) or {}
-            user['life'] = user.get('life', 100) - 10
+            user['life'] = int(self._life(user).add(-10))
             user['stamina'] = user.get('stamina', 100) - 50
             self.dm.save_user(user_id, user)
             self._save_user_firefighter(user_id, info)
@@ -790,7 +821,7 @@ class FirefighterLogic:
                 health_lost = 0
                 if random.random() < 0.3:
                     health_lost = random.randint(5, 10)
-                    user['life'] = user.get('life', 100) - health_lost
+                    user['life'] = int(self._life(user).add(-health_lost))
                 
                 result.exp_gained = exp_gain
                 result.money_gained = money_gain
@@ -855,11 +886,11 @@ class FirefighterLogic:
         else:
             # 行动失败
             health_lost = random.randint(5, 15)
-            user['life'] = user.get('life', 100) - health_lost
+            user['life'] = int(self._life(user).add(-health_lost))
             result.health_lost = health_lost
             
             # 检查是否严重失败
-            if user.get('life', 100) < 30 or final_rate < 20:
+            if self._life(user).get() < 30 or final_rate < 20:
                 mission.status = "失败"
                 info.stats.missions_failed += 1
                 
@@ -1055,7 +1086,7 @@ class FirefighterLogic:
             }
         else:
             health_lost = random.randint(5, 15)
-            user['life'] = user.get('life', 100) - health_lost
+            user['life'] = int(self._life(user).add(-health_lost))
             exp_gain = rescue.get('xp_reward', 100) // 4
             info.experience += exp_gain
             
@@ -0,0 +1,83 @@
+import heapq
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from ..common.session_store import SessionStore
+
+# 会话最长保留时间（秒），超时未收杆的会话自动作废
+SESSION_TTL = 3600
+
+
+class BiteTimer:
+    """
+    钓鱼会话的咬钩计时器
+
+    进行中的会话存放在 SessionStore（内存优先，带 TTL），所有会话共用一个按咬钩时间排序的堆，
+    到点由后台任务 pop_due() 取出并主动推送“鱼儿上钩了”。
+    开始钓鱼、查询状态、收杆都只读写内存，不再读写 users.json；
+    sessions.json 是崩溃恢复快照，由 flush() 在有变更时批量落盘。
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.store = SessionStore(path, default_ttl=SESSION_TTL)
+        self._heap: Optional[list] = None   # (bite_at, user_id)
+
+    @property
+    def dirty(self) -> bool:
+        return self.store.dirty
+
+    def _ensure_loaded(self):
+        if self._heap is not None:
+            return
+        self._heap = []
+        for uid, s in self.store.items():
+            if not s.get('bitten'):
+                heapq.heappush(self._heap, (s['bite_at'], uid))
+
+    def add(self, user_id: str, bite_at: float, origin: Optional[str] = None) -> dict:
+        """登记会话，origin 为推送消息的会话来源（群聊/私聊）"""
+        self._ensure_loaded()
+        session = {'bite_at': bite_at, 'origin': origin, 'bitten': False}
+        self.store.set(user_id, session)
+        heapq.heappush(self._heap, (bite_at, user_id))
+        return session
+
+    def get(self, user_id: str) -> Optional[dict]:
+        return self.store.get(user_id)
+
+    def mark_bitten(self, user_id: str):
+        """立即咬钩（不推送提醒）"""
+        session = self.store.get(user_id)
+        if session:
+            session['bitten'] = True
+            self.store.touch()
+
+    def cancel(self, user_id: str) -> Optional[dict]:
+        """收杆后移除会话；堆中的旧条目在 pop_due 时跳过"""
+        return self.store.pop(user_id)
+
+    def next_due(self) -> Optional[float]:
+        self._ensure_loaded()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: Optional[float] = None) -> List[dict]:
+        """取出已到咬钩时间的会话并标记为已咬钩，返回 [{'user_id', 'origin', ...}]"""
+        self._ensure_loaded()
+        now = time.time() if now is None else now
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            bite_at, uid = heapq.heappop(self._heap)
+            session = self.store.get(uid)
+            # 已收杆或重新开始的会话留下的旧条目
+            if not session or session['bite_at'] != bite_at or session['bitten']:
+                continue
+            session['bitten'] = True
+            due.append(dict(session, user_id=uid))
+        if due:
+            self.store.touch()
+        return due
+
+    def flush(self):
+        self.store.flush()
@@ -6,6 +6,8 @@ from datetime import datetime
 
 from ..common.data_manager import DataManager
 from ..common.cooldown import check_cooldown, set_cooldown
+from ..common.sampler import SamplerCache
+from .bite_timer import BiteTimer
 from .models import (
     Fish, FishingRod, FishingBait, FishBasket, CaughtFish,
     FishingUserData, FishingResult, SellResult, FishingRankingEntry,
@@ -22,15 +24,20 @@ class FishingLogic:
         # 缓存配置
         self._fish_data: List[dict] = []
         self._equipment: Dict[str, List[dict]] = {}
+        self._samplers = SamplerCache()
         
         # 加载配置
         self._load_configs()
+        
+        # 进行中的钓鱼会话（内存计时，后台任务到点推送咬钩提醒）
+        self.bites = BiteTimer(self.data_path / 'sessions.json')
 
     # ========== 配置加载 ==========
     def _load_configs(self):
         """加载配置文件"""
         self._fish_data = self._load_json_config('fish.json', self._get_default_fish())
         self._equipment = self._load_json_config('equipment.json', self._get_default_equipment())
+        self._samplers.invalidate()
 
     def _load_json_config(self, filename: str, default: Any) -> Any:
         """加载JSON配置"""
@@ -136,16 +143,39 @@ class FishingLogic:
         """获取鱼类信息"""
         return next((f for f in self._fish_data if f['id'] == fish_id), None)
 
+    def _min_wait(self, data: FishingUserData) -> int:
+        """装备决定的最短等待时间（秒）"""
+        rod = self._get_equipment('rod', data.rod)
+        bait = self._get_equipment('bait', data.bait)
+        base_wait = 30  # 基础等待30秒
+        
+        # 装备减少等待时间
+        if rod:
+            base_wait -= (rod.get('level', 1) - 1) * 3
+        if bait:
+            base_wait -= (bait.get('level', 1) - 1) * 2
+        return max(10, base_wait)
+
+    def _fish_sampler(self, level: int):
+        """按钓鱼等级分桶的鱼类别名表"""
+        def build():
+            possible_fish = [f for f in self._fish_data if f.get('difficulty', 1) <= level]
+            if not possible_fish:
+                possible_fish = self._fish_data[:3]  # 至少有基础的鱼
+            # 根据稀有度加权
+            return possible_fish, [max(1, 10 - f.get('rarity', 1) * 2) for f in possible_fish]
+        return self._samplers.get(('fish', level), build)
+
     # ========== 核心功能 ==========
-    def start_fishing(self, user_id: str) -> dict:
-        """开始钓鱼"""
+    def start_fishing(self, user_id: str, origin: Optional[str] = None) -> dict:
+        """开始钓鱼，origin 为咬钩提醒推送的会话来源"""
         rem = check_cooldown(user_id, 'fishing', 'start')
         if rem > 0:
             raise RuntimeError(f"cooldown:{rem}")
         
         data = self._get_user_data(user_id)
         
-        if data.fishing_status != "idle":
+        if self.bites.get(user_id) or data.fishing_status != "idle":
             raise ValueError("你已经在钓鱼了！使用【收杆】来收取鱼获。")
         
         # 检查鱼篓容量
@@ -154,23 +184,9 @@ class FishingLogic:
         if len(data.fish_basket) >= capacity:
             raise ValueError("鱼篓已满！请先使用【出售鱼获】清空鱼篓。")
         
-        # 设置状态
-        data.fishing_status = "waiting"
-        data.start_time = datetime.now().timestamp()
-        self._save_user_data(user_id, data)
-        
-        # 计算等待时间
-        rod = self._get_equipment('rod', data.rod)
-        bait = self._get_equipment('bait', data.bait)
-        base_wait = 30  # 基础等待30秒
-        
-        # 装备减少等待时间
-        if rod:
-            base_wait -= (rod.get('level', 1) - 1) * 3
-        if bait:
-            base_wait -= (bait.get('level', 1) - 1) * 2
-        
-        wait_time = max(10, base_wait) + random.randint(0, 20)
+        # 钓鱼状态只存在会话里，不写存档；到点由计时器推送咬钩提醒
+        wait_time = self._min_wait(data) + random.randint(0, 20)
+        self.bites.add(user_id, datetime.now().timestamp() + wait_time, origin)
         
         set_cooldown(user_id, 'fishing', 'start', 30)
         
@@ -181,7 +197,15 @@ class FishingLogic:
         }
 
     def check_fishing_status(self, user_id: str) -> dict:
-        """检查钓鱼状态"""
+        """检查钓鱼状态；进行中的会话直接从内存计时器回答"""
+        session = self.bites.get(user_id)
+        if session:
+            remaining = int(session['bite_at'] - datetime.now().timestamp())
+            if session['bitten'] or remaining <= 0:
+                return {"status": "ready", "message": "鱼儿上钩了！快使用【收杆】！"}
+            return {"status": "waiting", "message": f"还在等待中...约 {remaining} 秒后可能有鱼上钩"}
+        
+        # 没有计时会话时按旧版存档中的状态推算，不再写回
         data = self._get_user_data(user_id)
         
         if data.fishing_status == "idle":
@@ -190,22 +214,11 @@ class FishingLogic:
         elapsed = datetime.now().timestamp() - data.start_time
         
         if data.fishing_status == "waiting":
-            # 计算预期等待时间
-            rod = self._get_equipment('rod', data.rod)
-            bait = self._get_equipment('bait', data.bait)
-            base_wait = 30
-            if rod:
-                base_wait -= (rod.get('level', 1) - 1) * 3
-            if bait:
-                base_wait -= (bait.get('level', 1) - 1) * 2
-            
-            if elapsed >= max(10, base_wait):
-                # 转为ready状态
-                data.fishing_status = "ready"
-                self._save_user_data(user_id, data)
+            min_wait = self._min_wait(data)
+            if elapsed >= min_wait:
                 return {"status": "ready", "message": "鱼儿上钩了！快使用【收杆】！"}
             
-            remaining = int(max(10, base_wait) - elapsed)
+            remaining = int(min_wait - elapsed)
             return {"status": "waiting", "message": f"还在等待中...约 {remaining} 秒后可能有鱼上钩"}
         
         return {"status": data.fishing_status, "message": "鱼儿上钩了！快使用【收杆】！"}
@@ -217,27 +230,30 @@ class FishingLogic:
             raise RuntimeError(f"cooldown:{rem}")
         
         data = self._get_user_data(user_id)
+        session = self.bites.cancel(user_id)
+        # 旧版存档里残留的钓鱼状态，收杆时一并清除
+        legacy = data.fishing_status != "idle"
         
-        if data.fishing_status == "idle":
+        if not session and not legacy:
             raise ValueError("你还没有开始钓鱼！请先使用【开始钓鱼】。")
         
-        # 检查是否足够时间
-        elapsed = datetime.now().timestamp() - data.start_time
+        # 检查是否足够时间：有计时会话时以咬钩时间为准
+        now = datetime.now().timestamp()
         rod = self._get_equipment('rod', data.rod)
         bait = self._get_equipment('bait', data.bait)
-        base_wait = 30
-        if rod:
-            base_wait -= (rod.get('level', 1) - 1) * 3
-        if bait:
-            base_wait -= (bait.get('level', 1) - 1) * 2
-        
-        min_wait = max(10, base_wait)
+        if session:
+            too_early = not session['bitten'] and now < session['bite_at']
+        else:
+            too_early = data.fishing_status == "waiting" and now - data.start_time < self._min_wait(data)
         
-        if data.fishing_status == "waiting" and elapsed < min_wait:
-            # 太早收杆
+        if legacy:
             data.fishing_status = "idle"
             data.start_time = 0
-            self._save_user_data(user_id, data)
+        
+        if too_early:
+            # 太早收杆
+            if legacy:
+                self._save_user_data(user_id, data)
             set_cooldown(user_id, 'fishing', 'pull', 5)
             return FishingResult(
                 success=False,
@@ -258,14 +274,8 @@ class FishingLogic:
         result = FishingResult(success=is_success)
         
         if is_success:
-            # 筛选可钓到的鱼
-            possible_fish = [f for f in self._fish_data if f.get('difficulty', 1) <= data.level]
-            if not possible_fish:
-                possible_fish = self._fish_data[:3]  # 至少有基础的鱼
-            
-            # 根据稀有度加权随机
-            weights = [max(1, 10 - f.get('rarity', 1) * 2) for f in possible_fish]
-            fish_info = random.choices(possible_fish, weights=weights, k=1)[0]
+            # 按等级可钓到的鱼，根据稀有度加权随机
+            fish_info = self._fish_sampler(data.level).draw()
             
             # 计算重量
             weight_min = fish_info.get('weight_min', 0.5)
@@ -322,10 +332,9 @@ class FishingLogic:
         else:
             result.message = "可惜，鱼儿跑掉了..."
         
-        # 重置状态
-        data.fishing_status = "idle"
-        data.start_time = 0
-        self._save_user_data(user_id, data)
+        # 只有钓到鱼（或清除旧状态）时才需要写存档
+        if is_success or legacy:
+            self._save_user_data(user_id, data)
         
         set_cooldown(user_id, 'fishing', 'pull', 5)
         
@@ -615,7 +624,7 @@ class FishingLogic:
             "basket": basket.get('name', '简易鱼篓') if basket else '简易鱼篓',
             "basket_capacity": basket.get('capacity', 5) if basket else 5,
             "basket_used": len(data.fish_basket),
-            "status": data.fishing_status
+            "status": self.check_fishing_status(user_id)['status']
         }
 
     def get_fishing_ranking(self, sort_by: str = "catch") -> List[FishingRankingEntry]:
@@ -678,13 +687,10 @@ class FishingLogic:
         # 自动开始并收杆
         data = self._get_user_data(user_id)
         
-        if data.fishing_status == "idle":
+        if not self.bites.get(user_id) and data.fishing_status == "idle":
             self.start_fishing(user_id)
             # 模拟立即上钩
-            data = self._get_user_data(user_id)
-            data.fishing_status = "ready"
-            data.start_time = datetime.now().timestamp() - 100
-            self._save_user_data(user_id, data)
+            self.bites.mark_bitten(user_id)
         
         result = self.pull_rod(user_id)
         
@@ -8,6 +8,8 @@ from datetime import datetime
 
 from ..common.data_manager import DataManager
 from ..common.cooldown import check_cooldown, set_cooldown
+from ..common.timed_stat import TimedStat
+from . import accrual
 from .models import (
     NetbarInfo, ComputerConfig, NetbarEmployee, NetbarFacilities,
     NetbarEnvironment, NetbarMaintenance, NetbarStatistics, NetbarMembers,
@@ -15,6 +17,11 @@ from .models import (
     STAFF_TYPES, COMPUTER_TYPES, FACILITY_TYPES
 )
 
+# 每小时自然下降量；有保洁员时清洁度下降速度为 30%
+MAINTENANCE_DECAY_PER_HOUR = 0.5
+CLEANLINESS_DECAY_PER_HOUR = 0.3
+CLEANER_DECAY_FACTOR = 0.3
+
 
 class NetbarLogic:
     def __init__(self, data_manager: Optional[DataManager] = None):
@@ -54,71 +61,81 @@ class NetbarLogic:
         """获取用户的网吧"""
         netbars = self._load_netbars()
         if user_id in netbars:
-            return NetbarInfo(**netbars[user_id])
+            netbar = NetbarInfo(**netbars[user_id])
+            self._sync_decay(netbar)
+            return netbar
         return None
 
+    @staticmethod
+    def _cleanliness(netbar: NetbarInfo) -> TimedStat:
+        return TimedStat.bind(netbar.clock, 'cleanliness', netbar.cleanliness, -CLEANLINESS_DECAY_PER_HOUR)
+
+    @staticmethod
+    def _maintenance(netbar: NetbarInfo) -> TimedStat:
+        return TimedStat.bind(netbar.clock, 'maintenance', netbar.maintenance.status, -MAINTENANCE_DECAY_PER_HOUR)
+
+    def _sync_decay(self, netbar: NetbarInfo):
+        """按当前员工配置设定衰减速度，并把清洁度和设备状态同步为当前值"""
+        has_cleaner = any(e.position == "保洁" for e in netbar.staff)
+        cleanliness = self._cleanliness(netbar)
+        rate = CLEANLINESS_DECAY_PER_HOUR * (CLEANER_DECAY_FACTOR if has_cleaner else 1)
+        cleanliness.set_rate(-rate)
+        netbar.cleanliness = int(cleanliness.get())
+        netbar.maintenance.status = int(self._maintenance(netbar).get())
+
     def _save_user_netbar(self, user_id: str, netbar: NetbarInfo):
         """保存用户的网吧"""
         netbars = self._load_netbars()
         netbars[user_id] = netbar.dict()
         self._save_netbars(netbars)
 
-    def _update_netbar_status(self, netbar: NetbarInfo) -> NetbarInfo:
-        """更新网吧状态（收入、维护等）"""
-        last_update = datetime.fromisoformat(netbar.last_update)
-        now = datetime.now()
-        hours_passed = (now - last_update).total_seconds() / 3600
-        
-        if hours_passed < 1:
+    def _update_netbar_status(self, netbar: NetbarInfo, now: Optional[datetime] = None) -> NetbarInfo:
+        """按小时模拟上次结算以来的经营（收入、工资、客流），不丢弃不足一小时的时间"""
+        now = now or datetime.now()
+        start_ts = datetime.fromisoformat(netbar.last_update).timestamp()
+        end_ts = now.timestamp()
+        if end_ts <= start_ts:
             return netbar
         
-        hours = int(hours_passed)
-        
-        # 计算每小时收入
-        computers = netbar.computers
-        hourly_income = (
-            computers.basic * 5 * netbar.statistics.basic_usage +
-            computers.standard * 8 * netbar.statistics.standard_usage +
-            computers.premium * 15 * netbar.statistics.premium_usage
-        )
-        
-        # 设施收入
-        if netbar.facilities.snack_bar:
-            hourly_income += 20
-        
-        # 员工工资（按小时计算）
-        hourly_expense = sum(e.salary / 720 for e in netbar.staff)  # 月薪/720小时
+        # 设备状态与清洁度的衰减由 TimedStat 记录描述，模拟时逐小时取值
+        self._sync_decay(netbar)
+        result = accrual.simulate(netbar, start_ts, end_ts)
         
-        # 更新收入
-        income = int(hourly_income * hours)
-        expense = int(hourly_expense * hours)
-        netbar.income += income
-        netbar.expenses += expense
-        netbar.daily_income = income
-        netbar.daily_expenses = expense
-        
-        # 维护状态下降
-        maintenance_decay = hours * 0.5
-        netbar.maintenance.status = max(0, netbar.maintenance.status - maintenance_decay)
-        
-        # 清洁度下降
-        cleanliness_decay = hours * 0.3
-        has_cleaner = any(e.position == "保洁" for e in netbar.staff)
-        if has_cleaner:
-            cleanliness_decay *= 0.3
-        netbar.cleanliness = max(0, netbar.cleanliness - cleanliness_decay)
+        # 更新收入，不足 1 元的部分留到下次
+        income = result['revenue'] + netbar.income_remainder
+        expense = result['salary'] + netbar.expense_remainder
+        netbar.income += int(income)
+        netbar.expenses += int(expense)
+        netbar.income_remainder = income - int(income)
+        netbar.expense_remainder = expense - int(expense)
+        netbar.daily_income = int(result['revenue'])
+        netbar.daily_expenses = int(result['salary'])
         
         # 更新客户数量
-        base_customers = (computers.basic + computers.standard + computers.premium) * 0.3
-        reputation_mult = netbar.reputation / 100
-        netbar.statistics.current_customers = int(base_customers * reputation_mult)
-        netbar.statistics.total_customers += netbar.statistics.current_customers * hours
+        netbar.statistics.current_customers = int(result['current_customers'])
+        netbar.statistics.total_customers += int(result['customers'])
         
         # 更新时间
         netbar.last_update = now.isoformat()
         
         return netbar
 
+    def accrue_all(self, now: Optional[datetime] = None) -> dict:
+        """后台批量结算所有网吧的离线经营，netbars.json 只读写一次"""
+        started = time.perf_counter()
+        now = now or datetime.now()
+        netbars = self._load_netbars()
+        income = 0
+        for uid, data in netbars.items():
+            netbar = NetbarInfo(**data)
+            before = netbar.income
+            self._update_netbar_status(netbar, now)
+            income += netbar.income - before
+            netbars[uid] = netbar.dict()
+        if netbars:
+            self._save_netbars(netbars)
+        return {'netbars': len(netbars), 'income': income, 'elapsed': time.perf_counter() - started}
+
     # ========== 核心功能 ==========
     def create_netbar(self, user_id: str, name: str = None) -> NetbarInfo:
         """创建网吧"""
@@ -218,7 +235,8 @@ class NetbarLogic:
         
         # 保洁特殊效果
         if position == "保洁":
-            netbar.cleanliness = min(100, netbar.cleanliness + 20)
+            netbar.cleanliness = int(self._cleanliness(netbar).add(20))
+        self._sync_decay(netbar)
         
         self.dm.save_user(user_id, user)
         self._save_user_netbar(user_id, netbar)
@@ -273,7 +291,8 @@ class NetbarLogic:
         
         # 保洁特殊效果
         if employee.position == "保洁":
-            netbar.cleanliness = max(0, netbar.cleanliness - 20)
+            netbar.cleanliness = int(self._cleanliness(netbar).add(-20))
+        self._sync_decay(netbar)
         
         self.dm.save_user(user_id, user)
         self._save_user_netbar(user_id, netbar)
@@ -379,7 +398,7 @@ class NetbarLogic:
         
         # 执行维护
         user['money'] -= total_cost
-        netbar.maintenance.status = 100
+        netbar.maintenance.status = int(self._maintenance(netbar).set(100))
         netbar.maintenance.last_maintenance = datetime.now().isoformat()
         netbar.maintenance.total_cost += total_cost
         netbar.expenses += total_cost
@@ -529,10 +548,10 @@ class NetbarLogic:
     def get_netbar_ranking(self, sort_by: str = "reputation") -> List[NetbarRankingEntry]:
         """获取网吧排行榜"""
         netbars = self._load_netbars()
+        names = self.dm.display_names(netbars)
         
         entries = []
         for uid, data in netbars.items():
-            user = self.dm.load_user(uid) or {}
             computers = data.get('computers', {})
             total_computers = (
                 computers.get('basic', 0) +
@@ -541,7 +560,7 @@ class NetbarLogic:
             )
             entries.append(NetbarRankingEntry(
                 owner_id=uid,
-                owner_name=user.get('name', f'用户{uid[:6]}'),
+                owner_name=names[uid],
                 netbar_name=data.get('name', '网吧'),
                 level=data.get('level', 1),
                 reputation=data.get('reputation', 50),
@@ -100,6 +100,9 @@ class NetbarInfo(BaseModel):
     maintenance: NetbarMaintenance = Field(default_factory=NetbarMaintenance)
     statistics: NetbarStatistics = Field(default_factory=NetbarStatistics)
     credit_points: int = 100
+    clock: Dict[str, Dict[str, float]] = Field(default_factory=dict)  # 清洁度/设备状态的 TimedStat 记录
+    income_remainder: float = 0.0   # 按小时结算时不足 1 元的收入/支出，留到下次结算
+    expense_remainder: float = 0.0
 
 
 # ========== 员工类型配置 ==========
@@ -1,48 +1,58 @@
-import json
 import random
 import uuid
 from pathlib import Path
 from typing import List, Optional
 from ..common.data_manager import DataManager
+from ..common.timed_stat import TimedStat
+from ..common.sampler import AliasTable
 from .models import Pet
+from .store import PetStore
+
+# 每小时下降量；数值在读取时按时间推算，不需要定时刷新所有宠物
+HUNGER_DECAY_PER_HOUR = 4
+MOOD_DECAY_PER_HOUR = 2
+
+# 抽卡稀有度与宠物种类
+RARITY_TABLE = AliasTable(["R", "SR", "SSR"], [70, 25, 5])
+PET_TYPES = ["猫", "狗", "兔子", "仓鼠"]
 
 class PetLogic:
     def __init__(self, data_manager: DataManager):
         self.dm = data_manager
         self.data_path = Path(self.dm.root) / 'data' / 'pet'
         self.data_path.mkdir(parents=True, exist_ok=True)
-        self.pet_file = self.data_path / 'pets.json'
-        
-    def _load_pets(self) -> List[Pet]:
-        if not self.pet_file.exists():
-            return []
-        try:
-            data = json.loads(self.pet_file.read_text(encoding='utf-8'))
-            return [Pet.from_dict(p) for p in data]
-        except:
-            return []
+        self.store = PetStore(self.data_path)
+
+    def _from_dicts(self, data: List[dict]) -> List[Pet]:
+        pets = [Pet.from_dict(p) for p in data]
+        for p in pets:
+            p.hunger = int(self._hunger(p).get())
+            p.mood = int(self._mood(p).get())
+        return pets
+
+    @staticmethod
+    def _hunger(pet: Pet) -> TimedStat:
+        return TimedStat.bind(pet.clock, 'hunger', pet.hunger, -HUNGER_DECAY_PER_HOUR)
 
-    def _save_pets(self, pets: List[Pet]):
-        self.pet_file.write_text(json.dumps([p.to_dict() for p in pets], ensure_ascii=False, indent=2), encoding='utf-8')
+    @staticmethod
+    def _mood(pet: Pet) -> TimedStat:
+        return TimedStat.bind(pet.clock, 'mood', pet.mood, -MOOD_DECAY_PER_HOUR)
 
     def get_user_pets(self, user_id: str) -> List[Pet]:
-        all_pets = self._load_pets()
-        return [p for p in all_pets if p.owner_id == user_id]
+        return self._from_dicts(self.store.load_owner(user_id))
 
     def get_pet(self, pet_id: str) -> Optional[Pet]:
-        all_pets = self._load_pets()
-        for p in all_pets:
-            if p.id == pet_id or str(p.id).startswith(pet_id): # Fuzzy match
-                return p
-        return None
+        """按完整 id 或短 id 前缀查找"""
+        full_id = self.store.resolve(pet_id)
+        if not full_id:
+            return None
+        owner_id = self.store.owner_of(full_id)
+        return next((p for p in self.get_user_pets(owner_id) if p.id == full_id), None)
 
     def draw_pet(self, user_id: str) -> Pet:
         # Simple gacha logic
-        rarity_weights = {"R": 70, "SR": 25, "SSR": 5}
-        rarity = random.choices(list(rarity_weights.keys()), weights=list(rarity_weights.values()))[0]
-        
-        types = ["猫", "狗", "兔子", "仓鼠"]
-        p_type = random.choice(types)
+        rarity = RARITY_TABLE.draw()
+        p_type = random.choice(PET_TYPES)
         
         pet = Pet(
             id=str(uuid.uuid4())[:8],
@@ -52,44 +62,35 @@ class PetLogic:
             rarity=rarity
         )
         
-        pets = self._load_pets()
-        pets.append(pet)
-        self._save_pets(pets)
+        self.store.add(pet.to_dict())
         return pet
 
+    def _update_pet(self, pet_id: str, apply) -> Optional[Pet]:
+        """修改一只宠物（支持短 id），只读写其主人的宠物文件"""
+        pet_id = self.store.resolve(pet_id)
+        if pet_id is None:
+            return None
+        owner_id = self.store.owner_of(pet_id)
+        pets = self.get_user_pets(owner_id)
+        target = next((p for p in pets if p.id == pet_id), None)
+        if target is None:
+            return None
+        apply(target)
+        if target.exp >= target.max_exp:
+            target.level += 1
+            target.exp = 0
+        self.store.save_owner(owner_id, [p.to_dict() for p in pets])
+        return target
+
     def feed_pet(self, pet_id: str, food_quality: int = 10):
-        pets = self._load_pets()
-        target = None
-        for p in pets:
-            if p.id == pet_id:
-                target = p
-                break
-        
-        if target:
-            target.hunger = min(100, target.hunger + food_quality * 5)
-            target.mood = min(100, target.mood + 2)
+        def feed(target: Pet):
+            target.hunger = int(self._hunger(target).add(food_quality * 5))
+            target.mood = int(self._mood(target).add(2))
             target.exp += 15
-            if target.exp >= target.max_exp:
-                target.level += 1
-                target.exp = 0
-            self._save_pets(pets)
-            return target
-        return None
+        return self._update_pet(pet_id, feed)
 
     def interact_pet(self, pet_id: str):
-        pets = self._load_pets()
-        target = None
-        for p in pets:
-            if p.id == pet_id:
-                target = p
-                break
-        
-        if target:
-            target.mood = min(100, target.mood + 15)
+        def play(target: Pet):
+            target.mood = int(self._mood(target).add(15))
             target.exp += 10
-            if target.exp >= target.max_exp:
-                target.level += 1
-                target.exp = 0
-            self._save_pets(pets)
-            return target
-        return None
+        return self._update_pet(pet_id, play)
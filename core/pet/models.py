@@ -15,6 +15,7 @@ class Pet:
     mood: int = 80 # 0-100
     cleanliness: int = 80 # 0-100
     skills: List[str] = field(default_factory=list) # "RatHunter", "Guard"
+    clock: Dict[str, dict] = field(default_factory=dict) # hunger/mood 的 TimedStat 记录
 
     @property
     def max_exp(self):
@@ -0,0 +1,106 @@
+import bisect
+import json
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# 短 id 至少要输入的位数
+MIN_PREFIX = 4
+
+
+class PetStore:
+    """
+    宠物按主人分文件保存（owners/<主人>.json），另有全局 宠物id -> 主人 索引（index.json）
+
+    索引常驻内存，并维护一份排好序的 id 列表，短 id 前缀匹配用二分查找；
+    喂养、互动只读写这只宠物主人的文件。旧版的全局 pets.json 在首次加载时拆分。
+    """
+
+    def __init__(self, data_path: Path):
+        self.data_path = data_path
+        self.owner_dir = data_path / 'owners'
+        self.index_file = data_path / 'index.json'
+        self.legacy_file = data_path / 'pets.json'
+        self._owner_of: Optional[Dict[str, str]] = None
+        self._sorted_ids: List[str] = []
+
+    def _ensure_loaded(self) -> Dict[str, str]:
+        if self._owner_of is not None:
+            return self._owner_of
+        self._owner_of = {}
+        if self.index_file.exists():
+            try:
+                self._owner_of = json.loads(self.index_file.read_text(encoding='utf-8'))
+            except Exception:
+                self._owner_of = {}
+        if self.legacy_file.exists():
+            self._migrate()
+        self._sorted_ids = sorted(self._owner_of)
+        return self._owner_of
+
+    def _migrate(self):
+        try:
+            legacy = json.loads(self.legacy_file.read_text(encoding='utf-8'))
+        except Exception:
+            legacy = []
+        by_owner: Dict[str, List[dict]] = {}
+        for pet in legacy:
+            by_owner.setdefault(pet['owner_id'], []).append(pet)
+        for owner_id, pets in by_owner.items():
+            existing = self.load_owner(owner_id)
+            known = {p['id'] for p in existing}
+            self.save_owner(owner_id, existing + [p for p in pets if p['id'] not in known])
+            for pet in pets:
+                self._owner_of[pet['id']] = owner_id
+        self._save_index()
+        self.legacy_file.unlink()
+
+    def _save_index(self):
+        self.index_file.write_text(json.dumps(self._owner_of, ensure_ascii=False), encoding='utf-8')
+
+    def _owner_file(self, owner_id: str) -> Path:
+        return self.owner_dir / f"{owner_id}.json"
+
+    # ========== 查询 ==========
+
+    def owner_of(self, pet_id: str) -> Optional[str]:
+        return self._ensure_loaded().get(pet_id)
+
+    def resolve(self, pet_id: str) -> Optional[str]:
+        """完整 id 或 id 前缀 -> 完整 id；前缀短于 MIN_PREFIX 或匹配到多只宠物时返回 None"""
+        owners = self._ensure_loaded()
+        if not pet_id or pet_id in owners:
+            return pet_id or None
+        if len(pet_id) < MIN_PREFIX:
+            return None
+        ids = self._sorted_ids
+        i = bisect.bisect_left(ids, pet_id)
+        if i >= len(ids) or not ids[i].startswith(pet_id):
+            return None
+        # 有序列表中紧随其后的 id 也匹配，说明前缀不唯一
+        if i + 1 < len(ids) and ids[i + 1].startswith(pet_id):
+            return None
+        return ids[i]
+
+    def load_owner(self, owner_id: str) -> List[dict]:
+        self._ensure_loaded()   # 老存档先拆分
+        p = self._owner_file(owner_id)
+        if not p.exists():
+            return []
+        try:
+            return json.loads(p.read_text(encoding='utf-8'))
+        except Exception:
+            return []
+
+    # ========== 变更 ==========
+
+    def save_owner(self, owner_id: str, pets: List[dict]):
+        self.owner_dir.mkdir(parents=True, exist_ok=True)
+        self._owner_file(owner_id).write_text(json.dumps(pets, ensure_ascii=False, indent=2), encoding='utf-8')
+
+    def add(self, pet: dict):
+        """新宠物：追加到主人文件并登记索引"""
+        owners = self._ensure_loaded()
+        self.save_owner(pet['owner_id'], self.load_owner(pet['owner_id']) + [pet])
+        owners[pet['id']] = pet['owner_id']
+        bisect.insort(self._sorted_ids, pet['id'])
+        self._save_index()
@@ -0,0 +1,125 @@
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+class CasePool:
+    """
+    有上限的案件池
+
+    案件常驻内存，按状态维护索引：未接取案件（按难度分桶）和已接取案件。
+    结案、过期或被放弃（接取会话过期、改接其他案件）的案件追加写入归档文件，
+    不再留在 cases.json 中；
+    池内变更只标记脏数据，由 flush() 统一落盘。
+    """
+
+    def __init__(self, path: Path, archive_path: Path, max_size: int = 50):
+        self.path = path
+        self.archive_path = archive_path
+        self.max_size = max_size
+        self.dirty = False
+        self._cases: Optional[Dict[str, dict]] = None
+        self._open: Dict[str, None] = {}                 # 按创建顺序的未接取案件
+        self._by_difficulty: Dict[str, Dict[str, None]] = {}
+        self._assigned: Dict[str, str] = {}              # case_id -> user_id
+
+    # ========== 加载与索引 ==========
+
+    def _ensure_loaded(self):
+        if self._cases is not None:
+            return
+        self._cases = {}
+        if self.path.exists():
+            try:
+                raw = json.loads(self.path.read_text(encoding='utf-8'))
+            except Exception:
+                raw = {}
+            for c in raw.values():
+                self._cases[c['id']] = c
+                self._index(c)
+        # 旧数据可能远超上限，超出部分的未接取案件直接归档
+        if self._evict_overflow():
+            self.flush()
+
+    def _index(self, case: dict):
+        cid = case['id']
+        if case.get('accepted_by'):
+            self._assigned[cid] = case['accepted_by']
+        else:
+            self._open[cid] = None
+            self._by_difficulty.setdefault(case.get('difficulty', '简单'), {})[cid] = None
+
+    def _unindex(self, case: dict):
+        cid = case['id']
+        self._assigned.pop(cid, None)
+        self._open.pop(cid, None)
+        self._by_difficulty.get(case.get('difficulty', '简单'), {}).pop(cid, None)
+
+    def _evict_overflow(self) -> bool:
+        evicted = False
+        while len(self._cases) > self.max_size and self._open:
+            self.close(next(iter(self._open)), 'expired')
+            evicted = True
+        return evicted
+
+    # ========== 查询 ==========
+
+    def get(self, case_id: str) -> Optional[dict]:
+        self._ensure_loaded()
+        return self._cases.get(case_id)
+
+    def all(self) -> List[dict]:
+        self._ensure_loaded()
+        return list(self._cases.values())
+
+    def open_count(self, difficulty: Optional[str] = None) -> int:
+        self._ensure_loaded()
+        if difficulty:
+            return len(self._by_difficulty.get(difficulty, {}))
+        return len(self._open)
+
+    def next_open(self, difficulty: Optional[str] = None) -> Optional[dict]:
+        """最早创建的未接取案件，可按难度筛选"""
+        self._ensure_loaded()
+        bucket = self._by_difficulty.get(difficulty, {}) if difficulty else self._open
+        for cid in bucket:
+            return self._cases[cid]
+        return None
+
+    # ========== 变更 ==========
+
+    def add(self, case: dict):
+        self._ensure_loaded()
+        self._cases[case['id']] = case
+        self._index(case)
+        self._evict_overflow()
+        self.dirty = True
+
+    def assign(self, case_id: str, user_id: str) -> dict:
+        self._ensure_loaded()
+        case = self._cases[case_id]
+        self._unindex(case)
+        case['accepted_by'] = user_id
+        self._index(case)
+        self.dirty = True
+        return case
+
+    def close(self, case_id: str, status: str) -> Optional[dict]:
+        """移出案件池并追加到归档"""
+        self._ensure_loaded()
+        case = self._cases.pop(case_id, None)
+        if not case:
+            return None
+        self._unindex(case)
+        record = dict(case, status=status, closed_at=datetime.utcnow().isoformat())
+        with self.archive_path.open('a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.dirty = True
+        return case
+
+    def flush(self):
+        if not self.dirty or self._cases is None:
+            return
+        self.path.write_text(json.dumps(self._cases, ensure_ascii=False, indent=2), encoding='utf-8')
+        self.dirty = False
@@ -5,32 +5,42 @@ from typing import Optional, List, Dict, Any
 from datetime import datetime
 from ..common.data_manager import DataManager
 from ..common.cooldown import check_cooldown, set_cooldown
+from ..common.timed_stat import TimedStat
+from ..common.session_store import SessionStore
 from .models import PoliceUser, Case, PoliceInfo, PoliceSkills, POLICE_RANKS
+from .case_pool import CasePool
+
+# 体力每小时自然恢复量
+STAMINA_REGEN_PER_HOUR = 10
+# 接取后未处理的案件保留时间（秒）
+CURRENT_CASE_TTL = 7 * 24 * 3600
 
 class PoliceLogic:
-    def __init__(self, data_manager: Optional[DataManager] = None):
+    def __init__(self, data_manager: Optional[DataManager] = None,
+                 max_cases: int = 50, refill_target: int = 10):
         self.dm = data_manager or DataManager()
         self.data_path = Path(self.dm.root) / 'data' / 'police'
         self.data_path.mkdir(parents=True, exist_ok=True)
+        # 案件池：上限 max_cases，后台补充到 refill_target 个未接取案件
+        self.cases = CasePool(self._cases_file(), self.data_path / 'cases_archive.jsonl', max_cases)
+        self.refill_target = refill_target
+        # 每个警察手上的当前案件（内存会话，定期快照），不再整文件重写 police_data.json；
+        # 会话过期时案件随之移出案件池
+        self.current_cases = SessionStore(self.data_path / 'current_cases.json', CURRENT_CASE_TTL,
+                                          on_expire=self._abandon_case)
 
     def _cases_file(self):
         return self.data_path / 'cases.json'
 
+    def _abandon_case(self, user_id: str, case: Optional[dict]):
+        """已接取但不再处理的案件归档，避免长期占用案件池"""
+        c = self.cases.get(case['id']) if case else None
+        if c and c.get('accepted_by') == user_id:
+            self.cases.close(c['id'], 'abandoned')
+
     def _police_file(self):
         return self.data_path / 'police_data.json'
 
-    def _load_cases(self):
-        p = self._cases_file()
-        if not p.exists():
-            return {}
-        import json
-        return json.loads(p.read_text(encoding='utf-8'))
-
-    def _save_cases(self, data):
-        import json
-        p = self._cases_file()
-        p.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding='utf-8')
-
     def _load_all_police(self):
         p = self._police_file()
         if not p.exists():
@@ -43,6 +53,14 @@ class PoliceLogic:
         p = self._police_file()
         p.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding='utf-8')
 
+    @staticmethod
+    def _stamina(info: dict) -> TimedStat:
+        """体力随时间自然恢复，读取时推算；info['stamina'] 同步为当前值"""
+        stat = TimedStat.bind(info.setdefault('clock', {}), 'stamina',
+                              info.get('stamina', 100), STAMINA_REGEN_PER_HOUR)
+        info['stamina'] = int(stat.get())
+        return stat
+
     def _load_equipment_config(self):
         """加载装备配置"""
         p = Path(self.dm.root) / 'data' / 'police' / 'equipment.json'
@@ -62,11 +80,10 @@ class PoliceLogic:
     # ========== 基础功能 ==========
 
     def list_cases(self):
-        return list(self._load_cases().values())
+        return self.cases.all()
 
     def create_case(self, title: str, description: str, reward: int = 0, 
                     case_type: str = "普通", difficulty: str = "简单"):
-        cases = self._load_cases()
         cid = str(uuid.uuid4())[:8]
         c = Case(
             id=cid, 
@@ -77,37 +94,49 @@ class PoliceLogic:
             difficulty=difficulty,
             created_at=datetime.utcnow().isoformat()
         )
-        cases[cid] = c.dict()
-        self._save_cases(cases)
+        self.cases.add(c.dict())
         return c.dict()
 
     def accept_case(self, user_id: str, case_id: str):
         rem = check_cooldown(user_id, 'police', 'accept')
         if rem > 0:
             raise RuntimeError(f"cooldown:{rem}")
-        cases = self._load_cases()
-        c = cases.get(case_id)
+        c = self.cases.get(case_id)
         if not c:
             raise ValueError('案件不存在')
         if c.get('accepted_by'):
             raise ValueError('案件已被接取')
+        # 改接新案件时，手上未处理的旧案件作废
+        self._abandon_case(user_id, self.current_cases.get(user_id))
+        c = self.cases.assign(case_id, user_id)
+        self.current_cases.set(user_id, c)
         
-        # 保存到警察数据中
-        police_data = self._load_all_police()
-        user_police = police_data.get(user_id, {})
-        user_police['current_case'] = c
-        police_data[user_id] = user_police
-        self._save_all_police(police_data)
-        
-        c['accepted_by'] = user_id
-        cases[case_id] = c
-        self._save_cases(cases)
         set_cooldown(user_id, 'police', 'accept', 5)
         return c
 
+    def take_case(self, user_id: str, difficulty: Optional[str] = None):
+        """接取最早的未接取案件，池中没有时现场生成一个"""
+        # 冷却中直接拒绝，不为刷屏的请求生成案件
+        rem = check_cooldown(user_id, 'police', 'accept')
+        if rem > 0:
+            raise RuntimeError(f"cooldown:{rem}")
+        c = self.cases.next_open(difficulty)
+        if not c:
+            c = self.generate_random_case(difficulty)
+        return self.accept_case(user_id, c['id'])
+
+    def refill_cases(self) -> int:
+        """后台任务：清理过期的接取会话、补充未接取案件并落盘案件池，返回新生成的数量"""
+        self.current_cases.purge()
+        created = 0
+        while self.cases.open_count() < self.refill_target:
+            self.generate_random_case()
+            created += 1
+        self.cases.flush()
+        return created
+
     def complete_case(self, user_id: str, case_id: str):
-        cases = self._load_cases()
-        c = cases.get(case_id)
+        c = self.cases.get(case_id)
         if not c:
             raise ValueError('案件不存在')
         if c.get('accepted_by') != user_id:
@@ -127,15 +156,25 @@ class PoliceLogic:
         user_police['current_case'] = None
         police_data[user_id] = user_police
         self._save_all_police(police_data)
+        self.current_cases.pop(user_id)
         
         # mark resolved
-        cases.pop(case_id, None)
-        self._save_cases(cases)
+        self.cases.close(case_id, 'solved')
         return c
 
     def get_user_info(self, user_id: str):
         police_data = self._load_all_police()
-        return police_data.get(user_id, {})
+        user_police = police_data.get(user_id, {})
+        if user_police.get('info'):
+            self._stamina(user_police['info'])
+        current_case = self._current_case(user_id, user_police)
+        if current_case:
+            user_police['current_case'] = current_case
+        return user_police
+
+    def _current_case(self, user_id: str, user_police: dict) -> Optional[dict]:
+        """当前案件：优先读会话，兼容旧版存在 police_data.json 里的 current_case"""
+        return self.current_cases.get(user_id) or user_police.get('current_case')
 
     # ========== 加入警察 ==========
 
@@ -202,8 +241,8 @@ class PoliceLogic:
         info = user_police.get('info', {})
         
         # 检查体力
-        stamina = info.get('stamina', 100)
-        if stamina < 20:
+        stamina = self._stamina(info)
+        if stamina.get() < 20:
             raise ValueError('体力不足，需要休息')
         
         # 巡逻事件
@@ -232,7 +271,7 @@ class PoliceLogic:
         info['experience'] = info.get('experience', 0) + exp_gain
         info['patrol_hours'] = info.get('patrol_hours', 0) + 1
         info['reputation'] = min(100, info.get('reputation', 50) + rep_gain)
-        info['stamina'] = max(0, stamina - 20)
+        info['stamina'] = int(stamina.add(-20))
         
         # 随机提升技能
         skills = info.get('skills', {})
@@ -510,8 +549,8 @@ class PoliceLogic:
             raise ValueError('该技能已达到最高等级')
         
         # 检查体力
-        stamina = info.get('stamina', 100)
-        if stamina < 30:
+        stamina = self._stamina(info)
+        if stamina.get() < 30:
             raise ValueError('体力不足')
         
         # 检查金钱
@@ -526,7 +565,7 @@ class PoliceLogic:
         
         # 扣费
         user['money'] -= train_cost
-        info['stamina'] = stamina - 30
+        info['stamina'] = int(stamina.add(-30))
         self.dm.save_user(user_id, user)
         
         exp_gain = 0
@@ -566,10 +605,11 @@ class PoliceLogic:
             raise ValueError('你还不是警察')
         
         info = user_police.get('info', {})
-        old_stamina = info.get('stamina', 100)
+        stamina = self._stamina(info)
+        old_stamina = info['stamina']
         
-        # 恢复30点体力
-        info['stamina'] = min(100, old_stamina + 30)
+        # 立即恢复30点体力（平时也会随时间自然恢复）
+        info['stamina'] = int(stamina.add(30))
         
         user_police['info'] = info
         police_data[user_id] = user_police
@@ -623,7 +663,7 @@ class PoliceLogic:
         if not user_police:
             raise ValueError('你还不是警察')
         
-        current_case = user_police.get('current_case')
+        current_case = self._current_case(user_id, user_police)
         if not current_case:
             raise ValueError('没有待处理的案件，请先接取案件')
         
@@ -681,11 +721,10 @@ class PoliceLogic:
         user_police['info'] = info
         police_data[user_id] = user_police
         self._save_all_police(police_data)
+        self.current_cases.pop(user_id)
         
-        # 从案件列表移除
-        cases = self._load_cases()
-        cases.pop(case_id, None)
-        self._save_cases(cases)
+        # 从案件池移除并归档
+        self.cases.close(case_id, 'solved' if success else 'failed')
         
         set_cooldown(user_id, 'police', 'case', 60)
         
@@ -700,8 +739,8 @@ class PoliceLogic:
 
     # ========== 生成随机案件 ==========
 
-    def generate_random_case(self) -> dict:
-        """生成随机案件"""
+    def generate_random_case(self, difficulty: Optional[str] = None) -> dict:
+        """生成随机案件，可指定难度"""
         case_types = [
             {"type": "盗窃", "titles": ["商店盗窃案", "入室盗窃案", "扒窃案件"], "reward": 300},
             {"type": "暴力", "titles": ["斗殴事件", "持械伤人", "聚众闹事"], "reward": 500},
@@ -713,7 +752,8 @@ class PoliceLogic:
         diff_weights = [40, 35, 20, 5]
         
         case_type = random.choice(case_types)
-        difficulty = random.choices(difficulties, weights=diff_weights)[0]
+        if difficulty not in difficulties:
+            difficulty = random.choices(difficulties, weights=diff_weights)[0]
         title = random.choice(case_type['titles'])
         
         return self.create_case(
@@ -1,12 +1,53 @@
 from .models import Property
-from typing import Dict
+from typing import Dict, List, Optional, Set
+from datetime import datetime
+from pathlib import Path
+import json
+import time
 
 class PropertyMarket:
-    def __init__(self):
+    def __init__(self, data_manager):
+        self.dm = data_manager
+        self.data_path = Path(self.dm.root) / 'data' / 'property'
+        self.data_path.mkdir(parents=True, exist_ok=True)
+        self.property_file = self.data_path / 'properties.json'
         self.properties: Dict[str, Property] = {}
+        self.owner_index: Dict[str, Set[str]] = {} # owner_id -> property ids
+        self.last_rent_period = ""
+        self._load()
 
-    def register_property(self, prop: Property):
+    def _load(self):
+        if not self.property_file.exists():
+            return
+        try:
+            raw = json.loads(self.property_file.read_text(encoding='utf-8'))
+        except Exception:
+            return
+        self.last_rent_period = raw.get('last_rent_period', "")
+        for p in raw.get('properties', []):
+            self._index(Property(**p))
+
+    def _save(self):
+        data = {
+            'last_rent_period': self.last_rent_period,
+            'properties': [p.dict() for p in self.properties.values()],
+        }
+        self.property_file.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding='utf-8')
+
+    def _index(self, prop: Property):
         self.properties[prop.id] = prop
+        if prop.owner_id:
+            self.owner_index.setdefault(prop.owner_id, set()).add(prop.id)
+
+    def register_property(self, prop: Property):
+        """Add a listing to the catalog; existing (possibly owned) listings are kept."""
+        if prop.id in self.properties:
+            return
+        self._index(prop)
+        self._save()
+
+    def get_user_properties(self, user_id: str) -> List[Property]:
+        return [self.properties[pid] for pid in sorted(self.owner_index.get(user_id, ()))]
 
     def buy_property(self, user_id: str, prop_id: str):
         prop = self.properties.get(prop_id)
@@ -14,9 +55,54 @@ class PropertyMarket:
             raise ValueError("房产不存在")
         if prop.owner_id is not None:
             raise ValueError("房产已被购买")
+        user = self.dm.load_user(user_id) or {}
+        if user.get('money', 0) < prop.price:
+            raise ValueError(f"金币不足，需要 {prop.price:.0f} 金币")
+        user['money'] = user.get('money', 0) - prop.price
+        self.dm.save_user(user_id, user)
         prop.owner_id = user_id
-        return True
+        self.owner_index.setdefault(user_id, set()).add(prop_id)
+        self._save()
+        return prop
+
+    @staticmethod
+    def rent_period(now: Optional[datetime] = None) -> str:
+        """Rent is weekly; one run per ISO week, e.g. '2026-W42'."""
+        year, week, _ = (now or datetime.now()).isocalendar()
+        return f"{year}-W{week:02d}"
+
+    def collect_rent(self, period: Optional[str] = None) -> dict:
+        """Credit every owner's weekly rent in one batched pass.
+
+        Rent is summed per owner from the owner index, then each owner is
+        loaded and saved once. The run is skipped if this period was already
+        collected; owners whose file already carries the period marker are
+        skipped too, so a retry after a partial write never pays twice.
+        """
+        started = time.perf_counter()
+        period = period or self.rent_period()
+        if self.last_rent_period == period:
+            return {'period': period, 'owners': 0, 'total': 0, 'elapsed': 0.0, 'skipped': True}
+
+        rents = {
+            uid: sum(self.properties[pid].rent for pid in pids)
+            for uid, pids in self.owner_index.items() if pids
+        }
+        credited = {}
+        for uid, user in self.dm.load_users(rents).items():
+            if user.get('rent_period') == period:
+                continue
+            user['money'] = user.get('money', 0) + rents[uid]
+            user['rent_period'] = period
+            credited[uid] = user
+        self.dm.save_users(credited)
 
-    def collect_rent(self):
-        # placeholder for rent collection
-        return sum(p.rent for p in self.properties.values() if p.owner_id)
+        self.last_rent_period = period
+        self._save()
+        return {
+            'period': period,
+            'owners': len(credited),
+            'total': sum(rents[uid] for uid in credited),
+            'elapsed': time.perf_counter() - started,
+            'skipped': False,
+        }
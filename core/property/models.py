@@ -1,11 +1,12 @@
 from pydantic import BaseModel
+from typing import Optional
 
 class Property(BaseModel):
     id: str
     name: str
     price: float
     rent: float
-    owner_id: str = None
+    owner_id: Optional[str] = None
 
 class UserProperty(BaseModel):
     user_id: str
@@ -0,0 +1,75 @@
+import heapq
+import json
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+
+class HolderIndex:
+    """Inverted index stock_id -> {user_id: amount}, mirroring user['stocks'].
+
+    Kept up to date by StockMarket whenever a holding changes, so holder
+    lists and float totals never need to scan user files. rebuild() recreates
+    it from the user documents if the index file is lost or drifts.
+    """
+
+    def __init__(self):
+        self.holders: Dict[str, Dict[str, int]] = {}
+        self.totals: Dict[str, int] = {}
+        self.dirty = False
+
+    def apply(self, stock_id: str, user_id: str, delta: int):
+        book = self.holders.setdefault(stock_id, {})
+        amount = book.get(user_id, 0) + delta
+        if amount > 0:
+            book[user_id] = amount
+        else:
+            book.pop(user_id, None)
+            if not book:
+                self.holders.pop(stock_id, None)
+        self.totals[stock_id] = self.totals.get(stock_id, 0) + delta
+        if self.totals[stock_id] <= 0:
+            self.totals.pop(stock_id, None)
+        self.dirty = True
+
+    def holders_of(self, stock_id: str) -> Dict[str, int]:
+        return dict(self.holders.get(stock_id, {}))
+
+    def total(self, stock_id: str) -> int:
+        return self.totals.get(stock_id, 0)
+
+    def top(self, stock_id: str, n: int = 10) -> List[Tuple[str, int]]:
+        return heapq.nlargest(n, self.holders.get(stock_id, {}).items(), key=lambda kv: kv[1])
+
+    def concentration(self, stock_id: str, n: int = 10) -> Dict[str, float]:
+        """Share of the held float owned by the top n holders, plus the HHI (0-1)."""
+        total = self.total(stock_id)
+        if not total:
+            return {'top_share': 0.0, 'hhi': 0.0}
+        top_sum = sum(amount for _, amount in self.top(stock_id, n))
+        hhi = sum((amount / total) ** 2 for amount in self.holders[stock_id].values())
+        return {'top_share': top_sum / total, 'hhi': hhi}
+
+    def rebuild(self, users: Dict[str, dict]):
+        self.holders, self.totals = {}, {}
+        for uid, user in users.items():
+            for sid, hold in (user.get('stocks') or {}).items():
+                if hold.get('amount', 0) > 0:
+                    self.apply(sid, uid, hold['amount'])
+        self.dirty = True
+
+    def save(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.holders, ensure_ascii=False, indent=2), encoding='utf-8')
+        self.dirty = False
+
+    def load(self, path: Path) -> bool:
+        if not path.exists():
+            return False
+        try:
+            raw = json.loads(path.read_text(encoding='utf-8'))
+        except Exception:
+            return False
+        self.holders = {sid: dict(book) for sid, book in raw.items()}
+        self.totals = {sid: sum(book.values()) for sid, book in self.holders.items()}
+        self.dirty = False
+        return True
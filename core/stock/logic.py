@@ -1,12 +1,37 @@
-from .models import StockData, UserStockHold, PlayerCompany
+from .models import StockData, UserStockHold, PlayerCompany, StockOrder
+from .orderbook import OrderBook, Trade
+from .holders import HolderIndex
+from .registry import CompanyRegistry
 from typing import Dict, List, Optional
 import json
+import random
+import time
+import uuid
+from datetime import datetime
 from pathlib import Path
 
+# Limit prices must stay within this fraction of the last traded price
+PRICE_BAND = 0.2
+# Largest move of a system stock per price tick, scaled by its volatility
+PRICE_STEP = 0.02
+
+
 class StockMarket:
     def __init__(self):
         self.stocks: Dict[str, StockData] = {}
-        self.player_companies: Dict[str, PlayerCompany] = {} # Key: stock_id
+        # Key: stock_id; loaded from disk on first access once bound via load_companies()
+        self.player_companies = CompanyRegistry()
+        # Player stocks trade through per-stock order books; new orders and
+        # cancels are queued and settled together by match_orders().
+        self.books: Dict[str, OrderBook] = {}
+        self._pending: List[StockOrder] = []
+        self._pending_cancels: List[str] = []
+        self._seq = 0
+        # New orders and cancels are appended to a journal; orders.json is
+        # rewritten once per match_orders() batch, which empties the journal.
+        self._journal_seq = 0
+        # stock_id -> {user_id: amount}, flushed together with order batches
+        self.holder_index = HolderIndex()
 
     def register_stock(self, stock: StockData):
         self.stocks[stock.id] = stock
@@ -25,16 +50,20 @@ class StockMarket:
     def ipo(self, data_manager, user_id: str, company_name: str, stock_name: str, initial_price: float):
         """Initial Public Offering for a player"""
         # User must have some assets (checked outside or loose requirement)
+        self.load_companies(data_manager)
         # Check if user already has a company
-        for pc in self.player_companies.values():
-            if pc.owner_id == user_id:
-                raise ValueError("你已经拥有一家上市企业了！")
+        if self.player_companies.by_owner(user_id):
+            raise ValueError("你已经拥有一家上市企业了！")
         
         # Validations
         if initial_price < 1 or initial_price > 100:
             raise ValueError("发行价必须在 1-100 之间")
 
         stock_id = f"IPO_{user_id[:5]}" # Simple ID
+        suffix = 1
+        while stock_id in self.player_companies or stock_id in self.stocks:
+            suffix += 1
+            stock_id = f"IPO_{user_id[:5]}_{suffix}"
         pc = PlayerCompany(
             owner_id=user_id,
             owner_name="Unknown", # Should fetch proper name
@@ -43,29 +72,24 @@ class StockMarket:
             stock_name=stock_name,
             share_price=initial_price
         )
-        self.player_companies[stock_id] = pc
-        # In a real persistence scenario: should save to disk
-        # saving self.player_companies to a file
-        self._save_companies(data_manager)
+        self.player_companies.add(pc)
+        # Issued shares go on the book as the owner's IPO ask; the proceeds
+        # reach the owner as they are bought.
+        order = self._enqueue(StockOrder(
+            order_id=self._new_order_id(), stock_id=stock_id, user_id=user_id,
+            side="sell", price=initial_price, amount=pc.issued_shares, source="ipo"))
+        self._journal(data_manager, "order", order=order.dict())
         return pc
 
-    def _save_companies(self, dm):
-        path = Path(dm.root) / 'data' / 'stock'
-        path.mkdir(parents=True, exist_ok=True)
-        file = path / 'companies.json'
-        data = [c.dict() for c in self.player_companies.values()]
-        file.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding='utf-8')
-    
     def load_companies(self, dm):
-        path = Path(dm.root) / 'data' / 'stock' / 'companies.json'
-        if path.exists():
-            try:
-                raw = json.loads(path.read_text(encoding='utf-8'))
-                for r in raw:
-                    pc = PlayerCompany(**r)
-                    self.player_companies[pc.stock_id] = pc
-            except: 
-                pass
+        """Bind the company registry to its file; it is read on first access."""
+        self.player_companies.bind(Path(dm.root) / 'data' / 'stock' / 'companies.json')
+
+    def flush(self, dm):
+        """Write coalesced company price changes and the holder index."""
+        self.load_companies(dm)
+        self.player_companies.flush()
+        self.flush_holders(dm)
 
     def buy(self, data_manager, user_id: str, stock_id: str, amount: int):
         stock = self.get_stock(stock_id)
@@ -73,41 +97,17 @@ class StockMarket:
             raise ValueError("股票不存在")
         if amount <= 0:
             raise ValueError("购买数量必须大于0")
-        
-        # Check if player stock, limit by issued shares
         if stock_id in self.player_companies:
-            pc = self.player_companies[stock_id]
-            # Ideally we check available shares in market, simplified here:
-            if amount > pc.issued_shares: # Simple check
-               pass # Allow overbuy for now or implement market depth
+            raise ValueError("玩家公司股票需通过委托交易，请使用 挂单买入")
 
         cost = stock.price * amount
         user = data_manager.load_user(user_id) or {}
         if user.get('money', 0) < cost:
             raise ValueError("金币不足")
         user['money'] = user.get('money', 0) - cost
-        
-        # If buying player stock, the money (IPO part) goes to system or owner?
-        # Standard: Buying from market -> money to sellers.
-        # Buying IPO -> money to owner.
-        # Simplified: Money vanishes to system (liquidity pool)
-        
-        # update holdings in user record
-        holdings = user.setdefault('stocks', {})
-        cur = holdings.get(stock_id, {'amount':0, 'avg_price':0})
-        total_cost = cur['avg_price'] * cur['amount'] + cost
-        total_amount = cur['amount'] + amount
-        cur['amount'] = total_amount
-        cur['avg_price'] = total_cost / total_amount
-        holdings[stock_id] = cur
+        cur = self._add_holding(user, stock_id, amount, stock.price)
         data_manager.save_user(user_id, user)
-        
-        # Influence price: Buying increases price slightly
-        if stock_id in self.player_companies:
-             pc = self.player_companies[stock_id]
-             pc.share_price *= (1 + 0.001 * amount) # 0.1% per share
-             self._save_companies(data_manager)
-
+        self.holder_index.apply(stock_id, user_id, amount)
         return cur
 
     def sell(self, data_manager, user_id: str, stock_id: str, amount: int):
@@ -116,35 +116,449 @@ class StockMarket:
             raise ValueError("股票不存在")
         if amount <= 0:
             raise ValueError("出售数量必须大于0")
+        if stock_id in self.player_companies:
+            raise ValueError("玩家公司股票需通过委托交易，请使用 挂单卖出")
         user = data_manager.load_user(user_id) or {}
+        revenue = stock.price * amount
+        remaining = self._remove_holding(user, stock_id, amount)
+        user['money'] = user.get('money', 0) + revenue
+        data_manager.save_user(user_id, user)
+        self.holder_index.apply(stock_id, user_id, -amount)
+        return {'revenue': revenue, 'remaining': remaining}
+
+    @staticmethod
+    def _add_holding(user: dict, stock_id: str, amount: int, price: float) -> dict:
+        holdings = user.setdefault('stocks', {})
+        cur = holdings.get(stock_id, {'amount':0, 'avg_price':0})
+        total_cost = cur['avg_price'] * cur['amount'] + price * amount
+        cur['amount'] = cur['amount'] + amount
+        cur['avg_price'] = total_cost / cur['amount']
+        holdings[stock_id] = cur
+        return cur
+
+    @staticmethod
+    def _remove_holding(user: dict, stock_id: str, amount: int) -> int:
         holdings = user.get('stocks', {})
         cur = holdings.get(stock_id)
         if not cur or cur.get('amount',0) < amount:
             raise ValueError("持仓不足")
-        revenue = stock.price * amount
-        user['money'] = user.get('money', 0) + revenue
-        
-        # Influence price: Selling decreases price
-        if stock_id in self.player_companies:
-             pc = self.player_companies[stock_id]
-             pc.share_price *= (1 - 0.001 * amount)
-             if pc.share_price < 0.1: pc.share_price = 0.1
-             self._save_companies(data_manager)
-
         cur['amount'] = cur.get('amount',0) - amount
         if cur['amount'] == 0:
             holdings.pop(stock_id, None)
-        else:
-            holdings[stock_id] = cur
         user['stocks'] = holdings
-        data_manager.save_user(user_id, user)
-        return {'revenue': revenue, 'remaining': cur.get('amount',0)}
+        return cur['amount']
 
     def list_holdings(self, data_manager, user_id: str):
         user = data_manager.load_user(user_id) or {}
         return user.get('stocks', {})
 
-    def update_prices(self):
-        # Simulate price changes using volatility
+    def update_prices(self, data_manager=None):
+        """Random walk for system stocks: each tick moves up to volatility x PRICE_STEP either way."""
+        now = int(time.time())
         for s in self.stocks.values():
-            s.price = max(0.01, s.price * (1 + (s.volatility - 0.5) * 0.02))
+            s.price = round(max(0.01, s.price * (1 + random.uniform(-1, 1) * s.volatility * PRICE_STEP)), 2)
+            s.last_update = now
+        if data_manager is not None:
+            self.save_prices(data_manager)
+
+    def _prices_file(self, dm) -> Path:
+        return Path(dm.root) / 'data' / 'stock' / 'prices.json'
+
+    def save_prices(self, dm):
+        path = self._prices_file(dm)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = {sid: {'price': s.price, 'last_update': s.last_update} for sid, s in self.stocks.items()}
+        path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding='utf-8')
+
+    def load_prices(self, dm):
+        """Restore saved prices onto the registered system stocks."""
+        path = self._prices_file(dm)
+        if not path.exists():
+            return
+        try:
+            raw = json.loads(path.read_text(encoding='utf-8'))
+        except Exception:
+            return
+        for sid, saved in raw.items():
+            if sid in self.stocks:
+                self.stocks[sid].price = saved['price']
+                self.stocks[sid].last_update = saved.get('last_update', 0)
+
+    # ========== Order book (player stocks) ==========
+    def _new_order_id(self) -> str:
+        return uuid.uuid4().hex[:8]
+
+    def _enqueue(self, order: StockOrder) -> StockOrder:
+        self._seq += 1
+        order.seq = self._seq
+        order.created_at = time.time()
+        self._pending.append(order)
+        return order
+
+    def _book(self, stock_id: str) -> OrderBook:
+        if stock_id not in self.books:
+            self.books[stock_id] = OrderBook(stock_id)
+        return self.books[stock_id]
+
+    def submit_order(self, data_manager, user_id: str, stock_id: str, side: str,
+                     amount: int, price: Optional[float] = None) -> StockOrder:
+        """Queue a limit order (price given) or market order (price None).
+
+        The order is journaled right away; funds and shares are checked again
+        and escrowed when it is admitted by the next match_orders() batch.
+        Limit prices must lie within PRICE_BAND of the last traded price.
+        """
+        if stock_id not in self.player_companies:
+            raise ValueError("只有玩家公司股票支持委托交易")
+        if side not in ("buy", "sell"):
+            raise ValueError("委托方向必须是 buy 或 sell")
+        if amount <= 0:
+            raise ValueError("委托数量必须大于0")
+        if price is not None and price <= 0:
+            raise ValueError("委托价格必须大于0")
+        if price is not None:
+            last = self.player_companies[stock_id].share_price
+            low, high = last * (1 - PRICE_BAND), last * (1 + PRICE_BAND)
+            if not low <= price <= high:
+                raise ValueError(f"委托价格需在 {low:.2f}-{high:.2f} 之间")
+        user = data_manager.load_user(user_id) or {}
+        if side == "buy" and price is not None and user.get('money', 0) < price * amount:
+            raise ValueError("金币不足")
+        if side == "sell" and user.get('stocks', {}).get(stock_id, {}).get('amount', 0) < amount:
+            raise ValueError("持仓不足")
+        order = self._enqueue(StockOrder(
+            order_id=self._new_order_id(), stock_id=stock_id, user_id=user_id, side=side,
+            order_type="market" if price is None else "limit", price=price, amount=amount))
+        self._journal(data_manager, "order", order=order.dict())
+        return order
+
+    def cancel_order(self, user_id: str, order_id: str, data_manager=None) -> StockOrder:
+        """Cancel a pending or resting order; escrow is refunded in the next batch."""
+        for i, order in enumerate(self._pending):
+            if order.order_id == order_id and order.user_id == user_id:
+                order.status = "cancelled"
+                self._pending.pop(i)
+                if data_manager is not None:
+                    self._journal(data_manager, "cancel", order_id=order_id)
+                return order
+        for book in self.books.values():
+            order = book.orders.get(order_id)
+            if order and order.user_id == user_id:
+                if order_id not in self._pending_cancels:
+                    self._pending_cancels.append(order_id)
+                    if data_manager is not None:
+                        self._journal(data_manager, "cancel", order_id=order_id)
+                return order
+        raise ValueError("委托不存在")
+
+    def list_orders(self, user_id: str) -> List[StockOrder]:
+        orders = [o for o in self._pending if o.user_id == user_id]
+        for book in self.books.values():
+            orders.extend(o for o in book.orders.values() if o.user_id == user_id)
+        return sorted(orders, key=lambda o: o.seq)
+
+    def get_depth(self, stock_id: str, levels: int = 5) -> Dict[str, list]:
+        return self._book(stock_id).depth(levels)
+
+    def match_orders(self, data_manager) -> List[Trade]:
+        """Settle one batch: cancels, then queued orders in arrival order.
+
+        Every user touched by the batch is loaded once and saved once and
+        orders.json is written once, replacing the journal. Price changes and holder index updates
+        are only written by flush().
+        """
+        if not self._pending and not self._pending_cancels:
+            return []
+        self.load_companies(data_manager)
+        users: Dict[str, dict] = {}
+
+        def user(uid):
+            if uid not in users:
+                users[uid] = data_manager.load_user(uid) or {}
+            return users[uid]
+
+        for order_id in self._pending_cancels:
+            for book in self.books.values():
+                order = book.cancel(order_id)
+                if order:
+                    self._release(user(order.user_id), order)
+                    break
+        self._pending_cancels = []
+
+        pending, self._pending = self._pending, []
+        trades: List[Trade] = []
+        for order in pending:
+            filled = self._admit(order, user)
+            self._settle(filled, user)
+            trades.extend(filled)
+
+        data_manager.save_users(users)
+        self._save_orders(data_manager)
+        return trades
+
+    def _admit(self, order: StockOrder, user) -> List[Trade]:
+        """Escrow and match one queued order; rest or cancel the remainder."""
+        u = user(order.user_id)
+        max_fill = None
+        if order.side == "buy":
+            if order.order_type == "limit":
+                cost = order.price * order.amount
+                if u.get('money', 0) < cost:
+                    order.status = "rejected"
+                    return []
+                u['money'] = u.get('money', 0) - cost
+                order.escrow = cost
+            else:
+                # Market buys pay per fill, capped by the cash the buyer has left
+                budget = [u.get('money', 0)]
+
+                def max_fill(price, qty):
+                    qty = min(qty, int(budget[0] // price))
+                    budget[0] -= price * qty
+                    return qty
+        elif order.source != "ipo":
+            try:
+                order.cost_basis = u.get('stocks', {}).get(order.stock_id, {}).get('avg_price', 0)
+                self._remove_holding(u, order.stock_id, order.amount)
+            except ValueError:
+                order.status = "rejected"
+                return []
+
+        book = self._book(order.stock_id)
+        trades = book.match(order, max_fill)
+        if order.remaining > 0:
+            # A limit remainder that still crosses is blocked by the user's own
+            # resting order; cancel it rather than let the user trade with themselves.
+            if order.order_type == "limit" and not book.crosses(order):
+                book.add(order)
+            else:
+                order.status = "cancelled"
+                self._release(u, order)
+        return trades
+
+    def _settle(self, trades: List[Trade], user):
+        for t in trades:
+            buyer, seller = user(t.buy_order.user_id), user(t.sell_order.user_id)
+            self._add_holding(buyer, t.stock_id, t.amount, t.price)
+            # Escrowed shares still belong to the seller until they trade
+            self.holder_index.apply(t.stock_id, t.buy_order.user_id, t.amount)
+            if t.sell_order.source != "ipo":
+                self.holder_index.apply(t.stock_id, t.sell_order.user_id, -t.amount)
+            if t.buy_order.order_type == "limit":
+                # Escrow was taken at the limit price; refund any price improvement
+                t.buy_order.escrow -= t.buy_order.price * t.amount
+                buyer['money'] = buyer.get('money', 0) + (t.buy_order.price - t.price) * t.amount
+            else:
+                buyer['money'] = buyer.get('money', 0) - t.price * t.amount
+            seller['money'] = seller.get('money', 0) + t.price * t.amount
+            self.player_companies.update_price(t.stock_id, t.price)
+
+    def _release(self, u: dict, order: StockOrder):
+        """Return the unfilled part of an order's escrow to its owner."""
+        if order.side == "buy":
+            u['money'] = u.get('money', 0) + order.escrow
+            order.escrow = 0
+        elif order.source != "ipo" and order.remaining > 0:
+            self._add_holding(u, order.stock_id, order.remaining, order.cost_basis)
+
+    def _journal_file(self, dm) -> Path:
+        return Path(dm.root) / 'data' / 'stock' / 'orders_journal.jsonl'
+
+    def _journal(self, dm, op: str, **fields):
+        """Append one order or cancel to the journal (O(1) per command)."""
+        path = self._journal_file(dm)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._journal_seq += 1
+        entry = {"n": self._journal_seq, "op": op, **fields}
+        with path.open('a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    def _save_orders(self, dm):
+        path = Path(dm.root) / 'data' / 'stock'
+        path.mkdir(parents=True, exist_ok=True)
+        # The snapshot records the last journal entry it covers, so a crash
+        # before the journal is emptied does not replay those entries.
+        data = {
+            "journal_seq": self._journal_seq,
+            "orders": [o.dict() for book in self.books.values() for o in book.open_orders()]
+                      + [o.dict() for o in self._pending],
+            "cancels": list(self._pending_cancels),
+        }
+        (path / 'orders.json').write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding='utf-8')
+        self._journal_file(dm).write_text('', encoding='utf-8')
+
+    def load_orders(self, dm):
+        """Load the last batch snapshot, then replay newer journal entries."""
+        path = Path(dm.root) / 'data' / 'stock' / 'orders.json'
+        raw = {}
+        if path.exists():
+            try:
+                raw = json.loads(path.read_text(encoding='utf-8'))
+            except Exception:
+                raw = {}
+        if isinstance(raw, list):  # legacy: plain list of open orders
+            raw = {"orders": raw}
+        self._journal_seq = raw.get("journal_seq", 0)
+        for r in sorted(raw.get("orders", []), key=lambda r: r.get('seq', 0)):
+            self._restore_order(StockOrder(**r))
+        self._pending_cancels = list(raw.get("cancels", []))
+
+        journal = self._journal_file(dm)
+        if not journal.exists():
+            return
+        for line in journal.read_text(encoding='utf-8').splitlines():
+            try:
+                entry = json.loads(line)
+            except Exception:
+                continue  # torn last line from a crash mid-append
+            if entry.get("n", 0) <= self._journal_seq:
+                continue
+            self._journal_seq = entry["n"]
+            if entry.get("op") == "order":
+                self._restore_order(StockOrder(**entry["order"]))
+            elif entry.get("op") == "cancel":
+                oid = entry.get("order_id")
+                before = len(self._pending)
+                self._pending = [o for o in self._pending if o.order_id != oid]
+                if len(self._pending) == before and oid not in self._pending_cancels:
+                    self._pending_cancels.append(oid)
+
+    def _restore_order(self, order: StockOrder):
+        if order.status == "pending":
+            self._pending.append(order)
+        else:
+            self._book(order.stock_id).add(order)
+        self._seq = max(self._seq, order.seq)
+
+    # ========== Holder index ==========
+    def _holders_file(self, dm) -> Path:
+        return Path(dm.root) / 'data' / 'stock' / 'holders.json'
+
+    def load_holders(self, dm):
+        """Load the holder index, rebuilding it from user files on first run."""
+        if not self.holder_index.load(self._holders_file(dm)):
+            self.rebuild_holders(dm)
+
+    def rebuild_holders(self, dm) -> int:
+        """Recreate the holder index from every user document; returns holder count."""
+        users = dm.load_all_users()
+        # Shares escrowed in open sell orders are out of user['stocks'] but still owned
+        for book in self.books.values():
+            for o in book.open_orders():
+                if o.side == "sell" and o.source != "ipo":
+                    hold = users.setdefault(o.user_id, {}).setdefault('stocks', {}).setdefault(o.stock_id, {'amount': 0})
+                    hold['amount'] = hold.get('amount', 0) + o.remaining
+        self.holder_index.rebuild(users)
+        self.holder_index.save(self._holders_file(dm))
+        return sum(len(h) for h in self.holder_index.holders.values())
+
+    def flush_holders(self, dm):
+        if self.holder_index.dirty:
+            self.holder_index.save(self._holders_file(dm))
+
+    def get_holders(self, stock_id: str) -> Dict[str, int]:
+        return self.holder_index.holders_of(stock_id)
+
+    def top_holders(self, stock_id: str, n: int = 10):
+        return self.holder_index.top(stock_id, n)
+
+    def market_cap(self, stock_id: str) -> float:
+        """Player companies: price x total shares; system stocks: price x shares held."""
+        if stock_id in self.player_companies:
+            pc = self.player_companies[stock_id]
+            return pc.share_price * pc.total_shares
+        stock = self.get_stock(stock_id)
+        return stock.price * self.holder_index.total(stock_id) if stock else 0.0
+
+    def shareholder_summary(self, stock_id: str, n: int = 10) -> dict:
+        stock = self.get_stock(stock_id)
+        if not stock:
+            raise ValueError("股票不存在")
+        return {
+            'stock_id': stock_id,
+            'name': stock.name,
+            'price': stock.price,
+            'float_held': self.holder_index.total(stock_id),
+            'holder_count': len(self.holder_index.holders.get(stock_id, {})),
+            'market_cap': self.market_cap(stock_id),
+            'top_holders': self.top_holders(stock_id, n),
+            **self.holder_index.concentration(stock_id, n),
+        }
+
+    # ========== Dividends ==========
+    @staticmethod
+    def dividend_period(now: Optional[datetime] = None) -> str:
+        """Dividends are paid once per ISO week, e.g. '2026-W42'."""
+        year, week, _ = (now or datetime.now()).isocalendar()
+        return f"{year}-W{week:02d}"
+
+    def distribute_dividends(self, dm, period: Optional[str] = None) -> dict:
+        """Pay one period's dividends for every player company in a single pass.
+
+        Each holder receives amount x share_price x dividend_rate, paid out of
+        the company owner's cash; a company whose owner cannot cover the whole
+        payout is skipped and retried by the next run. Every touched user is
+        loaded and saved once. Payouts are keyed on (company, period): the
+        ledger marks finished companies, and each user file records the
+        period last paid or received per company, so re-running after a
+        partial write never pays or debits twice.
+        """
+        started = time.perf_counter()
+        period = period or self.dividend_period()
+        self.load_companies(dm)
+        ledger_file = Path(dm.root) / 'data' / 'stock' / 'dividends.json'
+        ledger = {}
+        if ledger_file.exists():
+            try:
+                ledger = json.loads(ledger_file.read_text(encoding='utf-8'))
+            except Exception:
+                ledger = {}
+        paid = ledger.setdefault('paid', {})
+
+        due = [(sid, pc) for sid, pc in self.player_companies.items()
+               if paid.get(sid) != period and pc.dividend_rate > 0]
+        uids = [pc.owner_id for _, pc in due]
+        for sid, pc in due:
+            uids.extend(self.holder_index.holders.get(sid, {}))
+        users = dm.load_users(uids)
+
+        changed: Dict[str, dict] = {}
+        credited: Dict[str, float] = {}
+        companies, skipped = [], 0
+        for sid, pc in due:
+            per_share = pc.share_price * pc.dividend_rate
+            # The owner's own shares would pay the owner, so they are left out
+            payouts = {uid: round(amount * per_share, 2)
+                       for uid, amount in self.holder_index.holders.get(sid, {}).items()
+                       if uid != pc.owner_id
+                       and users[uid].get('dividends', {}).get(sid) != period}
+            owner = users[pc.owner_id]
+            if owner.get('dividends_paid', {}).get(sid) != period:
+                total = round(sum(payouts.values()), 2)
+                if owner.get('money', 0) < total:
+                    skipped += 1
+                    continue
+                owner['money'] = owner.get('money', 0) - total
+                owner.setdefault('dividends_paid', {})[sid] = period
+                changed[pc.owner_id] = owner
+            for uid, amount in payouts.items():
+                user = users[uid]
+                user['money'] = user.get('money', 0) + amount
+                user.setdefault('dividends', {})[sid] = period
+                changed[uid] = user
+                credited[uid] = credited.get(uid, 0) + amount
+            companies.append(sid)
+        dm.save_users(changed)
+
+        for sid in companies:
+            paid[sid] = period
+        ledger_file.parent.mkdir(parents=True, exist_ok=True)
+        ledger_file.write_text(json.dumps(ledger, ensure_ascii=False, indent=2), encoding='utf-8')
+        return {
+            'period': period,
+            'companies': len(companies),
+            'skipped': skipped,
+            'holders': len(credited),
+            'total': round(sum(credited.values()), 2),
+            'elapsed': time.perf_counter() - started,
+        }
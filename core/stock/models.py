@@ -1,4 +1,5 @@
 from pydantic import BaseModel
+from typing import Optional
 
 class StockData(BaseModel):
     id: str
@@ -25,3 +26,23 @@ class PlayerCompany(BaseModel):
     dividend_rate: float = 0.05
     description: str = ""
 
+
+class StockOrder(BaseModel):
+    order_id: str
+    stock_id: str
+    user_id: str
+    side: str # "buy" / "sell"
+    order_type: str = "limit" # "limit" / "market"
+    price: Optional[float] = None # None for market orders
+    amount: int
+    filled: int = 0
+    escrow: float = 0.0 # Money reserved for resting buy orders
+    cost_basis: float = 0.0 # Seller's avg_price, restored if shares are returned
+    status: str = "pending" # pending / open / filled / cancelled / rejected
+    seq: int = 0 # Arrival sequence, used for time priority
+    created_at: float = 0.0
+    source: str = "user" # "ipo" orders sell treasury shares, no escrow needed
+
+    @property
+    def remaining(self) -> int:
+        return self.amount - self.filled
@@ -0,0 +1,115 @@
+import heapq
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from .models import StockOrder
+
+
+@dataclass
+class Trade:
+    stock_id: str
+    buy_order: StockOrder
+    sell_order: StockOrder
+    price: float
+    amount: int
+
+
+class OrderBook:
+    """Price-time priority limit order book for one stock.
+
+    Bids live in a max-heap keyed by (-price, seq), asks in a min-heap keyed by
+    (price, seq). Cancelled or filled orders are removed lazily: their heap
+    entries are skipped when they surface at the top.
+    """
+
+    def __init__(self, stock_id: str):
+        self.stock_id = stock_id
+        self.orders: Dict[str, StockOrder] = {} # Resting orders by id
+        self._bids: list = []
+        self._asks: list = []
+
+    def add(self, order: StockOrder):
+        """Rest an order on the book (no matching)."""
+        order.status = "open"
+        self.orders[order.order_id] = order
+        if order.side == "buy":
+            heapq.heappush(self._bids, (-order.price, order.seq, order.order_id))
+        else:
+            heapq.heappush(self._asks, (order.price, order.seq, order.order_id))
+
+    def cancel(self, order_id: str) -> Optional[StockOrder]:
+        order = self.orders.pop(order_id, None)
+        if order:
+            order.status = "cancelled"
+        return order
+
+    def _top(self, heap: list) -> Optional[StockOrder]:
+        while heap:
+            order = self.orders.get(heap[0][2])
+            if order and order.remaining > 0:
+                return order
+            heapq.heappop(heap)
+        return None
+
+    def best_bid(self) -> Optional[StockOrder]:
+        return self._top(self._bids)
+
+    def best_ask(self) -> Optional[StockOrder]:
+        return self._top(self._asks)
+
+    def match(self, incoming: StockOrder, max_fill=None) -> List[Trade]:
+        """Match an incoming order against the opposite side.
+
+        Trades execute at the resting order's price. `max_fill(price, amount)`
+        may cap each fill (e.g. by the buyer's cash) and returning 0 stops
+        matching. Matching also stops at the user's own resting order (no
+        self-trades). Whatever remains of the incoming order is left to the caller.
+        """
+        trades = []
+        is_buy = incoming.side == "buy"
+        while incoming.remaining > 0:
+            resting = self.best_ask() if is_buy else self.best_bid()
+            if not resting or resting.user_id == incoming.user_id:
+                break
+            if incoming.order_type == "limit":
+                if is_buy and resting.price > incoming.price:
+                    break
+                if not is_buy and resting.price < incoming.price:
+                    break
+            qty = min(incoming.remaining, resting.remaining)
+            if max_fill:
+                qty = min(qty, max_fill(resting.price, qty))
+            if qty <= 0:
+                break
+            incoming.filled += qty
+            resting.filled += qty
+            if resting.remaining == 0:
+                resting.status = "filled"
+                self.orders.pop(resting.order_id, None)
+            buy, sell = (incoming, resting) if is_buy else (resting, incoming)
+            trades.append(Trade(self.stock_id, buy, sell, resting.price, qty))
+        if incoming.remaining == 0:
+            incoming.status = "filled"
+        return trades
+
+    def crosses(self, order: StockOrder) -> bool:
+        """Whether a limit order would still trade against the opposite side."""
+        if order.side == "buy":
+            resting = self.best_ask()
+            return resting is not None and resting.price <= order.price
+        resting = self.best_bid()
+        return resting is not None and resting.price >= order.price
+
+    def depth(self, levels: int = 5) -> Dict[str, list]:
+        """Aggregated price levels: {'bids': [(price, amount)], 'asks': [...]}."""
+        result = {}
+        for side, heap, reverse in (("bids", self._bids, True), ("asks", self._asks, False)):
+            book: Dict[float, int] = {}
+            for _, _, oid in heap:
+                order = self.orders.get(oid)
+                if order and order.remaining > 0:
+                    book[order.price] = book.get(order.price, 0) + order.remaining
+            result[side] = sorted(book.items(), reverse=reverse)[:levels]
+        return result
+
+    def open_orders(self) -> List[StockOrder]:
+        return list(self.orders.values())
@@ -0,0 +1,104 @@
+import json
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+from .models import PlayerCompany
+
+
+class CompanyRegistry:
+    """Persistent player-company registry indexed by stock_id and owner_id.
+
+    Behaves like a read-only dict keyed by stock_id. The backing file is only
+    read on first access after bind(). New companies are written immediately;
+    price changes just mark the registry dirty and are written by flush(), so
+    any number of trades between flushes costs a single write.
+    """
+
+    def __init__(self):
+        self._path: Optional[Path] = None
+        self._loaded = False
+        self._companies: Dict[str, PlayerCompany] = {}
+        self._by_owner: Dict[str, str] = {} # owner_id -> stock_id
+        self.dirty = False
+
+    def bind(self, path: Path):
+        if self._path is None:
+            self._path = path
+
+    def _ensure_loaded(self):
+        if self._loaded or self._path is None:
+            return
+        self._loaded = True
+        if not self._path.exists():
+            return
+        try:
+            raw = json.loads(self._path.read_text(encoding='utf-8'))
+        except Exception:
+            return
+        for r in raw:
+            pc = PlayerCompany(**r)
+            # Companies registered before loading (tests, migrations) win
+            if pc.stock_id not in self._companies:
+                self._index(pc)
+
+    def _index(self, pc: PlayerCompany):
+        self._companies[pc.stock_id] = pc
+        self._by_owner[pc.owner_id] = pc.stock_id
+
+    # ---- dict-like access by stock_id ----
+    def __contains__(self, stock_id) -> bool:
+        self._ensure_loaded()
+        return stock_id in self._companies
+
+    def __getitem__(self, stock_id: str) -> PlayerCompany:
+        self._ensure_loaded()
+        return self._companies[stock_id]
+
+    def __iter__(self) -> Iterator[str]:
+        self._ensure_loaded()
+        return iter(list(self._companies))
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self._companies)
+
+    def get(self, stock_id: str, default=None) -> Optional[PlayerCompany]:
+        self._ensure_loaded()
+        return self._companies.get(stock_id, default)
+
+    def keys(self):
+        self._ensure_loaded()
+        return self._companies.keys()
+
+    def values(self):
+        self._ensure_loaded()
+        return self._companies.values()
+
+    def items(self):
+        self._ensure_loaded()
+        return self._companies.items()
+
+    def by_owner(self, owner_id: str) -> Optional[PlayerCompany]:
+        self._ensure_loaded()
+        sid = self._by_owner.get(owner_id)
+        return self._companies.get(sid) if sid else None
+
+    # ---- mutation ----
+    def add(self, pc: PlayerCompany):
+        self._ensure_loaded()
+        self._index(pc)
+        self.dirty = True
+        self.flush()
+
+    def update_price(self, stock_id: str, price: float):
+        pc = self.get(stock_id)
+        if pc and pc.share_price != price:
+            pc.share_price = price
+            self.dirty = True
+
+    def flush(self):
+        if not self.dirty or self._path is None:
+            return
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        data = [c.dict() for c in self._companies.values()]
+        self._path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding='utf-8')
+        self.dirty = False
@@ -0,0 +1,107 @@
+import json
+import random
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# 排行榜需要的字段，目录中每个酒馆只保存这些
+SUMMARY_FIELDS = ('name', 'level', 'total_income', 'reputation', 'staff_count', 'popularity')
+
+
+def rank_score(summary: Dict) -> int:
+    """综合评分公式"""
+    return int(
+        summary.get('level', 1) * 1000
+        + summary.get('total_income', 0) // 100
+        + summary.get('reputation', 1) * 500
+        + summary.get('staff_count', 0) * 200
+        + summary.get('popularity', 10) * 10
+    )
+
+
+def summarize(data: Dict) -> Dict:
+    """从完整的酒馆数据提取目录条目"""
+    summary = {
+        'name': data.get('name', '未知酒馆'),
+        'level': data.get('level', 1),
+        'total_income': data.get('total_income', 0),
+        'reputation': data.get('reputation', 1),
+        'staff_count': len(data.get('staff', [])),
+        'popularity': data.get('popularity', 10),
+    }
+    summary['rank_score'] = rank_score(summary)
+    return summary
+
+
+class TavernDirectory:
+    """
+    酒馆目录：所有酒馆的排行摘要存在一个 directory.json 中
+
+    _save_tavern_data 保存酒馆时增量更新内存中的对应条目并标记 dirty，
+    由会话落盘任务调用 flush 统一写盘（字段没变就不标记）；
+    排行榜、我的排名、随机参观都只读这张表，不再逐个解析 *_tavern.json。
+    目录文件不存在时（老存档）扫描一次酒馆文件重建。
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.dirty = False
+        self._entries: Optional[Dict[str, Dict]] = None
+
+    def _ensure_loaded(self) -> Dict[str, Dict]:
+        if self._entries is not None:
+            return self._entries
+        if self.path.exists():
+            try:
+                self._entries = json.loads(self.path.read_text(encoding='utf-8'))
+                return self._entries
+            except Exception:
+                pass
+        self._entries = {}
+        for p in self.path.parent.glob("*_tavern.json"):
+            try:
+                data = json.loads(p.read_text(encoding='utf-8'))
+            except Exception:
+                continue
+            uid = data.get('user_id') or p.name[:-len('_tavern.json')]
+            self._entries[uid] = summarize(data)
+        self._save()
+        return self._entries
+
+    def _save(self):
+        self.path.write_text(json.dumps(self._entries, ensure_ascii=False), encoding='utf-8')
+        self.dirty = False
+
+    def flush(self):
+        if self.dirty:
+            self._save()
+
+    def update(self, user_id: str, data: Dict):
+        entries = self._ensure_loaded()
+        summary = summarize(data)
+        if entries.get(user_id) != summary:
+            entries[user_id] = summary
+            self.dirty = True
+
+    def get(self, user_id: str) -> Optional[Dict]:
+        return self._ensure_loaded().get(user_id)
+
+    def __len__(self) -> int:
+        return len(self._ensure_loaded())
+
+    def ranking(self, sort_by: str = 'score') -> List[tuple]:
+        """按指定字段排序的 [(user_id, 条目)]"""
+        key = {'income': 'total_income', 'level': 'level', 'reputation': 'reputation'}.get(sort_by, 'rank_score')
+        return sorted(self._ensure_loaded().items(), key=lambda kv: kv[1].get(key, 0), reverse=True)
+
+    def rank_of(self, user_id: str) -> Optional[int]:
+        """按综合评分的名次，只比较评分不排序"""
+        entries = self._ensure_loaded()
+        mine = entries.get(user_id)
+        if mine is None:
+            return None
+        score = mine['rank_score']
+        return 1 + sum(1 for uid, e in entries.items() if e['rank_score'] > score)
+
+    def random_owner(self, exclude: Optional[str] = None) -> Optional[str]:
+        candidates = [uid for uid in self._ensure_loaded() if uid != exclude]
+        return random.choice(candidates) if candidates else None
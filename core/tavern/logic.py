@@ -5,13 +5,31 @@ from typing import Optional, Dict, List
 from datetime import datetime, timedelta
 from ..common.data_manager import DataManager
 from ..common.cooldown import check_cooldown, set_cooldown
+from ..common.timed_stat import TimedStat
+from ..common.sampler import SamplerCache
+from ..common.session_store import SessionStore
 from . import models
+from .directory import TavernDirectory
+from .timed_store import ExpiringStore
+
+# 清洁度每小时自然下降量
+CLEANLINESS_DECAY_PER_HOUR = 1
+# 酒馆记录中保留的最近评语条数
+RECENT_RATINGS_LIMIT = 20
+# 待处理事件的保留时间（秒）
+PENDING_EVENT_TTL = 24 * 3600
 
 class TavernLogic:
     def __init__(self, data_manager: Optional[DataManager] = None):
         self.dm = data_manager or DataManager()
         self.data_path = Path(self.dm.root) / 'data' / 'tavern'
         self.data_path.mkdir(parents=True, exist_ok=True)
+        self._samplers = SamplerCache()
+        self._directory: Optional[TavernDirectory] = None
+        self._activities: Optional[ExpiringStore] = None
+        self._brewing: Optional[ExpiringStore] = None
+        # 营业触发、等待玩家选择的事件（内存会话，定期快照）
+        self.pending_events = SessionStore(self.data_path / 'pending_events.json', PENDING_EVENT_TTL)
 
     def _tavern_file(self, user_id: str):
         """获取用户酒馆数据文件路径"""
@@ -24,12 +42,28 @@ class TavernLogic:
             return None
         import json
         data = json.loads(p.read_text(encoding='utf-8'))
-        return models.TavernData(**data)
+        tavern = models.TavernData(**data)
+        tavern.cleanliness = int(self._cleanliness(tavern).get())
+        return tavern
+
+    @staticmethod
+    def _cleanliness(tavern: models.TavernData) -> TimedStat:
+        """清洁度随时间下降，读取时推算，不需要定时刷新"""
+        return TimedStat.bind(tavern.clock, 'cleanliness', tavern.cleanliness, -CLEANLINESS_DECAY_PER_HOUR)
 
     def _save_tavern_data(self, user_id: str, tavern: models.TavernData):
-        """保存用户酒馆数据"""
+        """保存用户酒馆数据，并同步酒馆目录"""
         p = self._tavern_file(user_id)
         p.write_text(tavern.model_dump_json(), encoding='utf-8')
+        self.directory.update(user_id, tavern.model_dump())
+
+    @property
+    def directory(self) -> TavernDirectory:
+        """酒馆目录（排行摘要），随 data_path 变化重新绑定"""
+        path = self.data_path / 'directory.json'
+        if self._directory is None or self._directory.path != path:
+            self._directory = TavernDirectory(path)
+        return self._directory
 
     def _load_global_drinks(self) -> List[models.Drink]:
         """加载全局饮品数据库"""
@@ -232,7 +266,7 @@ class TavernLogic:
         tavern.last_operated = datetime.now().isoformat()
         tavern.daily_income = profit
         tavern.total_income += profit
-        tavern.cleanliness = max(0, tavern.cleanliness - 15)
+        tavern.cleanliness = int(self._cleanliness(tavern).add(-15))
         
         if tavern.cleanliness < 30:
             tavern.reputation = max(1, tavern.reputation - 1)
@@ -378,15 +412,28 @@ class TavernLogic:
 
     # ========== 高级功能：事件系统 ==========
     
-    def _load_events(self) -> List[Dict]:
-        """加载事件数据"""
+    def _events_file(self) -> Path:
         p = self.data_path / 'tavern_events.json'
         if not p.exists():
             p = self.data_path.parent / 'tavern' / 'tavern_events.json'
+        return p
+
+    def _load_events(self) -> List[Dict]:
+        """加载事件数据"""
+        p = self._events_file()
         if not p.exists():
             return []
         data = json.loads(p.read_text(encoding='utf-8'))
         return data.get('events', [])
+
+    def _event_sampler(self, level: int):
+        """按酒馆等级分桶的事件别名表（按频率加权），事件文件修改后自动重建"""
+        p = self._events_file()
+        version = p.stat().st_mtime_ns if p.exists() else None
+        def build():
+            eligible = [e for e in self._load_events() if e.get('minLevel', 1) <= level]
+            return eligible, [e.get('frequency', 10) for e in eligible]
+        return self._samplers.get(('event', level), build, version)
     
     def trigger_random_event(self, user_id: str) -> Optional[Dict]:
         """触发随机事件（营业时调用）"""
@@ -394,13 +441,9 @@ class TavernLogic:
         if not tavern:
             return None
         
-        events = self._load_events()
-        if not events:
-            return None
-        
-        # 筛选符合等级要求的事件
-        eligible_events = [e for e in events if e.get('minLevel', 1) <= tavern.level]
-        if not eligible_events:
+        # 符合等级要求的事件
+        sampler = self._event_sampler(tavern.level)
+        if not sampler:
             return None
         
         # 30%概率触发事件
@@ -408,21 +451,7 @@ class TavernLogic:
             return None
         
         # 按频率权重选择事件
-        total_freq = sum(e.get('frequency', 10) for e in eligible_events)
-        roll = random.random() * total_freq
-        cumulative = 0
-        selected_event = None
-        
-        for event in eligible_events:
-            cumulative += event.get('frequency', 10)
-            if roll <= cumulative:
-                selected_event = event
-                break
-        
-        if not selected_event:
-            selected_event = random.choice(eligible_events)
-        
-        return selected_event
+        return sampler.draw()
     
     def process_event_choice(self, user_id: str, event_id: str, choice_idx: int) -> Dict:
         """处理事件选择"""
@@ -478,7 +507,7 @@ class TavernLogic:
         
         if 'cleanliness' in effects:
             change = effects['cleanliness']
-            tavern.cleanliness = max(0, min(100, tavern.cleanliness + change))
+            tavern.cleanliness = int(self._cleanliness(tavern).add(change))
             applied_effects['cleanliness'] = change
         
         if 'income' in effects:
@@ -523,21 +552,22 @@ class TavernLogic:
     
     def get_pending_event(self, user_id: str) -> Optional[Dict]:
         """获取待处理的事件（上次营业触发的）"""
-        # 从用户数据或缓存获取
-        p = self.data_path / f"{user_id}_pending_event.json"
-        if not p.exists():
-            return None
-        data = json.loads(p.read_text(encoding='utf-8'))
-        return data
-    
-    def set_pending_event(self, user_id: str, event: Optional[Dict]):
-        """设置待处理事件"""
-        p = self.data_path / f"{user_id}_pending_event.json"
+        event = self.pending_events.get(user_id)
         if event is None:
+            # 旧版每个事件一个文件，读到后并入会话存储
+            p = self.data_path / f"{user_id}_pending_event.json"
             if p.exists():
+                event = json.loads(p.read_text(encoding='utf-8'))
                 p.unlink()
+                self.pending_events.set(user_id, event)
+        return event
+    
+    def set_pending_event(self, user_id: str, event: Optional[Dict]):
+        """设置待处理事件，None 表示清除"""
+        if event is None:
+            self.pending_events.pop(user_id)
         else:
-            p.write_text(json.dumps(event, ensure_ascii=False), encoding='utf-8')
+            self.pending_events.set(user_id, event)
     
     def list_available_events(self, user_id: str) -> List[Dict]:
         """列出当前等级可触发的事件"""
@@ -557,99 +587,37 @@ class TavernLogic:
     
     # ========== 高级功能：排行榜系统 ==========
     
-    def _get_all_taverns(self) -> List[Dict]:
-        """获取所有酒馆数据"""
-        taverns = []
-        for p in self.data_path.glob("*_tavern.json"):
-            try:
-                data = json.loads(p.read_text(encoding='utf-8'))
-                taverns.append(data)
-            except:
-                pass
-        return taverns
-    
     def get_tavern_ranking(self, sort_by: str = 'score') -> List[Dict]:
         """获取酒馆排行榜"""
-        taverns = self._get_all_taverns()
-        
-        # 计算综合评分
-        for t in taverns:
-            level = t.get('level', 1)
-            total_income = t.get('total_income', 0)
-            reputation = t.get('reputation', 1)
-            staff_count = len(t.get('staff', []))
-            popularity = t.get('popularity', 10)
-            
-            # 综合评分公式
-            score = (level * 1000) + (total_income // 100) + (reputation * 500) + (staff_count * 200) + (popularity * 10)
-            t['rank_score'] = score
-        
-        # 排序
-        if sort_by == 'income':
-            taverns.sort(key=lambda x: x.get('total_income', 0), reverse=True)
-        elif sort_by == 'level':
-            taverns.sort(key=lambda x: x.get('level', 1), reverse=True)
-        elif sort_by == 'reputation':
-            taverns.sort(key=lambda x: x.get('reputation', 1), reverse=True)
-        else:  # 默认按综合评分
-            taverns.sort(key=lambda x: x.get('rank_score', 0), reverse=True)
-        
-        # 添加排名
         rankings = []
-        for i, t in enumerate(taverns[:20], 1):  # 只返回前20名
-            rankings.append({
-                'rank': i,
-                'user_id': t.get('user_id', 'unknown'),
-                'name': t.get('name', '未知酒馆'),
-                'level': t.get('level', 1),
-                'total_income': t.get('total_income', 0),
-                'reputation': t.get('reputation', 1),
-                'staff_count': len(t.get('staff', [])),
-                'rank_score': t.get('rank_score', 0)
-            })
-        
+        for i, (uid, t) in enumerate(self.directory.ranking(sort_by)[:20], 1):  # 只返回前20名
+            rankings.append(self._rank_entry(i, uid, t))
         return rankings
     
-    def get_my_rank(self, user_id: str) -> Optional[Dict]:
-        """获取我的排名"""
-        rankings = self.get_tavern_ranking()
-        for r in rankings:
-            if r['user_id'] == user_id:
-                return r
-        
-        # 如果不在前20名，单独计算
-        tavern = self._load_tavern_data(user_id)
-        if not tavern:
-            return None
-        
-        all_taverns = self._get_all_taverns()
-        for t in all_taverns:
-            level = t.get('level', 1)
-            total_income = t.get('total_income', 0)
-            reputation = t.get('reputation', 1)
-            staff_count = len(t.get('staff', []))
-            popularity = t.get('popularity', 10)
-            t['rank_score'] = (level * 1000) + (total_income // 100) + (reputation * 500) + (staff_count * 200) + (popularity * 10)
-        
-        all_taverns.sort(key=lambda x: x.get('rank_score', 0), reverse=True)
-        
-        my_rank = next((i+1 for i, t in enumerate(all_taverns) if t.get('user_id') == user_id), None)
-        if not my_rank:
-            return None
-        
-        my_score = (tavern.level * 1000) + (tavern.total_income // 100) + (tavern.reputation * 500) + (len(tavern.staff) * 200) + (tavern.popularity * 10)
-        
+    @staticmethod
+    def _rank_entry(rank: int, user_id: str, summary: Dict) -> Dict:
         return {
-            'rank': my_rank,
+            'rank': rank,
             'user_id': user_id,
-            'name': tavern.name,
-            'level': tavern.level,
-            'total_income': tavern.total_income,
-            'reputation': tavern.reputation,
-            'staff_count': len(tavern.staff),
-            'rank_score': my_score
+            'name': summary['name'],
+            'level': summary['level'],
+            'total_income': summary['total_income'],
+            'reputation': summary['reputation'],
+            'staff_count': summary['staff_count'],
+            'rank_score': summary['rank_score']
         }
     
+    def get_my_rank(self, user_id: str) -> Optional[Dict]:
+        """获取我的排名（按综合评分）"""
+        summary = self.directory.get(user_id)
+        if not summary:
+            return None
+        return self._rank_entry(self.directory.rank_of(user_id), user_id, summary)
+    
+    def random_tavern_owner(self, exclude: Optional[str] = None) -> Optional[str]:
+        """随机挑一家可参观的酒馆，返回店主ID"""
+        return self.directory.random_owner(exclude)
+    
     # ========== 高级功能：参观系统 ==========
     
     def visit_tavern(self, visitor_id: str, owner_id: str) -> Dict:
@@ -679,7 +647,7 @@ class TavernLogic:
         if inspiration_bonus == 'atmosphere':
             visitor_tavern.atmosphere = min(100, visitor_tavern.atmosphere + 2)
         else:
-            visitor_tavern.cleanliness = min(100, visitor_tavern.cleanliness + 5)
+            visitor_tavern.cleanliness = int(self._cleanliness(visitor_tavern).add(5))
         
         self._save_tavern_data(owner_id, target_tavern)
         self._save_tavern_data(visitor_id, visitor_tavern)
@@ -701,6 +669,47 @@ class TavernLogic:
             "bonus_amount": 2 if inspiration_bonus == 'atmosphere' else 5
         }
     
+    def _migrate_ratings(self, owner_id: str, tavern: models.TavernData) -> bool:
+        """把旧版 {owner}_ratings.json 并入酒馆记录，返回是否有迁移"""
+        ratings_file = self.data_path / f"{owner_id}_ratings.json"
+        if not ratings_file.exists():
+            return False
+        try:
+            legacy = json.loads(ratings_file.read_text(encoding='utf-8')).get('ratings', [])
+        except Exception:
+            legacy = []
+        for r in legacy:
+            self._apply_rating(tavern.ratings, r.get('visitor_id', ''), r['rating'], r.get('comment', ''), r.get('time'))
+        ratings_file.unlink()
+        return True
+    
+    @staticmethod
+    def _apply_rating(ratings: models.TavernRatings, visitor_id: str, rating: int,
+                      comment: str = "", time: Optional[str] = None) -> bool:
+        """O(1) 更新评分汇总；同一评分者再次评分时替换旧分数，返回是否为重复评分"""
+        previous = ratings.raters.get(visitor_id)
+        if previous is not None:
+            ratings.total -= previous
+            ratings.histogram[str(previous)] -= 1
+        else:
+            ratings.count += 1
+        ratings.raters[visitor_id] = rating
+        ratings.total += rating
+        ratings.histogram[str(rating)] = ratings.histogram.get(str(rating), 0) + 1
+        ratings.recent.append({
+            "visitor_id": visitor_id,
+            "rating": rating,
+            "comment": comment,
+            "time": time or datetime.now().isoformat()
+        })
+        if len(ratings.recent) > RECENT_RATINGS_LIMIT:
+            del ratings.recent[0]
+        return previous is not None
+    
+    @staticmethod
+    def _average(ratings: models.TavernRatings) -> float:
+        return round(ratings.total / ratings.count, 2) if ratings.count else 0
+    
     def rate_tavern(self, visitor_id: str, owner_id: str, rating: int, comment: str = "") -> Dict:
         """给酒馆评分"""
         rem = check_cooldown(visitor_id, 'tavern', 'rate')
@@ -717,43 +726,22 @@ class TavernLogic:
         if not target_tavern:
             raise ValueError("目标玩家没有酒馆！")
         
-        # 加载或创建评分记录文件
-        ratings_file = self.data_path / f"{owner_id}_ratings.json"
-        if ratings_file.exists():
-            ratings_data = json.loads(ratings_file.read_text(encoding='utf-8'))
-        else:
-            ratings_data = {"ratings": [], "average": 0}
-        
-        # 添加评分
-        ratings_data['ratings'].append({
-            "visitor_id": visitor_id,
-            "rating": rating,
-            "comment": comment,
-            "time": datetime.now().isoformat()
-        })
-        
-        # 只保留最近50条评分
-        if len(ratings_data['ratings']) > 50:
-            ratings_data['ratings'] = ratings_data['ratings'][-50:]
-        
-        # 计算平均分
-        avg = sum(r['rating'] for r in ratings_data['ratings']) / len(ratings_data['ratings'])
-        ratings_data['average'] = round(avg, 2)
+        self._migrate_ratings(owner_id, target_tavern)
+        updated = self._apply_rating(target_tavern.ratings, visitor_id, rating, comment)
         
-        ratings_file.write_text(json.dumps(ratings_data, ensure_ascii=False, indent=2), encoding='utf-8')
-        
-        # 高分会提升目标酒馆声誉
-        if rating >= 4:
-            target_tavern.reputation = min(10, target_tavern.reputation + 0.1)
-            self._save_tavern_data(owner_id, target_tavern)
+        # 高分会提升目标酒馆声誉（重复评分不再加）
+        if rating >= 4 and not updated:
+            target_tavern.reputation = min(10, round(target_tavern.reputation + 0.1, 1))
+        self._save_tavern_data(owner_id, target_tavern)
         
         set_cooldown(visitor_id, 'tavern', 'rate', 300)  # 5分钟冷却
         
         return {
             "success": True,
             "rating": rating,
-            "new_average": ratings_data['average'],
-            "total_ratings": len(ratings_data['ratings'])
+            "updated": updated,
+            "new_average": self._average(target_tavern.ratings),
+            "total_ratings": target_tavern.ratings.count
         }
     
     def get_tavern_ratings(self, user_id: str) -> Dict:
@@ -762,22 +750,16 @@ class TavernLogic:
         if not tavern:
             raise ValueError("酒馆不存在！")
         
-        ratings_file = self.data_path / f"{user_id}_ratings.json"
-        if not ratings_file.exists():
-            return {
-                "tavern_name": tavern.name,
-                "average": 0,
-                "total_ratings": 0,
-                "recent_ratings": []
-            }
-        
-        ratings_data = json.loads(ratings_file.read_text(encoding='utf-8'))
+        if self._migrate_ratings(user_id, tavern):
+            self._save_tavern_data(user_id, tavern)
         
+        ratings = tavern.ratings
         return {
             "tavern_name": tavern.name,
-            "average": ratings_data.get('average', 0),
-            "total_ratings": len(ratings_data.get('ratings', [])),
-            "recent_ratings": ratings_data.get('ratings', [])[-5:]  # 最近5条
+            "average": self._average(ratings),
+            "total_ratings": ratings.count,
+            "distribution": {int(k): v for k, v in ratings.histogram.items()},
+            "recent_ratings": ratings.recent[-5:]  # 最近5条
         }
 
     # ========== 高级功能：特殊活动系统 ==========
@@ -841,17 +823,13 @@ class TavernLogic:
     def _get_active_activities_file(self) -> Path:
         return self.data_path / 'active_activities.json'
     
-    def _load_active_activities(self) -> List[Dict]:
-        """加载进行中的活动"""
-        p = self._get_active_activities_file()
-        if not p.exists():
-            return []
-        return json.loads(p.read_text(encoding='utf-8'))
-    
-    def _save_active_activities(self, activities: List[Dict]):
-        """保存活动数据"""
-        p = self._get_active_activities_file()
-        p.write_text(json.dumps(activities, ensure_ascii=False, indent=2), encoding='utf-8')
+    @property
+    def activities(self) -> ExpiringStore:
+        """进行中的活动（按 id / 主办者索引，按结束时间建堆）"""
+        path = self._get_active_activities_file()
+        if self._activities is None or self._activities.path != path:
+            self._activities = ExpiringStore(path, 'end_time', 'host_id')
+        return self._activities
     
     def list_available_activities(self, user_id: str) -> List[Dict]:
         """列出可举办的活动"""
@@ -913,9 +891,7 @@ class TavernLogic:
             raise ValueError(f"资金不足！举办{activity['name']}需要{activity['cost']}元")
         
         # 检查是否已有进行中的活动
-        active_activities = self._load_active_activities()
-        my_active = next((a for a in active_activities if a['host_id'] == user_id), None)
-        if my_active:
+        if self.activities.by_owner(user_id):
             raise ValueError("你已经有一个进行中的活动了！")
         
         # 扣费
@@ -939,8 +915,8 @@ class TavernLogic:
             'bonus_earned': 0
         }
         
-        active_activities.append(active_activity)
-        self._save_active_activities(active_activities)
+        self.activities.add(active_activity)
+        self.activities.save()
         
         # 应用即时效果
         effects = activity['effects']
@@ -968,10 +944,8 @@ class TavernLogic:
         if rem > 0:
             raise RuntimeError(f"cooldown:{rem}")
         
-        active_activities = self._load_active_activities()
-        activity = next((a for a in active_activities if a['id'] == activity_instance_id), None)
-        
-        if not activity:
+        activity = self.activities.get(activity_instance_id)
+        if not activity or self.activities.end_ts(activity_instance_id) <= datetime.now().timestamp():
             raise ValueError("活动不存在或已结束！")
         
         if activity['host_id'] == user_id:
@@ -986,7 +960,7 @@ class TavernLogic:
             raise ValueError("你需要先拥有酒馆才能参加活动！")
         
         activity['participants'].append(user_id)
-        self._save_active_activities(active_activities)
+        self.activities.save()
         
         # 参与者也获得一些加成
         my_tavern.popularity = min(100, my_tavern.popularity + 2)
@@ -1001,36 +975,20 @@ class TavernLogic:
         }
     
     def list_active_activities(self) -> List[Dict]:
-        """列出所有进行中的活动"""
-        activities = self._load_active_activities()
-        now = datetime.now()
-        
-        # 过滤已结束的活动
-        active = []
-        for act in activities:
-            end_time = datetime.fromisoformat(act['end_time'])
-            if now < end_time:
-                act['remaining_hours'] = (end_time - now).total_seconds() / 3600
-                active.append(act)
-        
-        return active
+        """列出所有进行中的活动；已到期的活动不列出，由定时任务 end_expired_activities 结束"""
+        now = datetime.now().timestamp()
+        result = []
+        for act in self.activities:
+            end_ts = self.activities.end_ts(act['id'])
+            if end_ts > now:
+                result.append(dict(act, remaining_hours=(end_ts - now) / 3600))
+        return result
     
     def end_expired_activities(self) -> List[Dict]:
-        """结束过期的活动（系统调用）"""
-        activities = self._load_active_activities()
-        now = datetime.now()
-        
-        ended = []
-        remaining = []
-        
-        for act in activities:
-            end_time = datetime.fromisoformat(act['end_time'])
-            if now >= end_time:
-                ended.append(act)
-            else:
-                remaining.append(act)
-        
-        self._save_active_activities(remaining)
+        """结束过期的活动（系统调用），只处理已到期的活动"""
+        ended = self.activities.pop_expired(datetime.now().timestamp())
+        if ended:
+            self.activities.save()
         return ended
     
     # ========== 高级功能：合作酿酒系统 ==========
@@ -1038,17 +996,49 @@ class TavernLogic:
     def _get_brewing_file(self) -> Path:
         return self.data_path / 'brewing_projects.json'
     
-    def _load_brewing_data(self) -> Dict:
-        """加载酿酒数据"""
-        p = self._get_brewing_file()
+    def _get_brewing_archive_file(self) -> Path:
+        return self.data_path / 'brewing_archive.jsonl'
+    
+    @property
+    def brewing(self) -> ExpiringStore:
+        """进行中的酿酒项目（按 id / 发起人索引，按预计完成时间建堆）"""
+        path = self._get_brewing_file()
+        if self._brewing is None or self._brewing.path != path:
+            self._brewing = ExpiringStore(path, 'estimated_complete', 'initiator_id', section='active',
+                                          migrate=self._migrate_brewing)
+        return self._brewing
+    
+    def _migrate_brewing(self, store: ExpiringStore) -> bool:
+        """旧版把已完成项目存在 completed 列表里，迁移到归档"""
+        completed = store.extra.pop('completed', None)
+        if completed is None:
+            return False
+        for project in completed:
+            self._archive_brewing(project)
+        return True
+    
+    def _archive_brewing(self, project: Dict):
+        """已完成的项目追加写入归档"""
+        with self._get_brewing_archive_file().open('a', encoding='utf-8') as f:
+            f.write(json.dumps(project, ensure_ascii=False) + '\n')
+    
+    def _find_archived_brewing(self, project_id: str) -> Optional[Dict]:
+        p = self._get_brewing_archive_file()
         if not p.exists():
-            return {'active': [], 'completed': []}
-        return json.loads(p.read_text(encoding='utf-8'))
+            return None
+        found = None
+        with p.open(encoding='utf-8') as f:
+            for line in f:
+                if project_id in line:
+                    project = json.loads(line)
+                    if project.get('id') == project_id:
+                        found = project
+        return found
     
-    def _save_brewing_data(self, data: Dict):
-        """保存酿酒数据"""
-        p = self._get_brewing_file()
-        p.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding='utf-8')
+    def _brewing_progress(self, project: Dict, now: float) -> int:
+        created = datetime.fromisoformat(project['created_time']).timestamp()
+        total = self.brewing.end_ts(project['id']) - created
+        return min(100, int((now - created) / total * 100)) if total > 0 else 100
     
     def _get_brewing_recipes(self) -> List[Dict]:
         """酿酒配方"""
@@ -1125,9 +1115,7 @@ class TavernLogic:
             raise ValueError(f"资金不足！酿造{recipe['name']}需要{recipe['cost']}元")
         
         # 检查是否有进行中的酿酒项目
-        brewing_data = self._load_brewing_data()
-        my_brewing = next((b for b in brewing_data['active'] if b['initiator_id'] == user_id), None)
-        if my_brewing:
+        if self.brewing.by_owner(user_id):
             raise ValueError("你已经有一个进行中的酿酒项目了！")
         
         # 扣费
@@ -1157,8 +1145,8 @@ class TavernLogic:
             'max_participants': recipe['max_participants']
         }
         
-        brewing_data['active'].append(project)
-        self._save_brewing_data(brewing_data)
+        self.brewing.add(project)
+        self.brewing.save()
         
         set_cooldown(user_id, 'tavern', 'brewing', 1800)  # 30分钟冷却
         
@@ -1179,9 +1167,7 @@ class TavernLogic:
         if not tavern:
             raise ValueError("你需要有酒馆才能参与酿酒！")
         
-        brewing_data = self._load_brewing_data()
-        project = next((p for p in brewing_data['active'] if p['id'] == project_id), None)
-        
+        project = self.brewing.get(project_id)
         if not project:
             raise ValueError("酿酒项目不存在！")
         
@@ -1216,7 +1202,7 @@ class TavernLogic:
         quality_bonus = contribution // 50
         project['quality'] = min(100, project['quality'] + quality_bonus)
         
-        self._save_brewing_data(brewing_data)
+        self.brewing.save()
         
         set_cooldown(user_id, 'tavern', 'join_brewing', 300)
         
@@ -1230,56 +1216,39 @@ class TavernLogic:
     
     def check_brewing_progress(self, project_id: str) -> Dict:
         """检查酿酒进度"""
-        brewing_data = self._load_brewing_data()
-        project = next((p for p in brewing_data['active'] if p['id'] == project_id), None)
+        project = self.brewing.get(project_id)
         
         if not project:
             # 检查已完成的
-            completed = next((p for p in brewing_data['completed'] if p['id'] == project_id), None)
+            completed = self._find_archived_brewing(project_id)
             if completed:
                 return {"status": "completed", "project": completed}
             raise ValueError("酿酒项目不存在！")
         
-        now = datetime.now()
-        created = datetime.fromisoformat(project['created_time'])
-        estimated = datetime.fromisoformat(project['estimated_complete'])
-        
-        total_hours = (estimated - created).total_seconds() / 3600
-        elapsed_hours = (now - created).total_seconds() / 3600
-        
-        progress = min(100, int(elapsed_hours / total_hours * 100))
-        project['progress'] = progress
-        
-        remaining_hours = max(0, (estimated - now).total_seconds() / 3600)
-        
-        self._save_brewing_data(brewing_data)
+        now = datetime.now().timestamp()
+        progress = self._brewing_progress(project, now)
+        remaining_hours = max(0, (self.brewing.end_ts(project_id) - now) / 3600)
         
         return {
             "status": "brewing",
-            "project": project,
+            "project": dict(project, progress=progress),
             "progress": progress,
             "remaining_hours": round(remaining_hours, 1)
         }
     
     def complete_brewing(self, user_id: str, project_id: str) -> Dict:
         """完成酿酒（领取成品）"""
-        brewing_data = self._load_brewing_data()
-        project_idx = next((i for i, p in enumerate(brewing_data['active']) if p['id'] == project_id), None)
-        
-        if project_idx is None:
+        project = self.brewing.get(project_id)
+        if not project:
             raise ValueError("酿酒项目不存在！")
         
-        project = brewing_data['active'][project_idx]
-        
         if project['initiator_id'] != user_id:
             raise ValueError("只有发起者才能领取成品！")
         
         # 检查是否已完成
         now = datetime.now()
-        estimated = datetime.fromisoformat(project['estimated_complete'])
-        
-        if now < estimated:
-            remaining = (estimated - now).total_seconds() / 3600
+        remaining = (self.brewing.end_ts(project_id) - now.timestamp()) / 3600
+        if remaining > 0:
             raise ValueError(f"酿造还未完成！还需{remaining:.1f}小时")
         
         # 检查参与人数是否足够
@@ -1312,19 +1281,14 @@ class TavernLogic:
                 p_tavern.reputation = min(10, p_tavern.reputation + 0.5)
                 self._save_tavern_data(pid, p_tavern)
         
-        # 移动到完成列表
+        # 移入归档
         project['status'] = 'completed'
         project['completed_time'] = now.isoformat()
         project['final_quality'] = final_quality
         
-        brewing_data['active'].pop(project_idx)
-        brewing_data['completed'].append(project)
-        
-        # 保留最近20条
-        if len(brewing_data['completed']) > 20:
-            brewing_data['completed'] = brewing_data['completed'][-20:]
-        
-        self._save_brewing_data(brewing_data)
+        self.brewing.remove(project_id)
+        self.brewing.save()
+        self._archive_brewing(project)
         
         return {
             "success": True,
@@ -1336,19 +1300,9 @@ class TavernLogic:
     
     def list_brewing_projects(self) -> List[Dict]:
         """列出所有进行中的酿酒项目"""
-        brewing_data = self._load_brewing_data()
-        projects = []
-        
-        now = datetime.now()
-        for p in brewing_data['active']:
-            estimated = datetime.fromisoformat(p['estimated_complete'])
-            created = datetime.fromisoformat(p['created_time'])
-            
-            total_hours = (estimated - created).total_seconds() / 3600
-            elapsed_hours = (now - created).total_seconds() / 3600
-            progress = min(100, int(elapsed_hours / total_hours * 100))
-            
-            projects.append({
+        now = datetime.now().timestamp()
+        return [
+            {
                 'id': p['id'],
                 'name': p['name'],
                 'type': p['type'],
@@ -1356,13 +1310,12 @@ class TavernLogic:
                 'participant_count': len(p['participants']),
                 'max_participants': p['max_participants'],
                 'quality': p['quality'],
-                'progress': progress,
-                'is_complete': now >= estimated
-            })
-        
-        return projects
+                'progress': self._brewing_progress(p, now),
+                'is_complete': now >= self.brewing.end_ts(p['id'])
+            }
+            for p in self.brewing
+        ]
     
     def get_my_brewing(self, user_id: str) -> List[Dict]:
         """获取我参与的酿酒项目"""
-        brewing_data = self._load_brewing_data()
-        return [p for p in brewing_data['active'] if user_id in p['participants']]
\ No newline at end of file
+        return [p for p in self.brewing if user_id in p['participants']]
@@ -68,6 +68,14 @@ class UserDrink(BaseModel):
     created_at: str
     count: int = 1
 
+# 酒馆评分汇总：计数、总分和1-5星分布随评分增量更新，只保留最近若干条评语
+class TavernRatings(BaseModel):
+    count: int = 0
+    total: int = 0
+    histogram: Dict[str, int] = {str(i): 0 for i in range(1, 6)}
+    raters: Dict[str, int] = {}  # 评分者ID -> 其当前评分，用于识别重复评分
+    recent: List[Dict] = []  # 最近评语（环形，超出上限丢弃最旧的）
+
 # 用户酒馆信息
 class TavernData(BaseModel):
     user_id: str
@@ -77,7 +85,7 @@ class TavernData(BaseModel):
     capacity: int = 20  # 容量（每天最多接待人数）
     cleanliness: int = 100  # 清洁度 0-100
     atmosphere: int = 50  # 氛围 0-100
-    reputation: int = 3  # 声誉 1-10
+    reputation: float = 3  # 声誉 1-10（好评每次 +0.1）
     customer_satisfaction: int = 80  # 顾客满意度
     
     # 库存和菜单
@@ -97,6 +105,12 @@ class TavernData(BaseModel):
     
     # 事件
     special_events: List[Dict] = []
+    
+    # 评分
+    ratings: TavernRatings = TavernRatings()
+    
+    # 随时间变化的属性（清洁度）的 TimedStat 记录
+    clock: Dict[str, Dict] = {}
 
 # 用户数据扩展（包含酒馆信息）
 class UserTavernProfile(BaseModel):
@@ -0,0 +1,99 @@
+import heapq
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+
+class ExpiringStore:
+    """
+    带结束时间的记录集合（进行中的活动、酿酒项目）
+
+    记录常驻内存：按 id 建字典、按发起人建索引，结束时间在加载时只解析一次，
+    并放进最小堆。查找 O(1)，过期清理只弹出已到期的记录（O(到期数·log n)）。
+    文件可以是记录列表，也可以是 {section: 记录列表, ...}（其余键原样保留）。
+    migrate(store) 在首次加载后调用一次，用于迁移旧格式，返回 True 时立即保存。
+    """
+
+    def __init__(self, path: Path, end_key: str, owner_key: str, section: Optional[str] = None,
+                 migrate: Optional[Callable[['ExpiringStore'], bool]] = None):
+        self.path = path
+        self.end_key = end_key
+        self.owner_key = owner_key
+        self.section = section
+        self.migrate = migrate
+        self.extra: Dict = {}
+        self._items: Optional[Dict[str, Dict]] = None
+        self._end: Dict[str, float] = {}
+        self._by_owner: Dict[str, str] = {}
+        self._heap: list = []   # (end_ts, id)
+
+    def _ensure_loaded(self) -> Dict[str, Dict]:
+        if self._items is not None:
+            return self._items
+        self._items = {}
+        raw = json.loads(self.path.read_text(encoding='utf-8')) if self.path.exists() else []
+        if self.section:
+            raw = raw if isinstance(raw, dict) else {}
+            self.extra = {k: v for k, v in raw.items() if k != self.section}
+            raw = raw.get(self.section, [])
+        for item in raw:
+            self._index(item)
+        if self.migrate and self.migrate(self):
+            self.save()
+        return self._items
+
+    def _index(self, item: Dict):
+        iid = item['id']
+        end_ts = datetime.fromisoformat(item[self.end_key]).timestamp()
+        self._items[iid] = item
+        self._end[iid] = end_ts
+        self._by_owner[item[self.owner_key]] = iid
+        heapq.heappush(self._heap, (end_ts, iid))
+
+    def save(self):
+        items = list(self._ensure_loaded().values())
+        data = dict(self.extra, **{self.section: items}) if self.section else items
+        self.path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding='utf-8')
+
+    def __iter__(self) -> Iterator[Dict]:
+        return iter(list(self._ensure_loaded().values()))
+
+    def __len__(self) -> int:
+        return len(self._ensure_loaded())
+
+    def get(self, item_id: str) -> Optional[Dict]:
+        return self._ensure_loaded().get(item_id)
+
+    def by_owner(self, owner_id: str) -> Optional[Dict]:
+        self._ensure_loaded()
+        iid = self._by_owner.get(owner_id)
+        return self._items.get(iid) if iid else None
+
+    def end_ts(self, item_id: str) -> float:
+        self._ensure_loaded()
+        return self._end[item_id]
+
+    def add(self, item: Dict):
+        self._ensure_loaded()
+        self._index(item)
+
+    def remove(self, item_id: str) -> Optional[Dict]:
+        """移除记录；堆中的旧条目在 pop_expired 时跳过"""
+        item = self._ensure_loaded().pop(item_id, None)
+        if item is not None:
+            self._end.pop(item_id, None)
+            if self._by_owner.get(item[self.owner_key]) == item_id:
+                del self._by_owner[item[self.owner_key]]
+        return item
+
+    def pop_expired(self, now: float) -> List[Dict]:
+        """移除并返回结束时间不晚于 now 的记录"""
+        self._ensure_loaded()
+        expired = []
+        while self._heap and self._heap[0][0] <= now:
+            end_ts, iid = heapq.heappop(self._heap)
+            if self._end.get(iid) != end_ts:
+                continue
+            expired.append(self.remove(iid))
+        return expired
@@ -4,6 +4,18 @@ from pathlib import Path
 import json
 from .models import WeatherState, Season, WeatherType
 from ..common.data_manager import DataManager
+from ..common.sampler import AliasTable
+
+def _weather_table(weights: dict) -> AliasTable:
+    return AliasTable(list(weights.keys()), list(weights.values()))
+
+# 各季节天气的别名表，模块加载时编译一次
+SEASON_WEATHER = {
+    Season.SPRING: _weather_table({WeatherType.SUNNY: 50, WeatherType.CLOUDY: 30, WeatherType.RAINY: 20, WeatherType.STORM: 0, WeatherType.SNOWY: 0}),
+    Season.SUMMER: _weather_table({WeatherType.SUNNY: 60, WeatherType.CLOUDY: 20, WeatherType.RAINY: 10, WeatherType.STORM: 10, WeatherType.SNOWY: 0}),
+    Season.AUTUMN: _weather_table({WeatherType.SUNNY: 40, WeatherType.CLOUDY: 40, WeatherType.RAINY: 20, WeatherType.STORM: 0, WeatherType.SNOWY: 0}),
+    Season.WINTER: _weather_table({WeatherType.SUNNY: 30, WeatherType.CLOUDY: 30, WeatherType.RAINY: 0, WeatherType.STORM: 10, WeatherType.SNOWY: 30}),
+}
 
 class WeatherLogic:
     def __init__(self, data_manager: DataManager):
@@ -66,16 +78,7 @@ class WeatherLogic:
         return self.state
 
     def _generate_weather(self, season: Season) -> WeatherType:
-        weights = {
-            Season.SPRING: {WeatherType.SUNNY: 50, WeatherType.CLOUDY: 30, WeatherType.RAINY: 20, WeatherType.STORM: 0, WeatherType.SNOWY: 0},
-            Season.SUMMER: {WeatherType.SUNNY: 60, WeatherType.CLOUDY: 20, WeatherType.RAINY: 10, WeatherType.STORM: 10, WeatherType.SNOWY: 0},
-            Season.AUTUMN: {WeatherType.SUNNY: 40, WeatherType.CLOUDY: 40, WeatherType.RAINY: 20, WeatherType.STORM: 0, WeatherType.SNOWY: 0},
-            Season.WINTER: {WeatherType.SUNNY: 30, WeatherType.CLOUDY: 30, WeatherType.RAINY: 0, WeatherType.STORM: 10, WeatherType.SNOWY: 30},
-        }
-        w_map = weights[season]
-        choices = list(w_map.keys())
-        probs = list(w_map.values())
-        return random.choices(choices, weights=probs, k=1)[0]
+        return SEASON_WEATHER[season].draw()
 
     def _generate_temp(self, season: Season, weather: str) -> int:
         base_temps = {
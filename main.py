@@ -1,10 +1,14 @@
 import os
 import json
+import time
+from pathlib import Path
+from astrbot.api import logger
 from astrbot.api.star import Context, Star, register
-from astrbot.api.event import filter, AstrMessageEvent
+from astrbot.api.event import filter, AstrMessageEvent, MessageChain
 from .core.common.data_manager import DataManager
 from .core.common.image_utils import HTMLRenderer
 from .core.common.config_manager import get_config
+from .core.common.scheduler import JobScheduler, IntervalTrigger, CronTrigger
 from .core import stock as stock_module, property as property_module, farm as farm_module, weather as weather_module, \
     pet as pet_module, relationship as relationship_module
 
@@ -43,8 +47,12 @@ class SimsPlugin(Star):
             stock_module.models.StockData(id="S001", name="阿兹科技", price=12.34, volatility=0.6))
         self.stock_market.register_stock(
             stock_module.models.StockData(id="S002", name="绿能股份", price=8.21, volatility=0.4))
+        self.stock_market.load_prices(self.data_manager)
+        self.stock_market.load_companies(self.data_manager)
+        self.stock_market.load_orders(self.data_manager)
+        self.stock_market.load_holders(self.data_manager)
 
-        self.property_market = property_module.logic.PropertyMarket()
+        self.property_market = property_module.logic.PropertyMarket(self.data_manager)
         # 注册示例房产
         self.property_market.register_property(
             property_module.models.Property(id="P001", name="小公寓", price=10000, rent=50))
@@ -68,12 +76,14 @@ class SimsPlugin(Star):
 
         # 警察子系统
         from .core import police as police_module
-        self.police = police_module.logic.PoliceLogic(self.data_manager)
+        self.police = police_module.logic.PoliceLogic(
+            self.data_manager, max_cases=self.config_manager.get("police_case_pool_size", 50))
         self.police_renderer = police_module.render.PoliceRenderer()
 
         # 医生子系统
         from .core import doctor as doctor_module
-        self.doctor = doctor_module.logic.DoctorLogic(self.data_manager)
+        self.doctor = doctor_module.logic.DoctorLogic(
+            self.data_manager, max_patients=self.config_manager.get("doctor_patient_queue_size", 50))
         self.doctor_renderer = doctor_module.render.DoctorRenderer()
 
         # 消防员子系统
@@ -106,6 +116,106 @@ class SimsPlugin(Star):
         self.cinema = cinema_module.logic.CinemaLogic(self.data_manager)
         self.cinema_renderer = cinema_module.render.CinemaRenderer()
 
+        # 世界级周期任务：全部由调度器在后台运行，不占用命令处理路径
+        self.scheduler = JobScheduler(Path(self.data_manager.root) / 'data' / 'scheduler.json')
+        self._register_jobs()
+        self.scheduler.start()
+
+    # ========== 后台任务 ==========
+    def _register_jobs(self):
+        cfg = self.config_manager
+        add = self.scheduler.add_job
+        # 高频任务：错过的触发直接合并为一次
+        add('stock_match', lambda: self.stock_market.match_orders(self.data_manager),
+            IntervalTrigger(cfg.get("stock_match_interval", 5)))
+        add('stock_flush', lambda: self.stock_market.flush(self.data_manager),
+            IntervalTrigger(cfg.get("stock_flush_interval", 60)), jitter=5)
+        add('stock_prices', lambda: self.stock_market.update_prices(self.data_manager),
+            IntervalTrigger(cfg.get("stock_price_interval", 3600)), jitter=60)
+        add('police_cases', self.police.refill_cases, IntervalTrigger(30), jitter=5)
+        add('fishing_bites', self._notify_fishing_bites, IntervalTrigger(1))
+        add('sessions', self._flush_sessions, IntervalTrigger(30))
+        add('doctor_research', self._settle_research, IntervalTrigger(15))
+        add('farm_growth', self.farm.update_farms,
+            IntervalTrigger(cfg.get("farm_update_interval", 600)), jitter=30)
+        add('tavern_activities', self.tavern.end_expired_activities, IntervalTrigger(300), jitter=30)
+        add('chef_market', self.chef.expire_listings, IntervalTrigger(600), jitter=30)
+        add('business_income', self._settle_business_income, IntervalTrigger(3600), jitter=60)
+        # 整点检查，本周期已结算的会自动跳过
+        add('dividends', self._distribute_dividends, CronTrigger(minute=0), jitter=120)
+        add('rent', self._collect_rent, CronTrigger(minute=5), jitter=120)
+        # 天气每个游戏日推进一次，停机期间错过的日子最多补跑 7 天
+        add('weather', self.weather.update_weather,
+            IntervalTrigger(cfg.get("weather_update_interval", 14400)), catch_up=7)
+
+    def _distribute_dividends(self):
+        report = self.stock_market.distribute_dividends(self.data_manager)
+        if report['holders']:
+            logger.info(f"分红派发 {report['period']}: {report['companies']} 家公司, "
+                        f"{report['holders']} 名股东, 共 {report['total']} 金币, 耗时 {report['elapsed']:.2f}s")
+
+    def _collect_rent(self):
+        report = self.property_market.collect_rent()
+        if not report['skipped']:
+            logger.info(f"房租结算 {report['period']}: {report['owners']} 名房东, "
+                        f"共 {report['total']} 金币, 耗时 {report['elapsed']:.2f}s")
+
+    async def _notify_fishing_bites(self):
+        """咬钩计时器：到点的钓鱼会话主动推送提醒，没有到期会话时只查看一次堆顶"""
+        due = self.fishing.bites.next_due()
+        if due is None or due > time.time():
+            return
+        for s in self.fishing.bites.pop_due():
+            if not s.get('origin'):
+                continue
+            chain = MessageChain().at(s['user_id'], s['user_id']).message(" 🎣 鱼儿上钩了！快使用【收杆】！")
+            try:
+                await self.context.send_message(s['origin'], chain)
+            except Exception as e:
+                logger.error(f"咬钩提醒发送失败: {e}")
+
+    def _flush_sessions(self):
+        """短期会话（钓鱼、酒馆事件、当前案件、灭火任务）、厨师团队汇总和酒馆目录定期落盘，没有变更的跳过"""
+        self.fishing.bites.flush()
+        self.tavern.pending_events.flush()
+        self.tavern.directory.flush()
+        self.police.current_cases.flush()
+        self.firefighter.missions.flush()
+        self.chef.teams.flush()
+
+    def _settle_business_income(self):
+        """网吧、电影院的离线收入统一结算，排行榜看到的总是最新收入"""
+        netbars = self.netbar.accrue_all()
+        cinemas = self.cinema.accrue_all()
+        logger.info(f"经营收入结算: {netbars['netbars']} 家网吧 +{netbars['income']}, "
+                    f"{cinemas['cinemas']} 家电影院 +{cinemas['revenue']}, "
+                    f"耗时 {netbars['elapsed'] + cinemas['elapsed']:.2f}s")
+
+    async def _settle_research(self):
+        """到期研究项目批量结算并提醒玩家；没有到期项目时只查看一次堆顶"""
+        due = self.doctor.next_research_due()
+        if due is None or due > time.time():
+            return
+        for r in self.doctor.settle_research():
+            logger.info(f"医学研究完成: {r['user_id']} {r['project_name']} "
+                        f"+{r['exp_gain']}经验 +{r['money_gain']}金币")
+            if not r.get('origin'):
+                continue
+            chain = MessageChain().at(r['user_id'], r['user_id']).message(
+                f" 🔬 研究【{r['project_name']}】已完成！获得 {r['exp_gain']}经验 + {r['money_gain']}金币")
+            try:
+                await self.context.send_message(r['origin'], chain)
+            except Exception as e:
+                logger.error(f"研究完成提醒发送失败: {e}")
+
+    async def terminate(self):
+        """插件卸载时停止调度器并落盘未撮合的委托"""
+        await self.scheduler.stop()
+        self.stock_market.match_orders(self.data_manager)
+        self.stock_market.flush(self.data_manager)
+        self.police.cases.flush()
+        self._flush_sessions()
+
     # ========== 异步辅助方法 ==========
     async def _load_user(self, user_id: str) -> dict:
         """异步加载用户数据，返回默认值如果不存在"""
@@ -326,20 +436,17 @@ class SimsPlugin(Star):
         user_id = event.get_sender_id()
         user = await self._load_user(user_id)
 
-        inventory = user.get('inventory', {})
+        # 厨师的旧 backpack 列表在这里一并展示（只读，不写回）
+        items = self.chef._inventory(user).entries()
 
         msg = f"🎒 我的背包\n"
         msg += f"━━━━━━━━━━━━━━━\n"
 
-        if not inventory:
+        if not items:
             msg += "背包是空的，快去探索获取物品吧！"
         else:
-            for item_name, item_data in inventory.items():
-                if isinstance(item_data, dict):
-                    count = item_data.get('count', 1)
-                    msg += f"• {item_name} x{count}\n"
-                else:
-                    msg += f"• {item_name} x{item_data}\n"
+            for item in items:
+                msg += f"• {item['name']} x{item['amount']}\n"
 
         msg += f"━━━━━━━━━━━━━━━\n"
         msg += f"💰 金币: {user.get('money', 0)}"
@@ -445,6 +552,10 @@ class SimsPlugin(Star):
             yield event.plain_result('数量必须为整数')
             return
         try:
+            if sid in self.stock_market.player_companies:
+                order = self.stock_market.submit_order(self.data_manager, event.get_sender_id(), sid, 'buy', amt)
+                yield event.plain_result(f"市价买单已提交：{sid} x{amt}，委托号 {order.order_id}，将在下一轮撮合成交")
+                return
             res = self.stock_market.buy(self.data_manager, event.get_sender_id(), sid, amt)
             yield event.plain_result(f"购买成功：{sid} x{res['amount']} 平均价 {res['avg_price']:.2f}")
         except Exception as e:
@@ -463,6 +574,10 @@ class SimsPlugin(Star):
             yield event.plain_result('数量必须为整数')
             return
         try:
+            if sid in self.stock_market.player_companies:
+                order = self.stock_market.submit_order(self.data_manager, event.get_sender_id(), sid, 'sell', amt)
+                yield event.plain_result(f"市价卖单已提交：{sid} x{amt}，委托号 {order.order_id}，将在下一轮撮合成交")
+                return
             res = self.stock_market.sell(self.data_manager, event.get_sender_id(), sid, amt)
             yield event.plain_result(f"卖出成功，获得 {res['revenue']:.2f} 金币，剩余持仓 {res['remaining']}")
         except Exception as e:
@@ -477,6 +592,135 @@ class SimsPlugin(Star):
         lines = [f"{k}: {v['amount']} 股 (均价 {v['avg_price']:.2f})" for k, v in holdings.items()]
         yield event.plain_result('\n'.join(lines))
 
+    async def _submit_limit_order(self, event: AstrMessageEvent, side: str):
+        parts = event.text.strip().split()
+        label = '挂单买入' if side == 'buy' else '挂单卖出'
+        if len(parts) < 4:
+            yield event.plain_result(f'用法： {label} <股票ID> <数量> <价格>')
+            return
+        sid = parts[1]
+        try:
+            amt = int(parts[2])
+            price = float(parts[3])
+        except Exception:
+            yield event.plain_result('数量必须为整数，价格必须为数字')
+            return
+        try:
+            order = self.stock_market.submit_order(self.data_manager, event.get_sender_id(), sid, side, amt, price)
+            yield event.plain_result(f"委托已提交：{label} {sid} x{amt} @ {price:.2f}\n委托号 {order.order_id}，将在下一轮撮合处理")
+        except Exception as e:
+            yield event.plain_result(f'委托失败: {e}')
+
+    @filter.command("挂单买入")
+    async def cmd_limit_buy(self, event: AstrMessageEvent):
+        async for res in self._submit_limit_order(event, 'buy'):
+            yield res
+
+    @filter.command("挂单卖出")
+    async def cmd_limit_sell(self, event: AstrMessageEvent):
+        async for res in self._submit_limit_order(event, 'sell'):
+            yield res
+
+    @filter.command("撤单")
+    async def cmd_cancel_order(self, event: AstrMessageEvent):
+        parts = event.text.strip().split()
+        if len(parts) < 2:
+            yield event.plain_result('用法： 撤单 <委托号>')
+            return
+        try:
+            order = self.stock_market.cancel_order(event.get_sender_id(), parts[1], self.data_manager)
+            yield event.plain_result(f"撤单已受理：{order.order_id}，未成交部分将在下一轮撮合时退回")
+        except Exception as e:
+            yield event.plain_result(f'撤单失败: {e}')
+
+    @filter.command("我的委托")
+    async def cmd_my_orders(self, event: AstrMessageEvent):
+        orders = self.stock_market.list_orders(event.get_sender_id())
+        if not orders:
+            yield event.plain_result('你当前没有未成交的委托')
+            return
+        lines = []
+        for o in orders:
+            side = '买' if o.side == 'buy' else '卖'
+            price = f"{o.price:.2f}" if o.price is not None else '市价'
+            lines.append(f"{o.order_id} {side} {o.stock_id} {o.filled}/{o.amount} @ {price} [{o.status}]")
+        yield event.plain_result('\n'.join(lines))
+
+    @filter.command("盘口")
+    async def cmd_order_book(self, event: AstrMessageEvent):
+        parts = event.text.strip().split()
+        if len(parts) < 2:
+            yield event.plain_result('用法： 盘口 <股票ID>')
+            return
+        sid = parts[1]
+        if sid not in self.stock_market.player_companies:
+            yield event.plain_result('只有玩家公司股票有盘口')
+            return
+        depth = self.stock_market.get_depth(sid)
+        lines = [f"📊 {sid} 盘口 (现价 {self.stock_market.player_companies[sid].share_price:.2f})"]
+        for price, amount in reversed(depth['asks']):
+            lines.append(f"卖 {price:.2f} x{amount}")
+        lines.append("──────────")
+        for price, amount in depth['bids']:
+            lines.append(f"买 {price:.2f} x{amount}")
+        yield event.plain_result('\n'.join(lines))
+
+    @filter.command("股东列表")
+    async def cmd_shareholders(self, event: AstrMessageEvent):
+        parts = event.text.strip().split()
+        if len(parts) < 2:
+            yield event.plain_result('用法： 股东列表 <股票ID>')
+            return
+        try:
+            info = self.stock_market.shareholder_summary(parts[1])
+        except Exception as e:
+            yield event.plain_result(f'查询失败: {e}')
+            return
+        lines = [f"👥 {info['name']} ({info['stock_id']}) 股东",
+                 f"现价: {info['price']:.2f}  市值: {info['market_cap']:.2f}",
+                 f"持股总数: {info['float_held']}  股东人数: {info['holder_count']}",
+                 f"前十大股东占比: {info['top_share'] * 100:.1f}%  HHI: {info['hhi']:.3f}"]
+        for i, (uid, amount) in enumerate(info['top_holders'], 1):
+            lines.append(f"{i}. {uid}: {amount} 股")
+        yield event.plain_result('\n'.join(lines))
+
+    @filter.command("重建持仓索引")
+    async def cmd_rebuild_holder_index(self, event: AstrMessageEvent):
+        """管理员从用户数据重建股票持仓索引"""
+        if not self.config_manager.is_admin(event.get_sender_id()):
+            yield event.plain_result("🚫 只有管理员可以使用此命令。")
+            return
+        count = self.stock_market.rebuild_holders(self.data_manager)
+        yield event.plain_result(f"✅ 持仓索引已重建，共 {count} 条持仓记录。")
+
+    @filter.command("派发分红")
+    async def cmd_distribute_dividends(self, event: AstrMessageEvent):
+        """管理员立即派发本周期分红（已派发的公司不会重复派发）"""
+        if not self.config_manager.is_admin(event.get_sender_id()):
+            yield event.plain_result("🚫 只有管理员可以使用此命令。")
+            return
+        report = self.stock_market.distribute_dividends(self.data_manager)
+        yield event.plain_result(
+            f"✅ {report['period']} 分红派发完成\n公司: {report['companies']} 家（资金不足跳过 {report['skipped']} 家）\n"
+            f"股东: {report['holders']} 人\n"
+            f"总额: {report['total']} 金币\n耗时: {report['elapsed']:.2f} 秒")
+
+    @filter.command("任务状态")
+    async def cmd_job_status(self, event: AstrMessageEvent):
+        """管理员查看后台定时任务的运行统计"""
+        if not self.config_manager.is_admin(event.get_sender_id()):
+            yield event.plain_result("🚫 只有管理员可以使用此命令。")
+            return
+        now = time.time()
+        lines = ["⏱️ 定时任务状态:"]
+        for m in self.scheduler.metrics():
+            lines.append(
+                f"{m['name']} ({m['trigger']}) 运行{m['runs']}次 失败{m['failures']}次 错过{m['missed']}次 "
+                f"平均{m['avg_duration'] * 1000:.0f}ms 下次{max(0, m['next_run'] - now):.0f}秒后")
+            if m['last_error']:
+                lines.append(f"  最近错误: {m['last_error']}")
+        yield event.plain_result("\n".join(lines))
+
     @filter.command("房产列表")
     async def property_list(self, event: AstrMessageEvent):
         props = [f"{p.name} ({p.id}) — 价格: {p.price:.2f} 租金: {p.rent:.2f}" for p in
@@ -485,6 +729,41 @@ class SimsPlugin(Star):
             return event.plain_result("当前没有房产信息。")
         return event.plain_result("\n".join(props))
 
+    @filter.command("购买房产")
+    async def cmd_buy_property(self, event: AstrMessageEvent):
+        parts = event.text.strip().split()
+        if len(parts) < 2:
+            yield event.plain_result('用法： 购买房产 <房产ID>')
+            return
+        try:
+            prop = self.property_market.buy_property(event.get_sender_id(), parts[1])
+            yield event.plain_result(f"🏠 购买成功：{prop.name}，花费 {prop.price:.0f} 金币\n每周可获得租金 {prop.rent:.0f} 金币")
+        except Exception as e:
+            yield event.plain_result(f'购买失败: {e}')
+
+    @filter.command("我的房产")
+    async def cmd_my_properties(self, event: AstrMessageEvent):
+        props = self.property_market.get_user_properties(event.get_sender_id())
+        if not props:
+            yield event.plain_result('你还没有房产')
+            return
+        lines = [f"{p.name} ({p.id}) — 租金: {p.rent:.0f}/周" for p in props]
+        lines.append(f"每周租金合计: {sum(p.rent for p in props):.0f} 金币")
+        yield event.plain_result('\n'.join(lines))
+
+    @filter.command("收取房租")
+    async def cmd_collect_rent(self, event: AstrMessageEvent):
+        """管理员立即结算本周房租（每周只结算一次）"""
+        if not self.config_manager.is_admin(event.get_sender_id()):
+            yield event.plain_result("🚫 只有管理员可以使用此命令。")
+            return
+        report = self.property_market.collect_rent()
+        if report['skipped']:
+            yield event.plain_result(f"本周 ({report['period']}) 房租已结算过了。")
+            return
+        yield event.plain_result(
+            f"✅ {report['period']} 房租结算完成\n房东: {report['owners']} 人\n总额: {report['total']:.0f} 金币\n耗时: {report['elapsed']:.2f} 秒")
+
     @filter.command("创建农场")
     async def cmd_create_farm(self, event: AstrMessageEvent):
         user_id = event.get_sender_id()
@@ -580,15 +859,11 @@ class SimsPlugin(Star):
 
     @filter.command("出警")
     async def cmd_accept_case(self, event: AstrMessageEvent):
-        """接取案件"""
-        cases = self.police.list_cases()
-        if not cases:
-            # 自动生成一个案件
-            case = self.police.generate_random_case()
-            cases = [case]
-        c = cases[0]
-        try:
-            accepted = self.police.accept_case(event.get_sender_id(), c['id'])
+        """接取案件：出警 [简单/普通/困难/专家]"""
+        parts = event.text.strip().split()
+        difficulty = parts[1] if len(parts) > 1 else None
+        try:
+            accepted = self.police.take_case(event.get_sender_id(), difficulty)
             yield event.plain_result(
                 f"📋 你已接取案件：\n{accepted['title']}\n难度: {accepted.get('difficulty', '普通')}\n奖励: {accepted.get('reward', 0)}金币\n\n使用 #处理案件 来破案")
         except Exception as e:
@@ -802,15 +1077,8 @@ class SimsPlugin(Star):
     @filter.command("出诊")
     async def cmd_treat(self, event: AstrMessageEvent):
         user_id = event.get_sender_id()
-        patients = self.doctor.list_patients()
-        if not patients:
-            # 自动生成一个患者
-            self.doctor.create_patient()
-            patients = self.doctor.list_patients()
-        if not patients:
-            yield event.plain_result('当前没有病人。')
-            return
-        p = patients[0]
+        # 病情最重的患者优先，没有候诊患者时自动接收一位
+        p = self.doctor.next_patient()
         try:
             res = self.doctor.treat_patient(user_id, p['id'])
             yield event.plain_result(
@@ -826,14 +1094,8 @@ class SimsPlugin(Star):
     @filter.command("诊断患者")
     async def cmd_diagnose_patient(self, event: AstrMessageEvent):
         """诊断患者"""
-        patients = self.doctor.list_patients()
-        if not patients:
-            self.doctor.create_patient()
-            patients = self.doctor.list_patients()
-        if not patients:
-            yield event.plain_result('当前没有病人。')
-            return
-        p = patients[0]
+        # 病情最重的患者优先，没有候诊患者时自动接收一位
+        p = self.doctor.next_patient()
         try:
             res = self.doctor.diagnose_patient(event.get_sender_id(), p['id'])
             patient = res['patient']
@@ -876,11 +1138,10 @@ class SimsPlugin(Star):
             yield event.plain_result("药品ID必须是数字")
             return
 
-        patients = self.doctor.list_patients()
-        if not patients:
+        p = self.doctor.patients.peek()
+        if not p:
             yield event.plain_result('当前没有病人。')
             return
-        p = patients[0]
 
         try:
             res = self.doctor.prescribe_medicine(event.get_sender_id(), p['id'], medicine_id)
@@ -920,11 +1181,10 @@ class SimsPlugin(Star):
             yield event.plain_result("手术ID必须是数字")
             return
 
-        patients = self.doctor.list_patients()
-        if not patients:
+        p = self.doctor.patients.peek()
+        if not p:
             yield event.plain_result('当前没有需要手术的病人。')
             return
-        p = patients[0]
 
         try:
             res = self.doctor.perform_surgery(event.get_sender_id(), p['id'], surgery_id)
@@ -977,10 +1237,11 @@ class SimsPlugin(Star):
             return
         project_name = parts[1]
         try:
-            res = self.doctor.start_research(event.get_sender_id(), project_name)
+            res = self.doctor.start_research(event.get_sender_id(), project_name, event.unified_msg_origin)
             project = res['project']
+            minutes = int((project['finish_at'] - project['started_ts']) // 60)
             yield event.plain_result(
-                f"🔬 研究开始!\n项目: {project['name']}\n进度: {project['progress']}%\n完成奖励: {project['exp_reward']}经验 + {project['money_reward']}金币")
+                f"🔬 研究开始!\n项目: {project['name']}\n预计用时: {minutes}分钟，研究会自动推进\n完成奖励: {project['exp_reward']}经验 + {project['money_reward']}金币")
         except Exception as e:
             if str(e).startswith('cooldown:'):
                 yield event.plain_result('操作太快，请稍后再试。')
@@ -989,14 +1250,16 @@ class SimsPlugin(Star):
 
     @filter.command("推进研究")
     async def cmd_advance_research(self, event: AstrMessageEvent):
-        """推进研究进度"""
+        """查看研究进度（研究随时间自动推进）"""
         try:
             res = self.doctor.advance_research(event.get_sender_id())
             lines = [
                 f"🔬 研究进展",
                 f"项目: {res['project_name']}",
-                f"进度: {res['progress']}% (+{res['progress_gain']}%)"
+                f"进度: {res['progress']}%"
             ]
+            if not res['completed']:
+                lines.append(f"剩余时间: {res['remaining'] // 60}分{res['remaining'] % 60}秒")
             if res['completed']:
                 lines.append(f"\n🎉 研究完成!")
                 lines.append(f"获得经验: +{res['exp_gain']}")
@@ -1655,8 +1918,8 @@ class SimsPlugin(Star):
         """开始钓鱼"""
         user_id = event.get_sender_id()
         try:
-            result = self.fishing.start_fishing(user_id)
-            yield event.plain_result(result['message'])
+            result = self.fishing.start_fishing(user_id, event.unified_msg_origin)
+            yield event.plain_result(result['message'] + "\n鱼儿上钩时会提醒你～")
         except Exception as e:
             if str(e).startswith('cooldown:'):
                 yield event.plain_result('钓鱼太频繁啦，请稍后再试～')
@@ -2251,6 +2514,8 @@ class SimsPlugin(Star):
         try:
             res = self.chef.learn_recipe(event.get_sender_id(), recipe_id)
             msg = self.chef_renderer.render_learn_recipe(res['recipe'], res['cost'])
+            if res['achievements']:
+                msg += "\n🏆 解锁成就: " + "、".join(a['name'] for a in res['achievements'])
             yield event.plain_result(msg)
         except Exception as e:
             yield event.plain_result(f"学习失败: {e}")
@@ -2266,6 +2531,8 @@ class SimsPlugin(Star):
             res = self.chef.cook_dish(event.get_sender_id(), recipe_id)
             msg = self.chef_renderer.render_cook_result(res['success'], res['recipe'], res['chef_level'],
                                                         res['chef_exp'])
+            if res['achievements']:
+                msg += "\n🏆 解锁成就: " + "、".join(a['name'] for a in res['achievements'])
             yield event.plain_result(msg)
         except RuntimeError as e:
             if "cooldown" in str(e):
@@ -2283,10 +2550,7 @@ class SimsPlugin(Star):
                 yield event.plain_result("你还不是厨师！发送 #成为厨师 开始。")
                 return
             user = self.data_manager.load_user(event.get_sender_id()) or {}
-            user_inv = {}
-            for item in user.get('backpack', []):
-                if item.get('type') == 'ingredient':
-                    user_inv[item['id']] = item.get('amount', 1)
+            user_inv = {e['id']: e['amount'] for e in self.chef._inventory(user).entries('ingredient')}
             msg = self.chef_renderer.render_ingredients(self.chef.ingredients, user_inv)
             yield event.plain_result(msg)
         except Exception as e:
@@ -2315,7 +2579,7 @@ class SimsPlugin(Star):
                 yield event.plain_result("你还不是厨师！发送 #成为厨师 开始。")
                 return
             user = self.data_manager.load_user(event.get_sender_id()) or {}
-            owned = [item['id'] for item in user.get('backpack', []) if item.get('type') == 'kitchenware']
+            owned = [e['id'] for e in self.chef._inventory(user).entries('kitchenware')]
             msg = self.chef_renderer.render_kitchenware(self.chef.kitchenware, chef_data['level'], owned)
             yield event.plain_result(msg)
         except Exception as e:
@@ -2611,20 +2875,28 @@ class SimsPlugin(Star):
 
     @filter.command("食材市场")
     async def cmd_ingredient_market(self, event: AstrMessageEvent):
-        """查看食材市场"""
-        try:
-            listings = self.chef.get_market_listings()
+        """查看食材市场：#食材市场 [食材ID] [页码]"""
+        parts = event.text.strip().split()[1:]
+        page = 1
+        if parts and parts[-1].isdigit():
+            page = int(parts.pop())
+        ingredient_id = parts[0] if parts else None
+        try:
+            res = self.chef.browse_market(page, ingredient_id)
+            listings = res['items']
             if not listings:
                 yield event.plain_result("食材市场暂无挂单。\n使用 #上架食材 来出售你的食材！")
                 return
 
-            text = "🏪【食材市场】\n\n"
-            for l in listings[:15]:  # 最多显示15条
+            text = f"🏪【食材市场】第{res['page']}/{res['pages']}页（共{res['total']}单）\n\n"
+            for l in listings:
                 text += f"📦 {l['ingredient_name']} x{l['quantity']}\n"
                 text += f"   单价: {l['price_per_unit']}💰 | 总价: {l['total_price']}💰\n"
                 text += f"   挂单ID: {l['id']}\n\n"
 
-            text += "使用 #购买市场食材 <挂单ID> 来购买！"
+            if res['page'] < res['pages']:
+                text += f"翻页：#食材市场 {ingredient_id + ' ' if ingredient_id else ''}{res['page'] + 1}\n"
+            text += "使用 #购买市场食材 <挂单ID> 或 #购买市场食材 <食材ID> <数量> 来购买！"
             yield event.plain_result(text)
         except Exception as e:
             yield event.plain_result(f"获取市场信息失败: {e}")
@@ -2634,11 +2906,20 @@ class SimsPlugin(Star):
         """从食材市场购买"""
         parts = event.text.strip().split()
         if len(parts) < 2:
-            yield event.plain_result('用法：#购买市场食材 <挂单ID>')
+            yield event.plain_result('用法：#购买市场食材 <挂单ID> 或 #购买市场食材 <食材ID> <数量>')
             return
-        listing_id = parts[1]
         try:
-            res = self.chef.buy_from_market(event.get_sender_id(), listing_id)
+            if len(parts) >= 3:
+                if not parts[2].isdigit():
+                    yield event.plain_result("数量必须是整数！")
+                    return
+                # 按单价从低到高撮合
+                res = self.chef.buy_cheapest(event.get_sender_id(), parts[1], int(parts[2]))
+                yield event.plain_result(
+                    f"✅ 购买成功！\n获得: {res['ingredient_name']} x{res['quantity']}\n"
+                    f"花费: {res['cost']}💰（成交{len(res['fills'])}单）")
+                return
+            res = self.chef.buy_from_market(event.get_sender_id(), parts[1])
             purchased = res['purchased']
             yield event.plain_result(
                 f"✅ 购买成功！\n获得: {purchased['ingredient_name']} x{purchased['quantity']}\n花费: {res['cost']}💰")
@@ -3093,10 +3374,14 @@ class SimsPlugin(Star):
     async def cmd_visit_tavern(self, event: AstrMessageEvent):
         """参观其他玩家的酒馆"""
         parts = event.text.strip().split()
-        if len(parts) < 2:
-            yield event.plain_result('用法：#参观酒馆 <玩家ID>')
-            return
-        owner_id = parts[1]
+        if len(parts) >= 2:
+            owner_id = parts[1]
+        else:
+            # 不指定玩家时随机参观一家
+            owner_id = self.tavern.random_tavern_owner(exclude=event.get_sender_id())
+            if not owner_id:
+                yield event.plain_result('暂时没有其他酒馆可以参观。用法：#参观酒馆 [玩家ID]')
+                return
         try:
             res = self.tavern.visit_tavern(event.get_sender_id(), owner_id)
             target = res['target_tavern']
@@ -3133,7 +3418,8 @@ class SimsPlugin(Star):
         comment = " ".join(parts[3:]) if len(parts) > 3 else ""
         try:
             res = self.tavern.rate_tavern(event.get_sender_id(), owner_id, rating, comment)
-            yield event.plain_result(f"✅ 评分成功！\n当前平均分: {res['new_average']}⭐ (共{res['total_ratings']}条评价)")
+            action = "已更新你的评分" if res['updated'] else "评分成功"
+            yield event.plain_result(f"✅ {action}！\n当前平均分: {res['new_average']}⭐ (共{res['total_ratings']}条评价)")
         except RuntimeError as e:
             if "cooldown" in str(e):
                 yield event.plain_result("评分冷却中，请稍后再试。")
@@ -3148,7 +3434,11 @@ class SimsPlugin(Star):
         try:
             res = self.tavern.get_tavern_ratings(event.get_sender_id())
             text = f"⭐【{res['tavern_name']} 的评分】\n\n"
-            text += f"平均评分: {res['average']}⭐ (共{res['total_ratings']}条)\n\n"
+            text += f"平均评分: {res['average']}⭐ (共{res['total_ratings']}条)\n"
+            if res['total_ratings']:
+                text += " ".join(f"{star}星:{n}" for star, n in sorted(res['distribution'].items(), reverse=True))
+                text += "\n"
+            text += "\n"
 
             if res['recent_ratings']:
                 text += "最近评价:\n"
@@ -3338,18 +3628,28 @@ class SimsPlugin(Star):
     # ==================== P2P 交易市场 ====================
     @filter.command("发布收购")
     async def cmd_post_buy_order(self, event: AstrMessageEvent):
-        """发布收购需求 (简化版: 只是喊话功能，配合转账使用)"""
-        # True implementation requires complex Order Book.
-        # For valid MVP: Just a broadcasting tool + 'transfer' command.
+        """发布收购需求：玩家公司股票直接挂限价买单，其他物品为喊话公告，配合转账使用"""
         parts = event.text.strip().split()
         if len(parts) < 3:
-            yield event.plain_result("用法: 发布收购 <物品名> <单价>")
+            yield event.plain_result("用法: 发布收购 <物品名/股票ID> <单价> [数量]")
             return
 
         item = parts[1]
         price = parts[2]
         user_name = event.get_sender_name()
 
+        if item in self.stock_market.player_companies:
+            try:
+                amount = int(parts[3]) if len(parts) > 3 else 1
+                order = self.stock_market.submit_order(
+                    self.data_manager, event.get_sender_id(), item, 'buy', amount, float(price))
+            except Exception as e:
+                yield event.plain_result(f"收购委托失败: {e}")
+                return
+            yield event.plain_result(
+                f"📢【收购公告】\n老板: {user_name}\n收购股票: {item} x{amount}\n出价: {price}金币/股\n委托号: {order.order_id}")
+            return
+
         msg = f"📢【收购公告】\n"
         msg += f"老板: {user_name}\n"
         msg += f"需求: {item}\n"
@@ -3778,6 +4078,31 @@ class SimsPlugin(Star):
             else:
                 yield event.plain_result(f'❌ 排片失败: {e}')
 
+    @filter.command("自动排片")
+    async def cmd_auto_schedule_movie(self, event: AstrMessageEvent):
+        """自动排片"""
+        parts = event.text.strip().split()
+        if len(parts) < 2:
+            yield event.plain_result("用法: 自动排片 <电影名> [开始时间] [结束时间]\n示例: 自动排片 星际穿越 10:00 23:00")
+            return
+        movie_title = parts[1]
+        open_time = parts[2] if len(parts) > 2 else "09:00"
+        close_time = parts[3] if len(parts) > 3 else "23:59"
+        try:
+            result = self.cinema.auto_schedule(event.get_sender_id(), movie_title, open_time, close_time)
+            msg = f"✅ 自动排片完成，共 {result['total']} 场！\n"
+            msg += f"━━━━━━━━━━━━━━\n"
+            msg += f"🎬 电影: 《{result['movie_title']}》（{result['duration']}分钟）\n"
+            for name, times in result['theaters'].items():
+                msg += f"🎭 {name}: {' '.join(times)}\n"
+            msg += f"💵 票价: {result['price']}元"
+            yield event.plain_result(msg)
+        except Exception as e:
+            if str(e).startswith('cooldown:'):
+                yield event.plain_result('操作太快，请稍后再试。')
+            else:
+                yield event.plain_result(f'❌ 排片失败: {e}')
+
     @filter.command("购买电影院设施")
     async def cmd_buy_cinema_facility(self, event: AstrMessageEvent):
         """购买电影院设施"""
@@ -4043,13 +4368,13 @@ class SimsPlugin(Star):
     async def cmd_feed_pet(self, event: AstrMessageEvent):
         parts = event.text.strip().split()
         if len(parts) < 2:
-            yield event.plain_result("用法: 喂养宠物 <宠物ID>")
+            yield event.plain_result("用法: 喂养宠物 <宠物ID>（可只输入ID开头至少4位）")
             return
         pet = self.pet.feed_pet(parts[1])
         if pet:
             yield event.plain_result(f"🍖 喂养成功！{pet.name} 看起来很开心。\n饱食度: {pet.hunger} | 心情: {pet.mood}")
         else:
-            yield event.plain_result("未找到该宠物。")
+            yield event.plain_result("未找到该宠物。短ID至少4位，且只能对应一只宠物，匹配到多只时请多输入几位。")
 
     # ==================== 关系系统 ====================
     @filter.command("赠送礼物")
@@ -464,9 +464,7 @@ class TestChefMarket:
         
         # 检查食材返还
         user = data_manager.load_user(sample_user_id)
-        egg_item = next((b for b in user['backpack'] if b['id'] == 'egg'), None)
-        assert egg_item is not None
-        assert egg_item['amount'] == 20  # 原来的10 + 返还的10
+        assert setup_chef._inventory(user).count('ingredient', 'egg') == 20  # 原来的10 + 返还的10
     
     def test_buy_from_market(self, setup_chef, data_manager, sample_user_id):
         """测试从市场购买"""
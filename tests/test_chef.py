@@ -16,3 +16,137 @@ def test_cook(tmp_path):
     assert res['reward'] == 20
     u = dm.load_user(user)
     assert u['money'] >= 20
+
+
+def test_market_cheapest_first_and_expiry(tmp_path):
+    from datetime import datetime, timedelta
+    from core.common.cooldown import set_cooldown
+
+    dm = DataManager(base_path=tmp_path)
+    cl = ChefLogic(data_manager=dm)
+    for seller, price in [('mk_seller_a', 8), ('mk_seller_b', 5)]:
+        cl.become_chef(seller)
+        dm.save_user(seller, {'money': 0, 'backpack': [
+            {'id': 'tomato', 'name': '番茄', 'type': 'ingredient', 'amount': 5}]})
+        set_cooldown(seller, 'chef', 'market', 0)
+        cl.list_ingredient_for_sale(seller, 'tomato', 3, price)
+
+    res = cl.browse_market(1, 'tomato', per_page=1)
+    assert res['pages'] == 2 and res['items'][0]['seller_id'] == 'mk_seller_b'
+
+    dm.save_user('mk_buyer', {'money': 100, 'backpack': []})
+    set_cooldown('mk_buyer', 'chef', 'buy_market', 0)
+    bought = cl.buy_cheapest('mk_buyer', 'tomato', 4)
+    assert bought['cost'] == 3 * 5 + 8
+    assert cl._inventory(dm.load_user('mk_buyer')).count('ingredient', 'tomato') == 4
+    assert dm.load_user('mk_seller_a')['money'] == 8
+    assert cl.get_my_listings('mk_seller_a')[0]['quantity'] == 2
+    assert cl.get_my_listings('mk_seller_b') == []
+
+    # 以更晚的有效期重新上架后，旧的堆条目不会提前下架它
+    listing = cl.get_my_listings('mk_seller_a')[0]
+    cl.market.remove(listing['id'])
+    cl.market.add(dict(listing, expires_time=(datetime.now() + timedelta(days=30)).isoformat()))
+    assert cl.market.pop_expired((datetime.now() + timedelta(days=10)).timestamp()) == []
+    assert cl.market.get(listing['id'])
+
+    # 到期的挂单退回卖家背包
+    cl.market.remove(listing['id'])
+    cl.market.add(dict(listing, expires_time=(datetime.now() - timedelta(seconds=1)).isoformat()))
+    assert cl.expire_listings() == {'expired': 1, 'sellers': 1}
+    assert cl.get_market_listings() == []
+    assert cl._inventory(dm.load_user('mk_seller_a')).count('ingredient', 'tomato') == 4
+
+
+def test_achievement_events_unlock_incrementally(tmp_path):
+    import json
+
+    dm = DataManager(base_path=tmp_path)
+    cl = ChefLogic(data_manager=dm)
+    user = 'ach_chef'
+    cl.become_chef(user)
+    dm.save_user(user, {'money': 0})
+
+    chef = cl._load_chef_data(user)
+    chef['success_count'] = 1
+    unlocked, user_ach = cl._emit(user, 'dish_cooked', chef, dm.load_user(user))
+    assert [a['id'] for a in unlocked] == ['first_dish']
+    assert chef['exp'] == 50 and chef['reputation'] == 55
+    # 成就记录由调用方在存档之后写入，_emit 本身不落盘
+    assert not cl._get_user_achievements_file(user).exists()
+    cl._commit_achievements(user, user_ach)
+    # 同一事件再次上报不会重复解锁
+    assert cl._emit(user, 'dish_cooked', chef, {}) == ([], None)
+
+    # 累加计数器：第五次合作料理解锁合作达人，金币奖励一次写入
+    for _ in range(4):
+        assert cl.record_coop_complete(user) == []
+    chef['reputation'] = 90
+    cl._save_chef_data(user, chef)
+    assert [a['id'] for a in cl.record_coop_complete(user)] == ['coop_master', 'reputation_100']
+    assert dm.load_user(user)['money'] == 500
+    ach = json.loads(cl._get_user_achievements_file(user).read_text(encoding='utf-8'))
+    assert ach['progress']['coop_count'] == 5
+    assert cl._load_chef_data(user)['reputation'] == 90 + 15
+
+
+def test_achievement_exp_reward_levels_up_and_is_saved_last(tmp_path, monkeypatch):
+    import pytest
+
+    dm = DataManager(base_path=tmp_path)
+    cl = ChefLogic(data_manager=dm)
+    user = 'ach_level_chef'
+    cl.become_chef(user)
+    dm.save_user(user, {'money': 0})
+    chef = cl._load_chef_data(user)
+    # 第一道料理的 50 经验奖励让 4 级厨师升到 5 级，连带解锁等级成就
+    chef.update(level=4, exp=380, success_count=1)
+    unlocked, _ = cl._emit(user, 'dish_cooked', chef, dm.load_user(user))
+    assert [a['id'] for a in unlocked] == ['first_dish', 'level_5']
+    assert chef['level'] == 5
+
+    # 奖励存档失败时成就不会被标记，之后还能重新获得
+    def fail(*args):
+        raise OSError('disk full')
+    monkeypatch.setattr(cl, '_save_chef_data', fail)
+    with pytest.raises(OSError):
+        cl.record_contest_win(user)
+    assert not cl._get_user_achievements_file(user).exists()
+    monkeypatch.undo()
+    assert [a['id'] for a in cl.record_contest_win(user)] == ['contest_winner']
+
+
+def test_team_aggregates_follow_member_updates(tmp_path):
+    import json
+
+    dm = DataManager(base_path=tmp_path)
+    cl = ChefLogic(data_manager=dm)
+    # 老存档：团队没有汇总字段
+    for uid, level, rep in [('tm_a', 3, 60), ('tm_b', 2, 40), ('tm_c', 5, 100)]:
+        cl._save_chef_data(uid, {'level': level, 'exp': 0, 'recipes': [], 'success_count': 0,
+                                 'total_count': 0, 'reputation': rep})
+    legacy = [{'id': 't1', 'name': '甲队', 'leader_id': 'tm_a', 'members': ['tm_a', 'tm_b'],
+               'level': 1, 'exp': 0, 'funds': 0, 'created_time': '2024-01-01T00:00:00'}]
+    cl._get_team_file().write_text(json.dumps(legacy, ensure_ascii=False), encoding='utf-8')
+    cl._teams = None
+
+    assert cl.get_team_ranking()[0]['power'] == 100 + 5 * 10 + 100
+    assert cl.get_user_team('tm_b')['id'] == 't1'
+
+    cl.teams.add_member('t1', 'tm_c', cl._load_chef_data('tm_c'))
+    cl.teams.save()
+    before = cl._get_team_file().read_text(encoding='utf-8')
+    chef = cl._load_chef_data('tm_b')
+    chef['reputation'] += 10
+    cl._save_chef_data('tm_b', chef)
+    # 成员声望变化只标记脏数据，定时 flush 才写团队表
+    assert cl._get_team_file().read_text(encoding='utf-8') == before
+    cl.teams.flush()
+
+    # 排行只读汇总：成员存档删掉也不影响
+    for uid in ('tm_a', 'tm_b', 'tm_c'):
+        cl._get_chef_file(uid).unlink()
+    cl._teams = None
+    top = cl.get_team_ranking()[0]
+    assert top['total_reputation'] == 60 + 50 + 100
+    assert top['power'] == 100 + 10 * 10 + 210
@@ -183,7 +183,7 @@ def test_buy_kitchenware(chef_logic, data_manager):
     
     # Check backpack updated
     updated_user = data_manager.load_user(user_id)
-    assert any(b['id'] == 'knife_01' and b['type'] == 'kitchenware' for b in updated_user['backpack'])
+    assert chef_logic._inventory(updated_user).has('kitchenware', 'knife_01')
 
 
 def test_buy_kitchenware_duplicate(chef_logic, data_manager):
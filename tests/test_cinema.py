@@ -27,3 +27,166 @@ def test_create_theater(tmp_path):
     assert t['name'] == '宏伟电影院'
     u = dm.load_user(user)
     assert u['money'] == 1000
+
+
+def test_batch_settlement_and_cached_owner_names(tmp_path):
+    from datetime import datetime, timedelta
+    from core.cinema.models import CinemaInfo, Theater, Movie
+
+    dm = DataManager(base_path=tmp_path)
+    cl = CinemaLogic(data_manager=dm)
+    dm.save_user('boss', {'name': '老板', 'money': 0})
+    now = datetime(2026, 3, 2, 12, 0)
+    cinema = CinemaInfo(id='C1', owner_id='boss', last_update=(now - timedelta(hours=5, minutes=30)).isoformat())
+    cinema.theaters.append(Theater(id='T1', type='small', name='1号厅', schedule=[
+        {'movie_id': 'M1', 'movie_title': '英雄', 'time': '08:00', 'duration': 120, 'price': 50},
+    ]))
+    cinema.movies.append(Movie(id='M1', title='英雄', genre='action'))
+    cl._save_cinemas({'boss': cinema.dict()})
+
+    report = cl.accrue_all(now)
+    assert report['cinemas'] == 1 and report['revenue'] > 0
+    settled = cl._get_user_cinema('boss')
+    assert datetime.fromisoformat(settled.last_update) == now
+    assert settled.movies[0].viewers > 0
+
+    (tmp_path / 'users' / 'boss.json').unlink()
+    ranking = cl.get_cinema_ranking()
+    assert ranking[0].owner_name == '老板' and ranking[0].total_revenue == report['revenue']
+
+
+def test_display_names_write_cache_once(tmp_path, monkeypatch):
+    dm = DataManager(base_path=tmp_path)
+    for i in range(5):
+        (tmp_path / 'users' / f'u{i}.json').write_text(
+            __import__('json').dumps({'name': f'玩家{i}'} if i else {}), encoding='utf-8')
+    writes = []
+    monkeypatch.setattr(dm, '_save_names', lambda: writes.append(dict(dm._names)))
+    names = dm.display_names([f'u{i}' for i in range(5)])
+    assert names['u1'] == '玩家1' and names['u0'] == '用户u0'
+    # one write for all misses; the nameless user is cached as a negative entry
+    assert len(writes) == 1 and writes[0]['u0'] == ''
+    loads = []
+    real_load = dm.load_user
+    monkeypatch.setattr(dm, 'load_user', lambda uid: loads.append(uid) or real_load(uid))
+    assert dm.display_names(['u0', 'u1', 'u2'])['u0'] == '用户u0'
+    assert len(writes) == 1 and loads == []
+    # a name saved later replaces the negative entry
+    dm.save_user('u0', {'name': '新玩家'})
+    assert dm.display_names(['u0'])['u0'] == '新玩家'
+
+
+def test_revenue_follows_showtimes(tmp_path):
+    from datetime import datetime, timedelta
+    from core.cinema.models import CinemaInfo, Theater, Movie
+
+    dm = DataManager(base_path=tmp_path)
+    cl = CinemaLogic(data_manager=dm)
+    start = datetime(2026, 3, 1, 10, 0)
+    cinema = CinemaInfo(id='C3', owner_id='showman', last_update=start.isoformat(),
+                        maintenance_cost=720, reputation=50)
+    cinema.theaters.append(Theater(id='T1', type='small', name='1号厅', capacity=100, schedule=[
+        {'movie_id': 'M1', 'movie_title': '英雄', 'time': '14:00', 'duration': 120, 'price': 40},
+        {'movie_id': 'M1', 'movie_title': '英雄', 'time': '20:00', 'duration': 120, 'price': 40},
+    ]))
+    cinema.theaters.append(Theater(id='T2', type='small', name='空厅'))
+    cinema.movies.append(Movie(id='M1', title='英雄', genre='action', popularity=100))
+
+    # 100 座 × 上座率 0.6 × 40 元 = 每场 2400 元
+    # 开场前只有维护费，累计收入不会被扣成负数
+    cl._update_cinema_revenue(cinema, start + timedelta(hours=3))
+    assert cinema.total_revenue == 0 and cinema.movies[0].viewers == 0
+    cl._update_cinema_revenue(cinema, start + timedelta(hours=10))
+    assert cinema.total_revenue == 2 * 2400 - 7
+    assert cinema.daily_revenue == 4800
+
+    # 离线三天：按场次次数结算，而不是按小时
+    cl._update_cinema_revenue(cinema, start + timedelta(days=3, hours=10))
+    assert cinema.total_revenue == 4 * 2400 * 2 - 79
+    assert cinema.movies[0].viewers == 8 * 60
+
+
+def test_frequent_settlements_keep_fractional_viewers(tmp_path):
+    from datetime import datetime, timedelta
+    from core.cinema.models import CinemaInfo, Theater, Movie
+
+    cl = CinemaLogic(data_manager=DataManager(base_path=tmp_path))
+    start = datetime(2026, 3, 1, 0, 0)
+    cinema = CinemaInfo(id='C5', owner_id='frac', last_update=start.isoformat())
+    # 101 座 × 0.42 上座率 = 每场 42.42 人
+    cinema.theaters.append(Theater(id='T1', type='small', name='1号厅', capacity=101, schedule=[
+        {'movie_id': 'M1', 'movie_title': '短片', 'time': '12:00', 'duration': 60, 'price': 10},
+    ]))
+    cinema.movies.append(Movie(id='M1', title='短片', genre='drama', popularity=70))
+    for day in range(1, 11):
+        cl._update_cinema_revenue(cinema, start + timedelta(days=day))
+    assert cinema.movies[0].viewers == 424
+    assert cinema.movies[0].revenue == 4242
+
+
+def test_schedule_conflicts_across_hours_and_auto_schedule(tmp_path):
+    import pytest
+    from core.cinema.models import CinemaInfo, Theater, Movie
+    from core.common.cooldown import set_cooldown
+
+    dm = DataManager(base_path=tmp_path)
+    cl = CinemaLogic(data_manager=dm)
+    user = 'schedule_owner'
+    cinema = CinemaInfo(id='C2', owner_id=user)
+    cinema.theaters.append(Theater(id='T1', type='small', name='1号厅'))
+    cinema.theaters.append(Theater(id='T2', type='small', name='2号厅'))
+    cinema.movies.append(Movie(id='M1', title='长片', genre='drama', duration=150))
+    cl._save_cinemas({user: cinema.dict()})
+    set_cooldown(user, 'cinema', 'schedule', 0)
+
+    cl.schedule_movie(user, '1号厅', '长片', '13:50')
+    set_cooldown(user, 'cinema', 'schedule', 0)
+    # 13:50 + 150 分钟到 16:20 才结束，16:00 开场仍然冲突
+    with pytest.raises(ValueError, match='16:20'):
+        cl.schedule_movie(user, '1号厅', '长片', '16:00')
+    # 跨午夜的场次和凌晨场次冲突
+    cl.schedule_movie(user, '2号厅', '长片', '0:30')
+    set_cooldown(user, 'cinema', 'schedule', 0)
+    with pytest.raises(ValueError):
+        cl.schedule_movie(user, '2号厅', '长片', '23:00')
+
+    set_cooldown(user, 'cinema', 'schedule', 0)
+    result = cl.auto_schedule(user, '长片', '09:00', '20:00', gap=15)
+    assert result['theaters']['1号厅'] == ['09:00', '16:35', '19:20']
+    assert result['theaters']['2号厅'] == ['09:00', '11:45', '14:30', '17:15', '20:00']
+    times = [s['time'] for s in cl._get_user_cinema(user).theaters[1].schedule]
+    assert times == ['00:30', '09:00', '11:45', '14:30', '17:15', '20:00']
+
+
+def test_schedule_index_cached_and_legacy_overlaps_normalised(tmp_path):
+    from core.cinema.models import CinemaInfo, Theater, Movie
+    from core.common.cooldown import set_cooldown
+    from core.cinema.schedule import parse_time
+
+    dm = DataManager(base_path=tmp_path)
+    cl = CinemaLogic(data_manager=dm)
+    user = 'legacy_owner'
+    cinema = CinemaInfo(id='C4', owner_id=user)
+    # 旧版只检查开场时间，允许这三场互相重叠
+    cinema.theaters.append(Theater(id='T1', type='small', name='1号厅', schedule=[
+        {'movie_id': 'M1', 'movie_title': '长片', 'time': '10:00', 'duration': 150, 'price': 50},
+        {'movie_id': 'M1', 'movie_title': '长片', 'time': '11:00', 'duration': 150, 'price': 50},
+        {'movie_id': 'M1', 'movie_title': '长片', 'time': '12:00', 'duration': 150, 'price': 50},
+    ]))
+    cinema.movies.append(Movie(id='M1', title='长片', genre='drama', duration=150))
+    cl._save_cinemas({user: cinema.dict()})
+
+    loaded = cl._get_user_cinema(user)
+    assert [s['time'] for s in loaded.theaters[0].schedule] == ['10:00']
+    set_cooldown(user, 'cinema', 'schedule', 0)
+    cl.schedule_movie(user, '1号厅', '长片', '12:30')
+    index = cl._schedules[('C4', 'T1')][1]
+    again = cl._get_user_cinema(user)
+    assert [s['time'] for s in again.theaters[0].schedule] == ['10:00', '12:30']
+    assert cl._schedule_index(again, again.theaters[0]) is index
+    # 同数量的场次被替换时，版本号变化让索引重建，冲突检查按新时间进行
+    again.theaters[0].schedule[1] = dict(again.theaters[0].schedule[1], time='18:00')
+    again.theaters[0].schedule_version += 1
+    rebuilt = cl._schedule_index(again, again.theaters[0])
+    assert rebuilt is not index
+    assert not rebuilt.conflicts(parse_time('13:00'), 120) and rebuilt.conflicts(parse_time('18:30'), 60)
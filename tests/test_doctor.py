@@ -1,4 +1,6 @@
+import pytest
 from core.doctor.logic import DoctorLogic
+from core.common.cooldown import set_cooldown
 from core.common.data_manager import DataManager
 
 
@@ -6,6 +8,7 @@ def test_register_and_treat(tmp_path):
     dm = DataManager(base_path=tmp_path)
     dl = DoctorLogic(data_manager=dm)
     user_id = 'doc1'
+    set_cooldown(user_id, 'doctor', 'treat', 0)
     # register
     d = dl.register_doctor(user_id, {})
     assert d['user_id'] == user_id
@@ -15,3 +18,91 @@ def test_register_and_treat(tmp_path):
     assert res['reward'] >= 1
     u = dm.load_user(user_id)
     assert u.get('money', 0) >= res['reward']
+
+
+def test_patient_queue_severity_and_expiry(tmp_path):
+    import time
+    dm = DataManager(base_path=tmp_path)
+    dl = DoctorLogic(data_manager=dm, patient_ttl=60)
+    mild = dl.create_patient('甲', '感冒', severity=1)
+    severe = dl.create_patient('乙', '骨折', severity=3)
+    dl.create_patient('丙', '头痛', severity=2)
+    assert dl.next_patient()['id'] == severe['id']
+    assert [p['severity'] for p in dl.list_patients()] == [3, 2, 1]
+    dl.patients.discharge(severe['id'], 'cured')
+    assert dl.next_patient()['severity'] == 2
+    # reloaded queue keeps the order, and stale patients leave after the TTL
+    dl2 = DoctorLogic(data_manager=dm, patient_ttl=60)
+    assert len(dl2.patients) == 2
+    assert dl2.patients.expire(now=time.time() + 120) == 2
+    assert dl2.patients.get(mild['id']) is None
+    archive = (tmp_path / 'data' / 'doctor' / 'patients_archive.jsonl').read_text(encoding='utf-8').splitlines()
+    assert len(archive) == 3 and sum('"left"' in line for line in archive) == 2
+
+
+def test_research_progress_is_time_based(tmp_path):
+    import time
+    dm = DataManager(base_path=tmp_path)
+    dl = DoctorLogic(data_manager=dm)
+    for uid in ('d1', 'd2'):
+        set_cooldown(uid, 'doctor', 'research', 0)
+        d = dl.register_doctor(uid, {})
+        doctors = dl._load(dl._doctors_file())
+        doctors[uid]['skills']['research'] = 50
+        dl._save(dl._doctors_file(), doctors)
+        project = dl.start_research(uid, '疾病预防', origin=f'group:{uid}')['project']
+    assert dl.research_rate(50) == 1.5
+    before = dl._doctors_file().read_text(encoding='utf-8')
+    res = dl.advance_research('d1')
+    assert not res['completed'] and res['progress'] == 0
+    assert dl._doctors_file().read_text(encoding='utf-8') == before
+    assert dl.research_progress(project, project['started_ts'] + 600) == 15
+    # a fresh instance rebuilds the timers and settles both projects in one sweep
+    dl2 = DoctorLogic(data_manager=dm)
+    assert dl2.settle_research(time.time()) == []
+    settled = dl2.settle_research(dl2.next_research_due() + 1)
+    assert {(r['user_id'], r['origin']) for r in settled} == {('d1', 'group:d1'), ('d2', 'group:d2')}
+    assert dm.load_user('d1')['money'] >= 4000
+    assert dl2.get_info('d2')['research_project'] is None
+    assert dl2.settle_research(time.time() + 10 ** 6) == []
+
+
+
+def test_research_reward_not_paid_twice_after_failed_doctor_save(tmp_path, monkeypatch):
+    dm = DataManager(base_path=tmp_path)
+    dl = DoctorLogic(data_manager=dm)
+    set_cooldown('d3', 'doctor', 'research', 0)
+    dl.register_doctor('d3', {})
+    doctors = dl._load(dl._doctors_file())
+    doctors['d3']['skills']['research'] = 50
+    dl._save(dl._doctors_file(), doctors)
+    dl.start_research('d3', '疾病预防')
+    due = dl.next_research_due() + 1
+    real_save = dl._save
+
+    def failing_save(path, data):
+        raise OSError('disk full')
+    # the users are credited, then writing doctors.json fails
+    monkeypatch.setattr(dl, '_save', failing_save)
+    with pytest.raises(OSError):
+        dl.settle_research(due)
+    money = dm.load_user('d3')['money']
+    assert money >= 4000
+    monkeypatch.setattr(dl, '_save', real_save)
+    # a fresh instance retries: experience is granted, money is not paid again
+    dl2 = DoctorLogic(data_manager=dm)
+    settled = dl2.settle_research(due)
+    assert [r['user_id'] for r in settled] == ['d3']
+    assert dm.load_user('d3')['money'] == money
+    info = dl2.get_info('d3')
+    assert info['research_project'] is None and info['experience'] >= settled[0]['exp_gain']
+
+def test_patient_queue_heap_stays_compact(tmp_path):
+    dm = DataManager(base_path=tmp_path)
+    dl = DoctorLogic(data_manager=dm, max_patients=3)
+    for i in range(20):
+        dl.create_patient(f'患者{i}', '感冒', severity=i % 3 + 1)
+    assert len(dl.patients) == 3
+    assert len(dl.patients._heap) <= 2 * len(dl.patients)
+    kept = dl.list_patients()
+    assert [p['severity'] for p in kept] == sorted((p['severity'] for p in kept), reverse=True)
@@ -1,5 +1,8 @@
+import pytest
 from core.farm.logic import FarmLogic
 from core.common.data_manager import DataManager
+from core.common.inventory import Inventory, ItemRegistry
+from core.common.cooldown import set_cooldown
 from pathlib import Path
 import json
 
@@ -14,11 +17,13 @@ def test_plant_and_harvest(tmp_path):
     dm = DataManager(base_path=tmp_path)
     farm_logic = FarmLogic(data_manager=dm)
     user_id = 'user1'
+    for action in ('create', 'plant', 'harvest', 'sell'):
+        set_cooldown(user_id, 'farm', action, 0)
     user = {'name':'tester','money':1000}
     # create farm
     f = farm_logic.create_farm(user_id, user)
-    # give seed in inventory
-    f['inventory']['seeds'].append({'name':'corn','count':2})
+    # give seed in inventory (旧存档格式，读取时并入玩家背包)
+    f['inventory']['seeds'] = [{'name':'corn','count':2}]
     farm_logic.save_farm(user_id, f)
     # plant at plot 0
     farm_logic.plant_seed(user_id, 0, 'corn')
@@ -28,9 +33,15 @@ def test_plant_and_harvest(tmp_path):
     assert f2['land']['plots'][0]['harvestReady'] is True
     # harvest
     farm_logic.harvest_crop(user_id, 0)
-    f3 = farm_logic.load_farm(user_id)
-    crops = f3['inventory']['crops']
-    assert any(c['name']=='corn' and c['count']>=3 for c in crops)
+    inv = Inventory(dm.load_user(user_id), ItemRegistry.shared(tmp_path / 'data'))
+    assert inv.count('crop', 'corn') >= 3
+    assert inv.count('seed', 'corn') == 1
+    assert 'seeds' not in farm_logic.load_farm(user_id)['inventory']
+    # 负数数量不能把出售变成凭空加货
+    with pytest.raises(ValueError):
+        farm_logic.sell_crop(user_id, 'corn', -5)
+    inv = Inventory(dm.load_user(user_id), ItemRegistry.shared(tmp_path / 'data'))
+    assert inv.count('crop', 'corn') >= 3
 
 
 def test_shop_buy_seed(tmp_path):
@@ -45,8 +56,7 @@ def test_shop_buy_seed(tmp_path):
     user = {'name':'buyer','money':50}
     farm_logic.create_farm(user_id, user)
     farm_logic.buy_seed(user_id, 'wheat', 3)
-    f = farm_logic.load_farm(user_id)
-    inv_seeds = f['inventory']['seeds']
-    assert any(s['name']=='wheat' and s['count']==3 for s in inv_seeds)
+    inv = Inventory(dm.load_user(user_id), ItemRegistry.shared(tmp_path / 'data'))
+    assert inv.count('seed', 'wheat') == 3
     user_after = dm.load_user(user_id)
     assert user_after['money'] == 50 - 3*5
@@ -13,3 +13,25 @@ def test_create_accept_complete(tmp_path):
     assert res['reward'] == 30
     u = dm.load_user(user)
     assert u.get('money',0) >= 30
+
+
+def test_active_mission_kept_in_session(tmp_path):
+    from core.common.cooldown import set_cooldown
+
+    dm = DataManager(base_path=tmp_path)
+    fl = FirefighterLogic(data_manager=dm)
+    user = 'ff_session'
+    set_cooldown(user, 'firefighter', 'join', 0)
+    set_cooldown(user, 'firefighter', 'mission', 0)
+    info = fl.join_fire_department(user)
+    info.rank = '消防员'
+    fl._save_user_firefighter(user, info)
+    saved = fl._firefighters_file().read_text(encoding='utf-8')
+    mission = fl.start_firefighting_mission(user)
+    # 开始任务不重写消防员档案
+    assert fl._firefighters_file().read_text(encoding='utf-8') == saved
+    assert fl._get_user_firefighter(user).current_mission.fire_name == mission['fire_name']
+
+    fl.missions.flush()
+    restored = FirefighterLogic(data_manager=dm)
+    assert restored._get_user_firefighter(user).current_mission.fire_name == mission['fire_name']
@@ -1,5 +1,6 @@
 from core.fishing.logic import FishingLogic
 from core.common.data_manager import DataManager
+from core.common.cooldown import set_cooldown
 
 
 def test_go_fishing(tmp_path):
@@ -15,3 +16,28 @@ def test_go_fishing(tmp_path):
     assert 'name' in caught
     u = dm.load_user(user)
     assert 'inventory' in u and 'fish' in u['inventory']
+
+
+def test_bite_timer_answers_status_from_memory(tmp_path):
+    import time
+    dm = DataManager(base_path=tmp_path)
+    fl = FishingLogic(data_manager=dm)
+    set_cooldown('bite_user', 'fishing', 'start', 0)
+    set_cooldown('bite_user', 'fishing', 'pull', 0)
+    res = fl.start_fishing('bite_user', origin='group:1')
+    bite_at = fl.bites.get('bite_user')['bite_at']
+    users_file = tmp_path / 'data' / 'fishing' / 'users.json'
+    before = users_file.read_text(encoding='utf-8')
+    assert fl.check_fishing_status('bite_user')['status'] == 'waiting'
+    assert fl.bites.pop_due(time.time()) == []
+    due = fl.bites.pop_due(bite_at)
+    assert [(d['user_id'], d['origin']) for d in due] == [('bite_user', 'group:1')]
+    assert fl.check_fishing_status('bite_user')['status'] == 'ready'
+    assert users_file.read_text(encoding='utf-8') == before
+    # pending sessions survive a restart through the recovery file
+    fl.bites.flush()
+    fl2 = FishingLogic(data_manager=dm)
+    assert fl2.bites.get('bite_user')['bitten'] is True
+    assert res['wait_time'] >= 10
+    fl2.pull_rod('bite_user')
+    assert fl2.bites.get('bite_user') is None
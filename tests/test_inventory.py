@@ -0,0 +1,34 @@
+import pytest
+
+from core.common.inventory import Inventory, ItemRegistry
+
+
+def test_registry_ids_and_counted_inventory(tmp_path):
+    registry = ItemRegistry(tmp_path / 'items.json')
+    user = {'inventory': {'旧宝箱': 2, '钥匙': {'count': 3}}}
+    inv = Inventory(user, registry)
+    # 旧版扁平格式归入杂项
+    assert inv.count('misc', '旧宝箱') == 2 and inv.count('misc', '钥匙') == 3
+
+    inv.add('ingredient', 'tomato', 5, '番茄')
+    inv.fold([{'id': 'tomato', 'amount': 2}, {'id': 'egg', 'name': '鸡蛋'}], 'ingredient')
+    assert inv.count('ingredient', 'tomato') == 7 and inv.has('ingredient', 'egg')
+    inv.remove('ingredient', 'egg')
+    assert not inv.has('ingredient', 'egg') and 'egg' not in [e['id'] for e in inv.entries()]
+    with pytest.raises(ValueError):
+        inv.remove('ingredient', 'tomato', 8)
+    # 负数、0 不能用来“扣出”物品
+    for amount in (-5, 0):
+        with pytest.raises(ValueError):
+            inv.remove('ingredient', 'tomato', amount)
+        with pytest.raises(ValueError):
+            inv.has('seed', 'x', amount)
+    assert inv.count('ingredient', 'tomato') == 7
+
+    tomato_id = registry.find('ingredient', 'tomato')
+    assert user['inventory']['ingredient'] == {str(tomato_id): 7}
+    # 重新加载后 id 不变，新物品继续编号
+    reloaded = ItemRegistry(tmp_path / 'items.json')
+    assert reloaded.find('ingredient', 'tomato') == tomato_id
+    assert reloaded.lookup(tomato_id)['name'] == '番茄'
+    assert reloaded.id_of('crop', 'corn') > max(tomato_id, registry.find('ingredient', 'egg'))
@@ -22,3 +22,30 @@ def test_buy_vip(tmp_path):
     nl.buy_vip(user, 3, price_per_month=100)
     u = nl.get_user(user)
     assert u['vip_until'] > 0
+
+
+def test_offline_accrual_is_hourly_and_keeps_fractions(tmp_path):
+    from datetime import datetime, timedelta
+    from core.netbar.models import NetbarInfo, NetbarEmployee
+
+    dm = DataManager(base_path=tmp_path)
+    nl = NetbarLogic(data_manager=dm)
+    start = datetime(2026, 10, 1, 8, 30)
+    netbar = NetbarInfo(id='NB1', owner_id='owner', last_update=start.isoformat())
+    netbar.computers.basic = 20
+    netbar.staff.append(NetbarEmployee(id='E1', position='收银员', salary=3600, skill=5))
+    nl._sync_decay(netbar)
+    split = netbar.copy(deep=True)
+
+    nl._update_netbar_status(netbar, start + timedelta(hours=3))
+    nl._update_netbar_status(split, start + timedelta(hours=1.5))
+    nl._update_netbar_status(split, start + timedelta(hours=3))
+    assert netbar.income > 0 and abs(netbar.income - split.income) <= 1
+    assert netbar.expenses == 15 and split.expenses == 15
+
+    # a month offline for every netbar settles in one batch
+    netbars = {'owner': netbar.dict()}
+    nl._save_netbars(netbars)
+    report = nl.accrue_all(start + timedelta(days=30))
+    assert report['netbars'] == 1 and report['income'] > 0
+    assert nl._get_user_netbar('owner').expenses == 3600
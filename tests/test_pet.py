@@ -0,0 +1,34 @@
+import json
+
+from core.pet.logic import PetLogic
+from core.common.data_manager import DataManager
+
+
+def test_pets_split_by_owner_with_prefix_lookup(tmp_path):
+    dm = DataManager(base_path=tmp_path)
+    pl = PetLogic(dm)
+    legacy = [
+        {'id': 'abc12345', 'owner_id': 'alice', 'name': 'R级猫', 'type': '猫', 'rarity': 'R'},
+        {'id': 'abd99999', 'owner_id': 'bob', 'name': 'SR级狗', 'type': '狗', 'rarity': 'SR'},
+        {'id': 'abc19999', 'owner_id': 'carol', 'name': 'R级兔', 'type': '兔', 'rarity': 'R'},
+    ]
+    (pl.data_path / 'pets.json').write_text(json.dumps(legacy, ensure_ascii=False), encoding='utf-8')
+
+    assert [p.id for p in pl.get_user_pets('alice')] == ['abc12345']
+    assert not (pl.data_path / 'pets.json').exists()
+    assert pl.get_pet('abd9').owner_id == 'bob'
+    # 太短或有歧义的前缀不匹配任何宠物
+    assert pl.get_pet('abd') is None
+    assert pl.get_pet('abc1') is None and pl.feed_pet('abc1') is None
+    assert pl.get_pet('zzzz') is None
+
+    bob_file = pl.data_path / 'owners' / 'bob.json'
+    before = bob_file.read_text(encoding='utf-8')
+    fed = pl.feed_pet('abc12')
+    assert fed.exp == 15
+    # 喂养 alice 的宠物不会改动 bob 的文件
+    assert bob_file.read_text(encoding='utf-8') == before
+
+    new = pl.draw_pet('bob')
+    assert {p.id for p in pl.get_user_pets('bob')} == {'abd99999', new.id}
+    assert PetLogic(dm).get_pet(new.id).owner_id == 'bob'
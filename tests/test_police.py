@@ -1,4 +1,9 @@
-from core.police.logic import PoliceLogic
+import time
+
+import pytest
+
+from core.police.logic import PoliceLogic, CURRENT_CASE_TTL
+from core.common.cooldown import set_cooldown
 from core.common.data_manager import DataManager
 
 
@@ -15,3 +20,47 @@ def test_create_and_accept_case(tmp_path):
     p.complete_case(user_id, case['id'])
     user = dm.load_user(user_id)
     assert user.get('money',0) >= 50
+
+
+def test_case_pool_bounded_and_archived(tmp_path):
+    dm = DataManager(base_path=tmp_path)
+    p = PoliceLogic(data_manager=dm, max_cases=5, refill_target=3)
+    assert p.refill_cases() == 3
+    assert p.cases.open_count() == 3
+    for _ in range(10):
+        p.create_case('案件', '描述', reward=10, difficulty='困难')
+    assert len(p.list_cases()) == 5
+    assert p.cases.next_open('困难')['difficulty'] == '困难'
+    set_cooldown('cop', 'police', 'accept', 0)
+    c = p.take_case('cop', '专家')
+    assert c['accepted_by'] == 'cop' and c['difficulty'] == '专家'
+    assert p.cases.open_count('专家') == 0
+    p.complete_case('cop', c['id'])
+    assert p.cases.get(c['id']) is None
+    archive = (tmp_path / 'data' / 'police' / 'cases_archive.jsonl').read_text(encoding='utf-8').splitlines()
+    assert any(c['id'] in line and 'solved' in line for line in archive)
+    p.cases.flush()
+    p2 = PoliceLogic(data_manager=dm, max_cases=5)
+    assert len(p2.list_cases()) == 4
+
+
+def test_abandoned_cases_leave_the_pool(tmp_path):
+    dm = DataManager(base_path=tmp_path)
+    p = PoliceLogic(data_manager=dm, max_cases=5, refill_target=0)
+    for uid in ('cop_a', 'cop_b'):
+        set_cooldown(uid, 'police', 'accept', 0)
+    first = p.take_case('cop_a')
+    set_cooldown('cop_a', 'police', 'accept', 0)
+    second = p.take_case('cop_a')
+    # 改接新案件，旧案件归档
+    assert p.cases.get(first['id']) is None and p.cases.get(second['id'])
+    # 冷却中不再生成新案件
+    with pytest.raises(RuntimeError):
+        p.take_case('cop_a')
+    assert len(p.list_cases()) == 1
+    # 接取会话过期后案件也移出案件池
+    other = p.take_case('cop_b')
+    p.current_cases.purge(time.time() + CURRENT_CASE_TTL + 1)
+    assert p.cases.get(other['id']) is None and p.cases.get(second['id']) is None
+    archive = (tmp_path / 'data' / 'police' / 'cases_archive.jsonl').read_text(encoding='utf-8')
+    assert archive.count('abandoned') == 3
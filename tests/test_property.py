@@ -0,0 +1,33 @@
+from core.property.logic import PropertyMarket
+from core.property.models import Property
+from core.common.data_manager import DataManager
+
+
+def test_buy_property_charges_and_persists(tmp_path):
+    dm = DataManager(base_path=tmp_path)
+    pm = PropertyMarket(dm)
+    pm.register_property(Property(id='P1', name='小屋', price=100, rent=10))
+    dm.save_user('landlord', {'name':'landlord','money':150})
+    pm.buy_property('landlord', 'P1')
+    assert dm.load_user('landlord')['money'] == 50
+    pm2 = PropertyMarket(dm)
+    pm2.register_property(Property(id='P1', name='小屋', price=100, rent=10))
+    assert pm2.properties['P1'].owner_id == 'landlord'
+    assert [p.id for p in pm2.get_user_properties('landlord')] == ['P1']
+
+
+def test_collect_rent_once_per_period(tmp_path):
+    dm = DataManager(base_path=tmp_path)
+    pm = PropertyMarket(dm)
+    for i in range(3):
+        pm.register_property(Property(id=f'P{i}', name=f'房{i}', price=10, rent=5))
+    dm.save_user('a', {'money':100})
+    dm.save_user('b', {'money':100})
+    pm.buy_property('a', 'P0')
+    pm.buy_property('a', 'P1')
+    pm.buy_property('b', 'P2')
+    report = pm.collect_rent(period='2026-W01')
+    assert report['owners'] == 2 and report['total'] == 15
+    assert dm.load_user('a')['money'] == 100 - 20 + 10
+    assert pm.collect_rent(period='2026-W01')['skipped']
+    assert dm.load_user('b')['money'] == 100 - 10 + 5
@@ -0,0 +1,31 @@
+import random
+from collections import Counter
+
+from core.common.sampler import AliasTable, SamplerCache
+
+
+def test_alias_table_matches_weights():
+    table = AliasTable(['a', 'b', 'c', 'never'], [70, 25, 5, 0])
+    assert len(table) == 3
+    counts = Counter(table.draw_many(20000, random.Random(42)))
+    assert set(counts) == {'a', 'b', 'c'}
+    assert abs(counts['a'] / 20000 - 0.70) < 0.02
+    assert abs(counts['c'] / 20000 - 0.05) < 0.01
+    # seeded draws are reproducible
+    assert table.draw_many(10, random.Random(7)) == table.draw_many(10, random.Random(7))
+
+
+def test_sampler_cache_rebuilds_on_version_change():
+    builds = []
+    cache = SamplerCache()
+
+    def build():
+        builds.append(1)
+        return ['x'], [1]
+
+    assert cache.get('fish', build, version=1).draw() == 'x'
+    cache.get('fish', build, version=1)
+    assert len(builds) == 1
+    cache.get('fish', build, version=2)
+    assert len(builds) == 2
+    assert cache.get('empty', lambda: ([], [])) is None
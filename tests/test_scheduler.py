@@ -0,0 +1,60 @@
+import asyncio
+import threading
+from datetime import datetime
+
+from core.common.scheduler import JobScheduler, IntervalTrigger, CronTrigger
+
+
+def test_interval_job_runs_and_persists(tmp_path):
+    state = tmp_path / 'scheduler.json'
+    calls = []
+    s = JobScheduler(state)
+    s.add_job('tick', lambda: calls.append(1), IntervalTrigger(60), now=1000.0)
+    assert asyncio.run(s.run_pending(now=1059.0)) == []
+    assert asyncio.run(s.run_pending(now=1060.0)) == ['tick']
+    assert s.jobs['tick'].next_run == 1120.0
+    assert calls == [1]
+
+    # restart after five missed intervals: catch_up bounds the replay
+    s2 = JobScheduler(state)
+    job = s2.add_job('tick', lambda: calls.append(2), IntervalTrigger(60), catch_up=3, now=1400.0)
+    assert job.metrics.missed == 5 and job.metrics.runs == 1
+    asyncio.run(s2.run_pending(now=1400.0))
+    assert calls == [1, 2, 2, 2]
+    skipped = JobScheduler(state).add_job('tick', lambda: None, IntervalTrigger(60), catch_up=0, now=1700.0)
+    assert 1700.0 < skipped.next_run <= 1760.0
+
+
+def test_failures_are_counted_and_async_jobs_awaited(tmp_path):
+    s = JobScheduler(tmp_path / 'scheduler.json')
+    done = []
+
+    def boom():
+        raise RuntimeError('bad tick')
+
+    async def coro():
+        done.append(True)
+
+    s.add_job('boom', boom, IntervalTrigger(1), now=0.5)
+    s.add_job('coro', coro, IntervalTrigger(1), now=0.5)
+    asyncio.run(s.run_pending(now=2.0))
+    stats = {m['name']: m for m in s.metrics()}
+    assert stats['boom']['failures'] == 1 and stats['boom']['last_error'] == 'bad tick'
+    assert stats['coro']['runs'] == 1 and done == [True]
+
+
+def test_sync_jobs_run_on_the_event_loop(tmp_path):
+    s = JobScheduler(tmp_path / 'scheduler.json')
+    threads = []
+    s.add_job('sync', lambda: threads.append(threading.get_ident()), IntervalTrigger(1), now=0.0)
+    # now=0 is a real timestamp, not "unset"
+    assert s.jobs['sync'].next_run <= 1.0
+    assert asyncio.run(s.run_pending(now=1.0)) == ['sync']
+    assert threads == [threading.get_ident()]
+
+
+def test_cron_trigger_next_hour():
+    base = datetime(2026, 10, 19, 13, 20).timestamp()
+    assert datetime.fromtimestamp(CronTrigger(minute=0).next_after(base)) == datetime(2026, 10, 19, 14, 0)
+    monday = CronTrigger(minute=30, hour=8, weekday=0).next_after(base)
+    assert datetime.fromtimestamp(monday) == datetime(2026, 10, 26, 8, 30)
@@ -0,0 +1,36 @@
+import time
+
+from core.common.session_store import SessionStore
+
+
+def test_ttl_purge_and_snapshot(tmp_path):
+    path = tmp_path / 'sessions.json'
+    store = SessionStore(path, default_ttl=60)
+    store.set('a', {'step': 1})
+    store.set('b', {'step': 2}, ttl=-1)
+    assert store.get('a') == {'step': 1}
+    assert store.get('b') is None and 'b' not in store
+    store.flush()
+    assert not store.dirty
+
+    store.set('c', 3, ttl=10)
+    assert store.purge(time.time() + 30) == 1
+    assert store.get('a') == {'step': 1} and store.get('c') is None
+    # 没有变更时不写快照
+    store.flush()
+    path.unlink()
+    store.flush()
+    assert not path.exists()
+
+    store.pop('a')
+    store.set('d', [1, 2])
+    store.flush()
+    restored = SessionStore(path)
+    assert dict(restored.items()) == {'d': [1, 2]}
+
+
+def test_memory_only_store():
+    store = SessionStore()
+    store.set('x', 1)
+    store.flush()
+    assert store.pop('x') == 1 and len(store) == 0
@@ -1,3 +1,5 @@
+import pytest
+
 from core.stock.logic import StockMarket
 from core.common.data_manager import DataManager
 from core.stock.models import StockData
@@ -21,6 +23,25 @@ def test_buy_and_sell(tmp_path):
     assert u2['money'] > 1000 - 5*10.0
 
 
+def test_system_prices_move_randomly_and_persist(tmp_path):
+    import random
+    random.seed(7)
+    dm = DataManager(base_path=tmp_path)
+    sm = StockMarket()
+    sm.register_stock(StockData(id='S1', name='Up', price=10.0, volatility=0.6))
+    moves = set()
+    for _ in range(20):
+        before = sm.stocks['S1'].price
+        sm.update_prices(dm)
+        moves.add(sm.stocks['S1'].price > before)
+        assert abs(sm.stocks['S1'].price / before - 1) <= 0.6 * 0.02 + 0.01
+    assert moves == {True, False}
+    sm2 = StockMarket()
+    sm2.register_stock(StockData(id='S1', name='Up', price=10.0, volatility=0.6))
+    sm2.load_prices(dm)
+    assert sm2.stocks['S1'].price == sm.stocks['S1'].price
+
+
 def test_list_holdings(tmp_path):
     dm = DataManager(base_path=tmp_path)
     sm = StockMarket()
@@ -30,3 +51,233 @@ def test_list_holdings(tmp_path):
     sm.buy(dm, user, 'S2', 2)
     holdings = sm.list_holdings(dm, user)
     assert 'S2' in holdings
+
+
+def test_ipo_order_book_matching(tmp_path):
+    dm = DataManager(base_path=tmp_path)
+    sm = StockMarket()
+    dm.save_user('owner', {'name':'owner','money':0})
+    dm.save_user('buyer', {'name':'buyer','money':1000})
+    pc = sm.ipo(dm, 'owner', 'OwnerCo', 'OWN', 10)
+    sid = pc.stock_id
+    # limit bid above the IPO ask fills at the ask price and refunds the difference
+    sm.submit_order(dm, 'buyer', sid, 'buy', 20, 12)
+    trades = sm.match_orders(dm)
+    assert sum(t.amount for t in trades) == 20
+    buyer = dm.load_user('buyer')
+    assert buyer['money'] == 1000 - 20 * 10
+    assert buyer['stocks'][sid]['amount'] == 20
+    assert dm.load_user('owner')['money'] == 200
+    assert sm.get_depth(sid)['asks'][0] == (10, pc.issued_shares - 20)
+
+
+def test_price_time_priority_and_cancel(tmp_path):
+    dm = DataManager(base_path=tmp_path)
+    sm = StockMarket()
+    for uid in ('owner', 'a', 'b', 'c'):
+        dm.save_user(uid, {'name':uid,'money':1000})
+    sid = sm.ipo(dm, 'owner', 'OwnerCo', 'OWN', 10).stock_id
+    sm.match_orders(dm)
+    first = sm.submit_order(dm, 'a', sid, 'buy', 5, 8)
+    sm.submit_order(dm, 'b', sid, 'buy', 5, 8)
+    sm.submit_order(dm, 'c', sid, 'buy', 5, 9)
+    sm.match_orders(dm)
+    assert dm.load_user('a')['money'] == 1000 - 40
+    # owner sells 7 shares into the bids: best price first, then earliest
+    dm.save_user('owner', {'name':'owner','money':0,'stocks':{sid:{'amount':7,'avg_price':0}}})
+    sm.submit_order(dm, 'owner', sid, 'sell', 7)
+    sm.match_orders(dm)
+    assert dm.load_user('c')['stocks'][sid]['amount'] == 5
+    assert dm.load_user('a')['stocks'][sid]['amount'] == 2
+    assert 'stocks' not in dm.load_user('b')
+    assert dm.load_user('owner')['money'] == 5 * 9 + 2 * 8
+    sm.cancel_order('b', sm.list_orders('b')[0].order_id)
+    sm.match_orders(dm)
+    assert dm.load_user('b')['money'] == 1000
+    assert first.remaining == 3
+
+
+def test_orders_survive_reload(tmp_path):
+    dm = DataManager(base_path=tmp_path)
+    sm = StockMarket()
+    dm.save_user('owner', {'name':'owner','money':0})
+    sid = sm.ipo(dm, 'owner', 'OwnerCo', 'OWN', 10).stock_id
+    sm.match_orders(dm)
+    sm2 = StockMarket()
+    sm2.load_orders(dm)
+    assert sm2.get_depth(sid)['asks'] == [(10, 1000)]
+
+
+def test_pending_orders_survive_restart_before_match(tmp_path):
+    dm = DataManager(base_path=tmp_path)
+    sm = StockMarket()
+    dm.save_user('owner', {'name':'owner','money':0})
+    dm.save_user('b', {'name':'b','money':1000})
+    sid = sm.ipo(dm, 'owner', 'OwnerCo', 'OWN', 10).stock_id
+    sm.submit_order(dm, 'b', sid, 'buy', 5, 10)
+    sm2 = StockMarket()
+    sm2.load_companies(dm)
+    sm2.load_orders(dm)
+    assert [o.source for o in sm2.list_orders('owner')] == ['ipo']
+    sm2.match_orders(dm)
+    assert dm.load_user('b')['stocks'][sid]['amount'] == 5
+    assert dm.load_user('owner')['money'] == 50
+
+
+def test_orders_are_journaled_and_cancels_survive_restart(tmp_path):
+    dm = DataManager(base_path=tmp_path)
+    sm = StockMarket()
+    dm.save_user('owner', {'name':'owner','money':0})
+    dm.save_user('b', {'name':'b','money':1000})
+    sid = sm.ipo(dm, 'owner', 'OwnerCo', 'OWN', 10).stock_id
+    sm.submit_order(dm, 'b', sid, 'buy', 5, 9)
+    sm.match_orders(dm)
+    snapshot = (tmp_path / 'data' / 'stock' / 'orders.json').read_text(encoding='utf-8')
+    resting = sm.list_orders('b')[0]
+    # new orders and cancels only append to the journal until the next batch
+    queued = sm.submit_order(dm, 'b', sid, 'buy', 3, 8)
+    sm.cancel_order('b', queued.order_id, dm)
+    sm.cancel_order('b', resting.order_id, dm)
+    assert (tmp_path / 'data' / 'stock' / 'orders.json').read_text(encoding='utf-8') == snapshot
+    sm2 = StockMarket()
+    sm2.load_companies(dm)
+    sm2.load_orders(dm)
+    assert [o.order_id for o in sm2.list_orders('b')] == [resting.order_id]
+    assert sm2._pending_cancels == [resting.order_id]
+    sm2.match_orders(dm)
+    assert sm2.list_orders('b') == []
+    assert dm.load_user('b')['money'] == 1000
+    # the batch snapshot replaces the journal; replaying it again is a no-op
+    sm3 = StockMarket()
+    sm3.load_orders(dm)
+    assert sm3.list_orders('b') == [] and sm3._pending_cancels == []
+
+
+def test_self_trade_and_price_band_rejected(tmp_path):
+    dm = DataManager(base_path=tmp_path)
+    sm = StockMarket()
+    dm.save_user('owner', {'name':'owner','money':100000})
+    sid = sm.ipo(dm, 'owner', 'OwnerCo', 'OWN', 10).stock_id
+    # buying your own IPO ask is cancelled and refunded instead of trading
+    sm.submit_order(dm, 'owner', sid, 'buy', 1000, 10)
+    sm.match_orders(dm)
+    owner = dm.load_user('owner')
+    assert owner['money'] == 100000 and 'stocks' not in owner
+    assert sm.get_depth(sid)['asks'] == [(10, 1000)]
+    assert sm.get_depth(sid)['bids'] == []
+    with pytest.raises(ValueError):
+        sm.submit_order(dm, 'owner', sid, 'buy', 1, 100)
+
+
+def test_holder_index_tracks_trades_and_rebuilds(tmp_path):
+    dm = DataManager(base_path=tmp_path)
+    sm = StockMarket()
+    sm.register_stock(StockData(id='S3', name='Idx', price=2.0, volatility=0.1))
+    dm.save_user('h1', {'name':'h1','money':100})
+    dm.save_user('h2', {'name':'h2','money':100})
+    sm.buy(dm, 'h1', 'S3', 10)
+    sm.buy(dm, 'h2', 'S3', 30)
+    sm.sell(dm, 'h2', 'S3', 5)
+    assert sm.get_holders('S3') == {'h1': 10, 'h2': 25}
+    assert sm.top_holders('S3', 1) == [('h2', 25)]
+    summary = sm.shareholder_summary('S3')
+    assert summary['float_held'] == 35
+    assert summary['market_cap'] == 70.0
+    sm.flush(dm)
+    sm2 = StockMarket()
+    sm2.load_holders(dm)
+    assert sm2.get_holders('S3') == {'h1': 10, 'h2': 25}
+    sm2.holder_index.holders.clear()
+    sm2.rebuild_holders(dm)
+    assert sm2.holder_index.total('S3') == 35
+
+
+def test_holder_index_follows_order_book(tmp_path):
+    dm = DataManager(base_path=tmp_path)
+    sm = StockMarket()
+    dm.save_user('owner', {'name':'owner','money':0})
+    dm.save_user('b', {'name':'b','money':1000})
+    sid = sm.ipo(dm, 'owner', 'OwnerCo', 'OWN', 10).stock_id
+    sm.submit_order(dm, 'b', sid, 'buy', 10)
+    sm.match_orders(dm)
+    sm.submit_order(dm, 'b', sid, 'sell', 4, 12)
+    sm.match_orders(dm)
+    # shares resting on the ask are still owned by the seller
+    assert sm.get_holders(sid) == {'b': 10}
+    assert sm.rebuild_holders(dm) == 1
+    assert sm.get_holders(sid) == {'b': 10}
+
+
+def test_dividends_paid_once_per_period(tmp_path):
+    dm = DataManager(base_path=tmp_path)
+    sm = StockMarket()
+    dm.save_user('owner', {'name':'owner','money':0})
+    dm.save_user('b', {'name':'b','money':1000})
+    sid = sm.ipo(dm, 'owner', 'OwnerCo', 'OWN', 10).stock_id
+    sm.submit_order(dm, 'b', sid, 'buy', 20)
+    sm.match_orders(dm)
+    before = dm.load_user('b')['money']
+    report = sm.distribute_dividends(dm, period='2026-W01')
+    assert report['companies'] == 1 and report['holders'] == 1
+    # 20 shares x 10.0 price x 5% rate, paid by the owner
+    assert dm.load_user('b')['money'] == before + 10.0
+    assert dm.load_user('owner')['money'] == 200 - 10.0
+    again = sm.distribute_dividends(dm, period='2026-W01')
+    assert again['holders'] == 0
+    assert dm.load_user('b')['money'] == before + 10.0
+    sm.distribute_dividends(dm, period='2026-W02')
+    assert dm.load_user('b')['money'] == before + 20.0
+    assert dm.load_user('owner')['money'] == 200 - 20.0
+
+
+def test_dividends_skip_short_owner_and_key_on_company(tmp_path):
+    dm = DataManager(base_path=tmp_path)
+    sm = StockMarket()
+    dm.save_user('o1', {'name':'o1','money':0})
+    dm.save_user('o2', {'name':'o2','money':0})
+    dm.save_user('b', {'name':'b','money':1000})
+    s1 = sm.ipo(dm, 'o1', 'One', 'ONE', 10).stock_id
+    sm.submit_order(dm, 'b', s1, 'buy', 20)
+    sm.match_orders(dm)
+    dm.save_user('o1', {'name':'o1','money':5})
+    report = sm.distribute_dividends(dm, period='2026-W01')
+    assert report['companies'] == 0 and report['skipped'] == 1
+    assert dm.load_user('o1')['money'] == 5
+    dm.save_user('o1', {'name':'o1','money':100})
+    assert sm.distribute_dividends(dm, period='2026-W01')['companies'] == 1
+    before = dm.load_user('b')['money']
+    # a company listed later in the same period pays only its own dividend
+    s2 = sm.ipo(dm, 'o2', 'Two', 'TWO', 10).stock_id
+    sm.submit_order(dm, 'b', s2, 'buy', 10)
+    sm.match_orders(dm)
+    mid = dm.load_user('b')['money']
+    assert mid == before - 100
+    report = sm.distribute_dividends(dm, period='2026-W01')
+    assert report['companies'] == 1 and report['total'] == 5.0
+    assert dm.load_user('b')['money'] == mid + 5.0
+    assert dm.load_user('o1')['money'] == 90
+
+
+def test_company_registry_survives_restart(tmp_path):
+    dm = DataManager(base_path=tmp_path)
+    sm = StockMarket()
+    dm.save_user('owner', {'name':'owner','money':0})
+    dm.save_user('b', {'name':'b','money':1000})
+    sid = sm.ipo(dm, 'owner', 'OwnerCo', 'OWN', 10).stock_id
+    sm.submit_order(dm, 'b', sid, 'buy', 5, 10)
+    sm.match_orders(dm)
+    sm.submit_order(dm, 'b', sid, 'sell', 5, 8)
+    dm.save_user('owner', {'name':'owner','money':1000})
+    sm.submit_order(dm, 'owner', sid, 'buy', 5)
+    sm.match_orders(dm)
+    # price changes are coalesced until flush
+    sm2 = StockMarket()
+    sm2.load_companies(dm)
+    assert sm2.player_companies[sid].share_price == 10
+    sm.flush(dm)
+    sm3 = StockMarket()
+    sm3.load_companies(dm)
+    assert sm3.player_companies[sid].share_price == 8
+    assert sm3.player_companies.by_owner('owner').stock_id == sid
+    with pytest.raises(ValueError):
+        sm3.ipo(dm, 'owner', 'Again', 'AGN', 5)
@@ -16,3 +16,96 @@ def test_order_drink(tmp_path):
     assert d['price'] == 5
     u = dm.load_user(user)
     assert u['money'] == 95
+
+
+def test_directory_ranking_and_migration(tmp_path):
+    import json
+
+    dm = DataManager(base_path=tmp_path)
+    tl = TavernLogic(data_manager=dm)
+    # 老存档：只有酒馆文件，没有目录
+    legacy = {'user_id': 'old', 'name': '老店', 'level': 3, 'created_at': '2024-01-01T00:00:00'}
+    (tl.data_path / 'old_tavern.json').write_text(json.dumps(legacy, ensure_ascii=False), encoding='utf-8')
+
+    tl.create_tavern('new', '新店', 10000)
+    assert set(json.loads((tl.data_path / 'directory.json').read_text(encoding='utf-8'))) == {'old', 'new'}
+
+    ranking = tl.get_tavern_ranking()
+    assert [r['user_id'] for r in ranking] == ['old', 'new']
+    assert tl.get_my_rank('new')['rank'] == 2
+
+    tavern = tl._load_tavern_data('new')
+    tavern.level = 5
+    tl._save_tavern_data('new', tavern)
+    # 保存酒馆只更新内存中的目录，由会话落盘任务 flush
+    on_disk = lambda: json.loads((tl.data_path / 'directory.json').read_text(encoding='utf-8'))['new']['level']
+    assert tl.directory.dirty and on_disk() == 1
+    tl.directory.flush()
+    assert not tl.directory.dirty and on_disk() == 5
+    # 排行只读目录，删掉酒馆文件也不影响
+    (tl.data_path / 'old_tavern.json').unlink()
+    assert tl.get_my_rank('new')['rank'] == 1
+    assert tl.get_tavern_ranking('level')[1]['user_id'] == 'old'
+    assert tl.random_tavern_owner(exclude='new') == 'old'
+
+
+def test_ratings_running_aggregate(tmp_path):
+    import json
+    from core.common.cooldown import set_cooldown
+
+    dm = DataManager(base_path=tmp_path)
+    tl = TavernLogic(data_manager=dm)
+    tl.create_tavern('rated_owner', '评分店', 10000)
+    legacy = {'ratings': [{'visitor_id': 'v0', 'rating': 2, 'comment': '一般', 'time': '2024-01-01T00:00:00'}]}
+    (tl.data_path / 'rated_owner_ratings.json').write_text(json.dumps(legacy, ensure_ascii=False), encoding='utf-8')
+
+    for visitor, score in [('rater_a', 5), ('rater_b', 4), ('rater_a', 3)]:
+        set_cooldown(visitor, 'tavern', 'rate', 0)
+        res = tl.rate_tavern(visitor, 'rated_owner', score, '评语')
+    assert res['updated'] and res['total_ratings'] == 3
+    assert res['new_average'] == 3.0
+
+    info = tl.get_tavern_ratings('rated_owner')
+    assert info['distribution'] == {1: 0, 2: 1, 3: 1, 4: 1, 5: 0}
+    assert not (tl.data_path / 'rated_owner_ratings.json').exists()
+    # 只有首次好评提升声誉
+    assert tl._load_tavern_data('rated_owner').reputation == 3.2
+
+
+def test_activities_and_brewing_indexed_by_end_time(tmp_path):
+    import json
+    from datetime import datetime, timedelta
+
+    dm = DataManager(base_path=tmp_path)
+    tl = TavernLogic(data_manager=dm)
+    now = datetime.now()
+    acts = [
+        {'id': f'a{i}', 'host_id': f'h{i}', 'activity_name': '欢乐时光', 'tavern_name': '店',
+         'end_time': (now + timedelta(hours=i - 1.5)).isoformat(), 'participants': []}
+        for i in range(5)
+    ]
+    (tl.data_path / 'active_activities.json').write_text(json.dumps(acts), encoding='utf-8')
+    # 列表只读，不结束活动
+    assert [a['id'] for a in tl.list_active_activities()] == ['a2', 'a3', 'a4']
+    assert len(tl.activities) == 5
+    ended = tl.end_expired_activities()
+    assert sorted(a['id'] for a in ended) == ['a0', 'a1']
+    assert [a['id'] for a in tl.list_active_activities()] == ['a2', 'a3', 'a4']
+    assert tl.activities.by_owner('h3')['id'] == 'a3'
+    assert len(json.loads((tl.data_path / 'active_activities.json').read_text(encoding='utf-8'))) == 3
+
+    project = {'id': 'b1', 'name': '精酿', 'recipe_id': 'craft_beer', 'type': 'beer', 'initiator_id': 'brewer',
+               'participants': {'brewer': {'contributed': True, 'contribution': 300}}, 'quality': 60,
+               'created_time': (now - timedelta(hours=25)).isoformat(),
+               'estimated_complete': (now - timedelta(hours=1)).isoformat(),
+               'min_participants': 1, 'max_participants': 3}
+    old = dict(project, id='b0', status='completed')
+    (tl.data_path / 'brewing_projects.json').write_text(
+        json.dumps({'active': [project], 'completed': [old]}), encoding='utf-8')
+    assert tl.list_brewing_projects()[0]['is_complete']
+    tl.complete_brewing('brewer', 'b1')
+    assert len(tl.brewing) == 0
+    data = json.loads((tl.data_path / 'brewing_projects.json').read_text(encoding='utf-8'))
+    assert data == {'active': []}
+    assert tl.check_brewing_progress('b0')['status'] == 'completed'
+    assert tl.check_brewing_progress('b1')['project']['final_quality'] == 60
@@ -0,0 +1,33 @@
+from core.common.timed_stat import TimedStat
+from core.common.data_manager import DataManager
+from core.common.cooldown import set_cooldown
+from core.police.logic import PoliceLogic
+
+
+def test_timed_stat_lazy_value():
+    clock = {}
+    hunger = TimedStat.bind(clock, 'hunger', 80, -4, now=1000.0)
+    assert hunger.get(1000.0 + 3600) == 76
+    assert hunger.get(1000.0 + 3600 * 100) == 0
+    assert hunger.add(50, 1000.0 + 3600 * 5) == 100
+    assert clock['hunger'] == {'value': 100, 'ts': 1000.0 + 3600 * 5, 'rate': -4, 'lo': 0, 'hi': 100}
+    # a rate change settles the elapsed time at the old rate first
+    hunger.set_rate(-2, 1000.0 + 3600 * 6)
+    assert hunger.get(1000.0 + 3600 * 7) == 94
+    assert hunger.hours_until(0, 1000.0 + 3600 * 7) == 47
+    assert TimedStat.bind(clock, 'hunger', 10, -4).record['rate'] == -2
+
+
+def test_police_stamina_regenerates_without_writes(tmp_path):
+    dm = DataManager(base_path=tmp_path)
+    p = PoliceLogic(data_manager=dm)
+    set_cooldown('cop', 'police', 'join', 0)
+    p.join_police('cop', {})
+    data = p._load_all_police()
+    info = data['cop']['info']
+    info['stamina'] = 10
+    info['clock'] = {'stamina': {'value': 10, 'ts': 0, 'rate': 10, 'lo': 0, 'hi': 100}}
+    p._save_all_police(data)
+    before = p._police_file().read_text(encoding='utf-8')
+    assert p.get_user_info('cop')['info']['stamina'] == 100
+    assert p._police_file().read_text(encoding='utf-8') == before